@@ -8,6 +8,8 @@ from fastapi_users.fastapi_users import FastAPIUsers  # noqa: F401
 from fastapi_users.manager import (  # noqa: F401
     BaseUserManager,
     IntegerIDMixin,
+    ULIDIDMixin,
+    UUID7IDMixin,
     UUIDIDMixin,
 )
 
@@ -19,5 +21,7 @@ __all__ = [
     "InvalidPasswordException",
     "InvalidID",
     "UUIDIDMixin",
+    "UUID7IDMixin",
+    "ULIDIDMixin",
     "IntegerIDMixin",
 ]
@@ -1,5 +1,6 @@
 from fastapi_users.authentication.authenticator import Authenticator
 from fastapi_users.authentication.backend import AuthenticationBackend
+from fastapi_users.authentication.middleware import AuthenticationMiddleware
 from fastapi_users.authentication.strategy import JWTStrategy, Strategy
 
 try:
@@ -16,6 +17,7 @@ from fastapi_users.authentication.transport import (
 __all__ = [
     "Authenticator",
     "AuthenticationBackend",
+    "AuthenticationMiddleware",
     "BearerTransport",
     "CookieTransport",
     "JWTStrategy",
@@ -1,16 +1,38 @@
+import asyncio
 import re
+import time
+from contextlib import AsyncExitStack
 from inspect import Parameter, Signature
-from typing import Callable, List, Optional, Sequence, Tuple, cast
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, WebSocket, status
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import get_dependant, solve_dependencies
+from fastapi.exceptions import RequestValidationError
 from makefun import with_signature
+from starlette.requests import HTTPConnection
+from starlette.websockets import WebSocketDisconnect
 
-from fastapi_users import models
+from fastapi_users import exceptions, models
 from fastapi_users.authentication.backend import AuthenticationBackend
 from fastapi_users.authentication.strategy import Strategy
 from fastapi_users.manager import BaseUserManager, UserManagerDependency
 from fastapi_users.types import DependencyCallable
 
+AUTHENTICATION_SCOPE_KEY = "fastapi_users.authentication"
+USER_MANAGER_SCOPE_KEY = "fastapi_users.user_manager"
+
 INVALID_CHARS_PATTERN = re.compile(r"[^0-9a-zA-Z_]")
 INVALID_LEADING_CHARS_PATTERN = re.compile(r"^[^a-zA-Z_]+")
 
@@ -27,11 +49,105 @@ def name_to_strategy_variable_name(name: str) -> str:
     return f"strategy_{name_to_variable_name(name)}"
 
 
+def get_http_request(connection: HTTPConnection) -> Request:
+    """
+    Return a request object from an HTTP or WebSocket connection.
+
+    Security schemes of the transports only accept requests, yet they only
+    read headers, cookies and query parameters, which are also available
+    on a WebSocket handshake.
+    Objects stored in the original scope are shared by the returned request.
+    """
+    if isinstance(connection, Request):
+        return connection
+    connection.scope.setdefault(AUTHENTICATION_SCOPE_KEY, {})
+    return Request({**connection.scope, "type": "http"})
+
+
 class DuplicateBackendNamesError(Exception):
     pass
 
 
+class MissingAuthenticationMiddlewareError(Exception):
+    pass
+
+
 EnabledBackendsDependency = DependencyCallable[Sequence[AuthenticationBackend]]
+TokenCandidate = Tuple[Strategy, str]
+AuthenticationResult = Tuple[Optional[models.UP], Optional[str]]
+CachedAuthenticationResult = Tuple[
+    Optional[models.UP], Optional[str], Optional[BaseUserManager]
+]
+
+
+class WebSocketAuthentication(Generic[models.UP]):
+    """
+    Authentication state of a WebSocket connection.
+
+    The connection is authenticated once, when the dependency is resolved.
+    The token is only read again when the application calls `revalidate`,
+    e.g. on each incoming message: it's cheap, since the token is only read
+    once the revalidation interval has elapsed. Connections which only push
+    data to the client should run `watch` in a background task instead.
+
+    :attribute user: The authenticated user.
+    :attribute token: The token of the authenticated user.
+    :attribute revalidate_interval: Minimum number of seconds between
+    two reads of the token. If `None`, the token is never read again.
+    """
+
+    user: Optional[models.UP]
+    token: Optional[str]
+    revalidate_interval: Optional[float]
+
+    def __init__(
+        self,
+        user: Optional[models.UP],
+        token: Optional[str],
+        authenticate: Callable[[], Awaitable[AuthenticationResult]],
+        revalidate_interval: Optional[float] = None,
+    ):
+        self.user = user
+        self.token = token
+        self.revalidate_interval = revalidate_interval
+        self._authenticate = authenticate
+        self._authenticated_at = time.monotonic()
+
+    async def revalidate(self, force: bool = False) -> Optional[models.UP]:
+        """
+        Read the token again if the revalidation interval has elapsed.
+
+        If the user doesn't pass the requirements anymore,
+        the connection is closed and `WebSocketDisconnect` is raised.
+
+        :param force: If `True`, read the token regardless of the interval.
+        :return: The authenticated user.
+        """
+        if not force and (
+            self.revalidate_interval is None
+            or time.monotonic() - self._authenticated_at < self.revalidate_interval
+        ):
+            return self.user
+
+        self.user, self.token = await self._authenticate()
+        self._authenticated_at = time.monotonic()
+        return self.user
+
+    async def watch(self) -> None:
+        """
+        Read the token every `revalidate_interval` seconds.
+
+        It returns once the user doesn't pass the requirements anymore
+        and the connection is closed.
+        """
+        if self.revalidate_interval is None:
+            raise ValueError("revalidate_interval is not set.")
+        try:
+            while True:
+                await asyncio.sleep(self.revalidate_interval)
+                await self.revalidate(force=True)
+        except WebSocketDisconnect:
+            pass
 
 
 class Authenticator:
@@ -40,21 +156,50 @@ class Authenticator:
 
     It performs the authentication against a list of backends
     defined by the end-developer. The first backend yielding a user wins.
+    Backends declaring a token classifier matching the token are tried first,
+    while those whose classifier rejects it are skipped.
     If no backend yields a user, an HTTPException is raised.
 
+    Dependency callables are memoized by their parameters and the result of
+    the token reading is stored in the request scope, so different `current_user`
+    dependencies on a same route only read the token once.
+
     :param backends: List of authentication backends.
     :param get_user_manager: User manager dependency callable.
+    :param lazy_user_manager: If `True`, the user manager is only resolved
+    when a token is present and needs to be read by a strategy.
+    Useful to avoid acquiring database resources for anonymous requests.
+    The resolved user manager is kept for the connection: routes get it
+    with `connection_user_manager`. Defaults to `False`.
+    :param concurrent_backends: If `True`, the tokens are read concurrently
+    by the strategies of every candidate backend. The user of the first backend,
+    in declaration order, yielding one is returned and the other reads are
+    cancelled. Each read gets its own user manager, so it requires
+    `lazy_user_manager`. Defaults to `False`.
+    :raises ValueError: `concurrent_backends` is set without `lazy_user_manager`.
     """
 
     backends: Sequence[AuthenticationBackend]
+    lazy_user_manager: bool
+    concurrent_backends: bool
 
     def __init__(
         self,
         backends: Sequence[AuthenticationBackend],
         get_user_manager: UserManagerDependency[models.UP, models.ID],
+        *,
+        lazy_user_manager: bool = False,
+        concurrent_backends: bool = False,
     ):
+        if concurrent_backends and not lazy_user_manager:
+            raise ValueError("concurrent_backends requires lazy_user_manager.")
         self.backends = backends
         self.get_user_manager = get_user_manager
+        self.lazy_user_manager = lazy_user_manager
+        self.concurrent_backends = concurrent_backends
+        self._user_manager_dependant = self._get_user_manager_dependant()
+        self._dependencies: Dict[Tuple[Any, ...], DependencyCallable] = {}
+        self._authentication_dependants: Dict[bool, Dependant] = {}
 
     def current_user_token(
         self,
@@ -85,6 +230,10 @@ class Authenticator:
         Please not however that every backends will appear in the OpenAPI documentation,
         as FastAPI resolves it statically.
         """
+        key = ("token", optional, active, verified, superuser, get_enabled_backends)
+        if key in self._dependencies:
+            return self._dependencies[key]
+
         signature = self._get_dependency_signature(get_enabled_backends)
 
         @with_signature(signature)
@@ -98,6 +247,7 @@ class Authenticator:
                 **kwargs,
             )
 
+        self._dependencies[key] = current_user_token_dependency
         return current_user_token_dependency
 
     def current_user(
@@ -129,6 +279,10 @@ class Authenticator:
         Please not however that every backends will appear in the OpenAPI documentation,
         as FastAPI resolves it statically.
         """
+        key = ("user", optional, active, verified, superuser, get_enabled_backends)
+        if key in self._dependencies:
+            return self._dependencies[key]
+
         signature = self._get_dependency_signature(get_enabled_backends)
 
         @with_signature(signature)
@@ -143,34 +297,286 @@ class Authenticator:
             )
             return user
 
+        self._dependencies[key] = current_user_dependency
         return current_user_dependency
 
+    def connection_user_manager(self):
+        """
+        Return a dependency callable to retrieve the user manager of the connection.
+
+        It's the user manager the authenticator resolved on-demand to read
+        the token, so that the users it returns can be updated with it.
+        If none was resolved yet, it's resolved now.
+        """
+        key = ("user_manager",)
+        if key in self._dependencies:
+            return self._dependencies[key]
+
+        async def connection_user_manager_dependency(connection: HTTPConnection):
+            return await self._resolve_user_manager(connection)
+
+        self._dependencies[key] = connection_user_manager_dependency
+        return connection_user_manager_dependency
+
+    async def authenticate_connection(
+        self, connection: HTTPConnection
+    ) -> Tuple[Optional[models.UP], Optional[str]]:
+        """
+        Read the token of an incoming connection with all the backends.
+
+        The dependencies of the backends are solved outside of any route,
+        so it can be called from an ASGI middleware.
+        Dependencies with yield require an `AsyncExitStack`
+        in the `fastapi_astack` key of the connection scope.
+        The user manager is only resolved if a token needs to be read,
+        and kept for the connection, like with `lazy_user_manager`.
+        The result is stored in the connection scope, so it's reused by
+        the dependency callables of this authenticator getting the same
+        user manager.
+
+        :param connection: The incoming HTTP or WebSocket connection.
+        :return: The authenticated user, if any, and the token.
+        """
+        websocket = connection.scope["type"] == "websocket"
+        if websocket not in self._authentication_dependants:
+            signature = self._get_dependency_signature(
+                websocket=websocket, with_user_manager=False
+            )
+
+            @with_signature(signature)
+            async def authentication_dependency(*args, **kwargs):
+                return kwargs  # pragma: no cover
+
+            self._authentication_dependants[websocket] = get_dependant(
+                path="", call=authentication_dependency
+            )
+
+        values = await self._solve_dependant(
+            connection, self._authentication_dependants[websocket]
+        )
+        if websocket:
+            values.update(
+                await self._get_websocket_tokens(
+                    cast(WebSocket, connection), self.backends
+                )
+            )
+        return await self._read_token(self.backends, None, connection, values)
+
+    def websocket_authentication(
+        self,
+        optional: bool = False,
+        active: bool = False,
+        verified: bool = False,
+        superuser: bool = False,
+        revalidate_interval: Optional[float] = None,
+        get_enabled_backends: Optional[EnabledBackendsDependency] = None,
+    ):
+        """
+        Return a dependency callable to authenticate a WebSocket connection.
+
+        The token is read from the WebSocket handshake by the transports,
+        once per connection. If the user doesn't pass the requirements,
+        the connection is closed with the code `1008` before being accepted.
+
+        It returns a `WebSocketAuthentication` object holding the user and
+        able to revalidate the token periodically. Each revalidation resolves
+        its own user manager, which is closed right after the token is read,
+        so that no database resources are held in between.
+
+        :param revalidate_interval: Optional minimum number of seconds between
+        two reads of the token by `WebSocketAuthentication.revalidate`.
+        If not set, the token is only read once.
+        Other parameters are the same as `current_user`.
+        """
+        key = (
+            "websocket",
+            optional,
+            active,
+            verified,
+            superuser,
+            revalidate_interval,
+            get_enabled_backends,
+        )
+        if key in self._dependencies:
+            return self._dependencies[key]
+
+        signature = self._get_dependency_signature(get_enabled_backends, websocket=True)
+
+        @with_signature(signature)
+        async def websocket_authentication_dependency(*args, **kwargs):
+            websocket: WebSocket = kwargs["request"]
+            user_manager: Optional[BaseUserManager] = kwargs.get("user_manager")
+            enabled_backends: Sequence[AuthenticationBackend] = kwargs.get(
+                "enabled_backends", self.backends
+            )
+            kwargs.update(await self._get_websocket_tokens(websocket, enabled_backends))
+
+            async def authenticate() -> AuthenticationResult:
+                async with AsyncExitStack() as exit_stack:
+                    result: AuthenticationResult = await self._read_token(
+                        enabled_backends,
+                        None,
+                        websocket,
+                        kwargs,
+                        cache=False,
+                        exit_stack=exit_stack,
+                    )
+                user, token = result
+                user = await self._check_connection_requirements(
+                    websocket, user, optional, active, verified, superuser
+                )
+                return user, token
+
+            user, token = await self._read_token(
+                enabled_backends, user_manager, websocket, kwargs
+            )
+            user = await self._check_connection_requirements(
+                websocket, user, optional, active, verified, superuser
+            )
+            return WebSocketAuthentication(
+                user, token, authenticate, revalidate_interval
+            )
+
+        self._dependencies[key] = websocket_authentication_dependency
+        return websocket_authentication_dependency
+
+    def middleware_user_token(
+        self,
+        optional: bool = False,
+        active: bool = False,
+        verified: bool = False,
+        superuser: bool = False,
+    ):
+        """
+        Return a dependency callable to retrieve the middleware user and token.
+
+        The user and token are the ones authenticated by the `AuthenticationMiddleware`.
+
+        Parameters are the same as `current_user_token`.
+        """
+        key = ("middleware_token", optional, active, verified, superuser)
+        if key in self._dependencies:
+            return self._dependencies[key]
+
+        async def middleware_user_token_dependency(connection: HTTPConnection):
+            return await self._get_middleware_authentication(
+                connection, optional, active, verified, superuser
+            )
+
+        self._dependencies[key] = middleware_user_token_dependency
+        return middleware_user_token_dependency
+
+    def middleware_user(
+        self,
+        optional: bool = False,
+        active: bool = False,
+        verified: bool = False,
+        superuser: bool = False,
+    ):
+        """
+        Return a dependency callable to retrieve the middleware user.
+
+        The user is the one authenticated by the `AuthenticationMiddleware`.
+        Contrary to `current_user`, it doesn't read the token:
+        it only checks the requirements against the result of the middleware.
+        Parameters are the same as `current_user`.
+        """
+        key = ("middleware_user", optional, active, verified, superuser)
+        if key in self._dependencies:
+            return self._dependencies[key]
+
+        async def middleware_user_dependency(connection: HTTPConnection):
+            user, _ = await self._get_middleware_authentication(
+                connection, optional, active, verified, superuser
+            )
+            return user
+
+        self._dependencies[key] = middleware_user_dependency
+        return middleware_user_dependency
+
+    async def _get_middleware_authentication(
+        self,
+        connection: HTTPConnection,
+        optional: bool,
+        active: bool,
+        verified: bool,
+        superuser: bool,
+    ) -> Tuple[Optional[models.UP], Optional[str]]:
+        results = connection.scope.get(AUTHENTICATION_SCOPE_KEY, {})
+        try:
+            user, token, _ = results[(self, *self.backends)]
+        except KeyError as e:
+            raise MissingAuthenticationMiddlewareError() from e
+
+        user = await self._check_connection_requirements(
+            connection, user, optional, active, verified, superuser
+        )
+        return user, token
+
+    async def _get_websocket_tokens(
+        self, websocket: WebSocket, enabled_backends: Sequence[AuthenticationBackend]
+    ) -> Dict[str, Optional[str]]:
+        tokens: Dict[str, Optional[str]] = {}
+        for backend in self.backends:
+            token = None
+            if backend in enabled_backends:
+                token = await backend.transport.get_websocket_token(websocket)
+            tokens[name_to_variable_name(backend.name)] = token
+        return tokens
+
     async def _authenticate(
         self,
         *args,
-        user_manager: BaseUserManager[models.UP, models.ID],
+        user_manager: Optional[BaseUserManager[models.UP, models.ID]] = None,
+        request: Optional[Request] = None,
         optional: bool = False,
         active: bool = False,
         verified: bool = False,
         superuser: bool = False,
         **kwargs,
     ) -> Tuple[Optional[models.UP], Optional[str]]:
-        user: Optional[models.UP] = None
-        token: Optional[str] = None
         enabled_backends: Sequence[AuthenticationBackend] = kwargs.get(
             "enabled_backends", self.backends
         )
-        for backend in self.backends:
-            if backend in enabled_backends:
-                token = kwargs[name_to_variable_name(backend.name)]
-                strategy: Strategy[models.UP, models.ID] = kwargs[
-                    name_to_strategy_variable_name(backend.name)
-                ]
-                if token is not None:
-                    user = await strategy.read_token(token, user_manager)
-                    if user:
-                        break
+        user, token = await self._read_token(
+            enabled_backends, user_manager, request, kwargs
+        )
+
+        user = self._check_requirements(user, optional, active, verified, superuser)
+        return user, token
+
+    async def _check_connection_requirements(
+        self,
+        connection: HTTPConnection,
+        user: Optional[models.UP],
+        optional: bool,
+        active: bool,
+        verified: bool,
+        superuser: bool,
+    ) -> Optional[models.UP]:
+        """
+        Check the requirements on an HTTP or WebSocket connection.
+
+        WebSocket connections not meeting them are closed with the code `1008`.
+        """
+        try:
+            return self._check_requirements(user, optional, active, verified, superuser)
+        except HTTPException:
+            if connection.scope["type"] == "websocket":
+                await cast(WebSocket, connection).close(
+                    code=status.WS_1008_POLICY_VIOLATION
+                )
+                raise WebSocketDisconnect(code=status.WS_1008_POLICY_VIOLATION)
+            raise
 
+    def _check_requirements(
+        self,
+        user: Optional[models.UP],
+        optional: bool,
+        active: bool,
+        verified: bool,
+        superuser: bool,
+    ) -> Optional[models.UP]:
         status_code = status.HTTP_401_UNAUTHORIZED
         if user:
             status_code = status.HTTP_403_FORBIDDEN
@@ -183,10 +589,194 @@ class Authenticator:
                 user = None
         if not user and not optional:
             raise HTTPException(status_code=status_code)
+        return user
+
+    async def _read_token(
+        self,
+        enabled_backends: Sequence[AuthenticationBackend],
+        user_manager: Optional[BaseUserManager[models.UP, models.ID]],
+        request: Optional[HTTPConnection],
+        kwargs: Dict[str, Any],
+        cache: bool = True,
+        exit_stack: Optional[AsyncExitStack] = None,
+    ) -> Tuple[Optional[models.UP], Optional[str]]:
+        """
+        Read the token with the enabled backends, once per request.
+
+        The result is stored in the request scope, so it can be reused
+        by the other dependencies relying on the same set of backends.
+        A user read with another user manager, e.g. the one of the middleware,
+        isn't reused, since it's attached to another database session.
+        If `cache` is `False`, the token is read again.
+        Without `user_manager`, the one of the connection is resolved
+        if a token needs to be read. With `exit_stack`, a new one is resolved
+        instead, and closed with this stack.
+        """
+        results: Dict[Tuple[Any, ...], CachedAuthenticationResult] = {}
+        if request is not None:
+            results = request.scope.setdefault(AUTHENTICATION_SCOPE_KEY, {})
+        key = (self, *enabled_backends)
+        if cache and key in results:
+            user, token, read_user_manager = results[key]
+            if user is None or user_manager in (None, read_user_manager):
+                return user, token
+
+        user = None
+        token = None
+        candidates = self._get_token_candidates(enabled_backends, kwargs)
+        if candidates:
+            connection = cast(HTTPConnection, request)
+            if user_manager is None and exit_stack is None:
+                user_manager = await self._resolve_user_manager(connection)
+            elif user_manager is None:
+                user_manager = await self._solve_user_manager(connection, exit_stack)
+            if self.concurrent_backends and len(candidates) > 1:
+                user, token = await self._read_tokens_concurrently(
+                    candidates, user_manager, connection, exit_stack
+                )
+            else:
+                for strategy, token in candidates:
+                    user = await strategy.read_token(token, user_manager)
+                    if user:
+                        break
+
+        results[key] = (user, token, user_manager)
         return user, token
 
+    def _get_token_candidates(
+        self,
+        enabled_backends: Sequence[AuthenticationBackend],
+        kwargs: Dict[str, Any],
+    ) -> List[TokenCandidate]:
+        """
+        Return the strategies and tokens to try, in order.
+
+        Backends whose classifier matches the token come first,
+        followed by the backends without classifier, in declaration order.
+        """
+        matched: List[TokenCandidate] = []
+        unclassified: List[TokenCandidate] = []
+        for backend in self.backends:
+            if backend not in enabled_backends:
+                continue
+            token: Optional[str] = kwargs[name_to_variable_name(backend.name)]
+            if token is None:
+                continue
+            strategy: Strategy = kwargs[name_to_strategy_variable_name(backend.name)]
+            if backend.token_classifier is None:
+                unclassified.append((strategy, token))
+            elif backend.token_classifier(token):
+                matched.append((strategy, token))
+        return matched + unclassified
+
+    async def _read_tokens_concurrently(
+        self,
+        candidates: List[TokenCandidate],
+        user_manager: BaseUserManager[models.UP, models.ID],
+        connection: HTTPConnection,
+        exit_stack: Optional[AsyncExitStack] = None,
+    ) -> Tuple[Optional[models.UP], Optional[str]]:
+        """
+        Read the tokens with every candidate strategy at once.
+
+        The results are awaited in priority order, so a backend yielding a user
+        only wins if all the preceding ones didn't.
+        Remaining reads are cancelled as soon as a user is found.
+
+        The first read uses `user_manager`. The others resolve their own,
+        so that a cancelled read doesn't leave a database session shared
+        with another read in an unknown state.
+        A user found by another read is fetched again with `user_manager`,
+        so that it can be updated by the route.
+        """
+
+        async def read_token(
+            strategy: Strategy, token: str, first: bool
+        ) -> Optional[models.UP]:
+            manager = user_manager
+            if not first:
+                manager = await self._solve_user_manager(connection, exit_stack)
+            return await strategy.read_token(token, manager)
+
+        tasks = [
+            asyncio.ensure_future(read_token(strategy, token, i == 0))
+            for i, (strategy, token) in enumerate(candidates)
+        ]
+        token: Optional[str] = None
+        try:
+            for i, (task, (_, token)) in enumerate(zip(tasks, candidates)):
+                user = await task
+                if user and i > 0:
+                    try:
+                        user = await user_manager.get_core(user.id)
+                    except exceptions.UserNotExists:
+                        continue
+                if user:
+                    return user, token
+            return None, token
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _resolve_user_manager(
+        self, connection: HTTPConnection
+    ) -> BaseUserManager[models.UP, models.ID]:
+        """
+        Resolve the user manager dependency on-demand for the current connection.
+
+        It's resolved once and stored in the connection scope.
+        """
+        user_managers = connection.scope.setdefault(USER_MANAGER_SCOPE_KEY, {})
+        if self not in user_managers:
+            user_managers[self] = await self._solve_user_manager(connection)
+        return user_managers[self]
+
+    async def _solve_user_manager(
+        self, connection: HTTPConnection, exit_stack: Optional[AsyncExitStack] = None
+    ) -> BaseUserManager[models.UP, models.ID]:
+        """
+        Resolve a new user manager, with its own dependencies.
+
+        Dependencies with yield are closed with `exit_stack`, if provided,
+        rather than at the end of the connection.
+        """
+        values = await self._solve_dependant(
+            connection, self._user_manager_dependant, exit_stack
+        )
+        return values["user_manager"]
+
+    async def _solve_dependant(
+        self,
+        connection: HTTPConnection,
+        dependant: Dependant,
+        exit_stack: Optional[AsyncExitStack] = None,
+    ) -> Dict[str, Any]:
+        request = get_http_request(connection)
+        if exit_stack is not None:
+            request = Request({**request.scope, "fastapi_astack": exit_stack})
+        values, errors, *_ = await solve_dependencies(
+            request=request,
+            dependant=dependant,
+            dependency_overrides_provider=connection.scope.get("app"),
+        )
+        if errors:
+            raise RequestValidationError(errors)
+        return values
+
+    def _get_user_manager_dependant(self) -> Dependant:
+        async def user_manager_dependency(
+            user_manager=Depends(self.get_user_manager),
+        ):
+            return user_manager  # pragma: no cover
+
+        return get_dependant(path="", call=user_manager_dependency)
+
     def _get_dependency_signature(
-        self, get_enabled_backends: Optional[EnabledBackendsDependency] = None
+        self,
+        get_enabled_backends: Optional[EnabledBackendsDependency] = None,
+        websocket: bool = False,
+        with_user_manager: bool = True,
     ) -> Signature:
         """
         Generate a dynamic signature for the current_user dependency.
@@ -195,29 +785,45 @@ class Authenticator:
         Thank to "makefun", we are able to generate callable
         with a dynamic number of dependencies at runtime.
         This way, each security schemes are detected by the OpenAPI generator.
+
+        For WebSocket connections, security schemes are left out:
+        tokens are read from the handshake by the transports.
+        The user manager is left out with `lazy_user_manager`,
+        or if `with_user_manager` is `False`.
         """
         try:
             parameters: List[Parameter] = [
                 Parameter(
-                    name="user_manager",
+                    name="request",
                     kind=Parameter.POSITIONAL_OR_KEYWORD,
-                    default=Depends(self.get_user_manager),
+                    annotation=WebSocket if websocket else Request,
                 )
             ]
-
-            for backend in self.backends:
-                parameters += [
+            if with_user_manager and not self.lazy_user_manager:
+                parameters.append(
                     Parameter(
-                        name=name_to_variable_name(backend.name),
+                        name="user_manager",
                         kind=Parameter.POSITIONAL_OR_KEYWORD,
-                        default=Depends(cast(Callable, backend.transport.scheme)),
-                    ),
+                        default=Depends(self.get_user_manager),
+                    )
+                )
+
+            for backend in self.backends:
+                if not websocket:
+                    parameters.append(
+                        Parameter(
+                            name=name_to_variable_name(backend.name),
+                            kind=Parameter.POSITIONAL_OR_KEYWORD,
+                            default=Depends(cast(Callable, backend.transport.scheme)),
+                        )
+                    )
+                parameters.append(
                     Parameter(
                         name=name_to_strategy_variable_name(backend.name),
                         kind=Parameter.POSITIONAL_OR_KEYWORD,
                         default=Depends(backend.get_strategy),
-                    ),
-                ]
+                    )
+                )
 
             if get_enabled_backends is not None:
                 parameters += [
@@ -1,8 +1,9 @@
-from typing import Any, Generic
+from typing import Any, Generic, Optional
 
 from fastapi import Response
 
 from fastapi_users import models
+from fastapi_users.authentication.classifier import TokenClassifier
 from fastapi_users.authentication.strategy import (
     Strategy,
     StrategyDestroyNotSupportedError,
@@ -24,20 +25,26 @@ class AuthenticationBackend(Generic[models.UP, models.ID]):
     :param transport: Authentication transport instance.
     :param get_strategy: Dependency callable returning
     an authentication strategy instance.
+    :param token_classifier: Optional callable returning whether a token
+    may be accepted by this backend, based on its shape.
+    Tokens rejected by the classifier are never read by the strategy.
     """
 
     name: str
     transport: Transport
+    token_classifier: Optional[TokenClassifier]
 
     def __init__(
         self,
         name: str,
         transport: Transport,
         get_strategy: DependencyCallable[Strategy[models.UP, models.ID]],
+        token_classifier: Optional[TokenClassifier] = None,
     ):
         self.name = name
         self.transport = transport
         self.get_strategy = get_strategy
+        self.token_classifier = token_classifier
 
     async def login(
         self,
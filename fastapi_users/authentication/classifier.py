@@ -0,0 +1,42 @@
+import re
+from typing import Callable, Optional
+
+TokenClassifier = Callable[[str], bool]
+
+JWT_PATTERN = re.compile(r"^[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]*$")
+
+
+def jwt_token_classifier(token: str) -> bool:
+    """Match tokens having the structure of a compact JWT."""
+    return JWT_PATTERN.match(token) is not None
+
+
+def prefix_token_classifier(prefix: str) -> TokenClassifier:
+    """
+    Return a classifier matching tokens starting with a given prefix.
+
+    :param prefix: Prefix the tokens should start with.
+    """
+
+    def _prefix_token_classifier(token: str) -> bool:
+        return token.startswith(prefix)
+
+    return _prefix_token_classifier
+
+
+def length_token_classifier(
+    min_length: int, max_length: Optional[int] = None
+) -> TokenClassifier:
+    """
+    Return a classifier matching tokens of a given length.
+
+    :param min_length: Minimum length of the token.
+    :param max_length: Maximum length of the token.
+    If not set, it's the same as `min_length`.
+    """
+    upper_length = min_length if max_length is None else max_length
+
+    def _length_token_classifier(token: str) -> bool:
+        return min_length <= len(token) <= upper_length
+
+    return _length_token_classifier
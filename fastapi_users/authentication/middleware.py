@@ -0,0 +1,46 @@
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING
+
+from starlette.requests import HTTPConnection, Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.websockets import WebSocket
+
+if TYPE_CHECKING:  # pragma: no cover
+    from fastapi_users.fastapi_users import FastAPIUsers
+
+
+class AuthenticationMiddleware:
+    """
+    ASGI middleware authenticating HTTP and WebSocket connections.
+
+    Connections are authenticated once, before they reach the routes.
+    The token is read with the authentication backends of the `FastAPIUsers`
+    instance and the result is attached to the connection scope.
+    Routes then retrieve it with the cheap `middleware_user` dependencies.
+
+    The user manager is only resolved when a token needs to be read,
+    while the strategies of the backends are resolved for every connection.
+
+    :param app: The ASGI application.
+    :param fastapi_users: The `FastAPIUsers` instance.
+    """
+
+    def __init__(self, app: ASGIApp, fastapi_users: "FastAPIUsers") -> None:
+        self.app = app
+        self.authenticator = fastapi_users.authenticator
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        connection: HTTPConnection
+        if scope["type"] == "websocket":
+            connection = WebSocket(scope, receive, send)
+        else:
+            connection = Request(scope, receive)
+
+        async with AsyncExitStack() as stack:
+            scope["fastapi_astack"] = stack
+            await self.authenticator.authenticate_connection(connection)
+            await self.app(scope, receive, send)
@@ -36,7 +36,7 @@ class DatabaseStrategy(
 
         try:
             parsed_id = user_manager.parse_id(access_token.user_id)
-            return await user_manager.get(parsed_id)
+            return await user_manager.get_core(parsed_id)
         except (exceptions.UserNotExists, exceptions.InvalidID):
             return None
 
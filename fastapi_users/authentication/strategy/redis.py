@@ -32,7 +32,7 @@ class RedisStrategy(Strategy[models.UP, models.ID], Generic[models.UP, models.ID
 
         try:
             parsed_id = user_manager.parse_id(user_id)
-            return await user_manager.get(parsed_id)
+            return await user_manager.get_core(parsed_id)
         except (exceptions.UserNotExists, exceptions.InvalidID):
             return None
 
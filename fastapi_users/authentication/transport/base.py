@@ -1,12 +1,12 @@
 import sys
-from typing import Any
+from typing import Any, Callable, Optional, cast
 
 if sys.version_info < (3, 8):
     from typing_extensions import Protocol  # pragma: no cover
 else:
     from typing import Protocol  # pragma: no cover
 
-from fastapi import Response
+from fastapi import Request, Response, WebSocket
 from fastapi.security.base import SecurityBase
 
 from fastapi_users.openapi import OpenAPIResponseType
@@ -25,6 +25,15 @@ class Transport(Protocol):
     async def get_logout_response(self, response: Response) -> Any:
         ...  # pragma: no cover
 
+    async def get_websocket_token(self, websocket: WebSocket) -> Optional[str]:
+        """
+        Return the token sent during a WebSocket handshake, if any.
+
+        By default, the security scheme reads the handshake request.
+        """
+        request = Request({**websocket.scope, "type": "http"})
+        return await cast(Callable, self.scheme)(request)
+
     @staticmethod
     def get_openapi_login_responses_success() -> OpenAPIResponseType:
         """Return a dictionary to use for the openapi responses route parameter."""
@@ -1,6 +1,6 @@
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import Response, status
+from fastapi import Response, WebSocket, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
@@ -18,6 +18,8 @@ class BearerResponse(BaseModel):
 
 class BearerTransport(Transport):
     scheme: OAuth2PasswordBearer
+    websocket_query_param: str = "access_token"
+    websocket_subprotocol_prefix: str = "access_token."
 
     def __init__(self, tokenUrl: str):
         self.scheme = OAuth2PasswordBearer(tokenUrl, auto_error=False)
@@ -28,6 +30,41 @@ class BearerTransport(Transport):
     async def get_logout_response(self, response: Response) -> Any:
         raise TransportLogoutNotSupportedError()
 
+    async def get_websocket_token(self, websocket: WebSocket) -> Optional[str]:
+        """
+        Return the token sent during a WebSocket handshake, if any.
+
+        Since browsers can't set headers on WebSocket connections, the token
+        may also be passed in the `access_token` query parameter or as a
+        subprotocol prefixed by `access_token.`.
+        """
+        token = await super().get_websocket_token(websocket)
+        if token is not None:
+            return token
+
+        token = websocket.query_params.get(self.websocket_query_param)
+        if token:
+            return token
+
+        subprotocol = self.get_websocket_subprotocol(websocket)
+        if subprotocol is not None:
+            _, token = subprotocol.split(self.websocket_subprotocol_prefix, 1)
+            return token
+
+        return None
+
+    def get_websocket_subprotocol(self, websocket: WebSocket) -> Optional[str]:
+        """
+        Return the subprotocol holding the token, if any.
+
+        Browsers drop connections accepted without one of the subprotocols
+        they asked for: pass it to `websocket.accept(subprotocol=...)`.
+        """
+        for subprotocol in websocket.scope.get("subprotocols", []):
+            if subprotocol.startswith(self.websocket_subprotocol_prefix):
+                return subprotocol
+        return None
+
     @staticmethod
     def get_openapi_login_responses_success() -> OpenAPIResponseType:
         return {
@@ -0,0 +1,113 @@
+import hashlib
+import math
+import os
+from typing import AsyncIterable, Iterator, Optional
+
+
+class EmailBloomFilter:
+    """
+    Probabilistic set of the registered e-mails, kept in the process memory.
+
+    It tells for sure when an e-mail is **not** registered, so that looking it up
+    in the database can be skipped. It may wrongly tell that an e-mail is
+    registered, at the `error_rate` when it holds `capacity` e-mails: the lookup
+    is then performed as usual.
+
+    E-mails are hashed with a key drawn at random for each instance, so that
+    false positives can't be computed in advance. E-mails can't be removed:
+    deleted users become false positives until the filter is rebuilt.
+
+    Until `build` completes, every e-mail is considered as registered.
+
+    :param capacity: Expected number of e-mails.
+    :param error_rate: Expected rate of false positives.
+    :param smoothing: Weight of the last lookup in the lookup duration average.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.01,
+        smoothing: float = 0.1,
+    ):
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.smoothing = smoothing
+        self.ready = False
+        self.lookup_seconds: Optional[float] = None
+        self._key = os.urandom(16)
+        self._bits = bytearray((self.size + 7) // 8)
+        self._building: Optional[bytearray] = None
+
+    def __contains__(self, email: str) -> bool:
+        if not self.ready:
+            return True
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(email)
+        )
+
+    def add(self, email: str) -> None:
+        """
+        Add an e-mail, as normalized by the user manager.
+
+        :param email: The e-mail.
+        """
+        self._set(self._bits, email)
+        if self._building is not None:
+            self._set(self._building, email)
+
+    def is_absent(self, email: str) -> bool:
+        """
+        Return whether the lookup of an e-mail can be skipped.
+
+        It's the case when the e-mail is definitely not registered, and at least
+        one lookup was recorded to know how long to pad the response.
+
+        :param email: The e-mail, as normalized by the user manager.
+        """
+        return self.lookup_seconds is not None and email not in self
+
+    def record_lookup(self, seconds: float) -> None:
+        """
+        Record the duration of a database lookup by e-mail.
+
+        :param seconds: Duration of the lookup.
+        """
+        if self.lookup_seconds is None:
+            self.lookup_seconds = seconds
+        else:
+            self.lookup_seconds += (seconds - self.lookup_seconds) * self.smoothing
+
+    async def build(self, emails: AsyncIterable[str]) -> None:
+        """
+        Replace the e-mails of the filter.
+
+        The current e-mails are used until the new ones are all added.
+        E-mails added meanwhile are kept.
+
+        :param emails: Async iterable of every registered e-mail,
+        as normalized by the user manager.
+        """
+        self._building = bytearray(len(self._bits))
+        try:
+            async for email in emails:
+                self._set(self._building, email)
+            self._bits = self._building
+            self.ready = True
+        finally:
+            self._building = None
+
+    def _set(self, bits: bytearray, email: str) -> None:
+        for position in self._positions(email):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def _positions(self, email: str) -> Iterator[int]:
+        digest = hashlib.blake2b(
+            email.encode("utf-8"), digest_size=16, key=self._key
+        ).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
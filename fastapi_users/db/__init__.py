@@ -1,6 +1,41 @@
-from fastapi_users.db.base import BaseUserDatabase, UserDatabaseDependency
+from fastapi_users.db.base import BaseUserDatabase, UserDatabaseDependency, UserFilter
+from fastapi_users.db.cache import (
+    BaseUserCache,
+    CachedUserDatabase,
+    CacheStats,
+    UserCache,
+)
+from fastapi_users.db.resilience import (
+    CircuitBreaker,
+    ResilienceStats,
+    ResilientUserCache,
+    ResilientUserDatabase,
+)
+from fastapi_users.db.shared_memory import (
+    PickleUserSerializer,
+    SharedMemoryUserCache,
+    UserSerializer,
+)
+from fastapi_users.db.singleflight import SingleFlight, SingleFlightUserDatabase
 
-__all__ = ["BaseUserDatabase", "UserDatabaseDependency"]
+__all__ = [
+    "BaseUserDatabase",
+    "UserDatabaseDependency",
+    "UserFilter",
+    "BaseUserCache",
+    "CachedUserDatabase",
+    "CacheStats",
+    "UserCache",
+    "SingleFlight",
+    "SingleFlightUserDatabase",
+    "PickleUserSerializer",
+    "SharedMemoryUserCache",
+    "UserSerializer",
+    "CircuitBreaker",
+    "ResilienceStats",
+    "ResilientUserCache",
+    "ResilientUserDatabase",
+]
 
 
 try:  # pragma: no cover
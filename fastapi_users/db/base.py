@@ -1,9 +1,53 @@
-from typing import Any, Dict, Generic, Optional
+import dataclasses
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    cast,
+)
 
+from fastapi_users import exceptions
 from fastapi_users.models import ID, OAP, UOAP, UP
+from fastapi_users.snapshot import UserSnapshot
 from fastapi_users.types import DependencyCallable
 
 
+@dataclasses.dataclass(frozen=True)
+class UserFilter:
+    """
+    Criteria to select users. A criterion left to `None` is ignored.
+
+    :param is_active: Select only the active, or inactive, users.
+    :param is_verified: Select only the verified, or unverified, users.
+    :param is_superuser: Select only the superusers, or regular users.
+    :param email_prefix: Select only the users whose e-mail starts with this
+    prefix, case-insensitively.
+    """
+
+    is_active: Optional[bool] = None
+    is_verified: Optional[bool] = None
+    is_superuser: Optional[bool] = None
+    email_prefix: Optional[str] = None
+
+    def matches(self, user: Any) -> bool:
+        """Return whether a user matches the criteria."""
+        if self.is_active is not None and user.is_active != self.is_active:
+            return False
+        if self.is_verified is not None and user.is_verified != self.is_verified:
+            return False
+        if self.is_superuser is not None and user.is_superuser != self.is_superuser:
+            return False
+        if self.email_prefix is not None and not user.email.lower().startswith(
+            self.email_prefix.lower()
+        ):
+            return False
+        return True
+
+
 class BaseUserDatabase(Generic[UP, ID]):
     """Base adapter for retrieving, creating and updating users from a database."""
 
@@ -11,6 +55,37 @@ class BaseUserDatabase(Generic[UP, ID]):
         """Get a single user by id."""
         raise NotImplementedError()
 
+    async def get_core(self, id: ID) -> Optional[UP]:
+        """
+        Get a single user by id, without loading its relationships.
+
+        It's used by the authentication strategies, which only need the columns
+        of the user. Calls `get` by default: override it to skip the join on
+        the OAuth accounts and implement `load_oauth_accounts`.
+        """
+        return await self.get(id)
+
+    async def get_auth_view(self, id: ID) -> Optional[UserSnapshot]:
+        """
+        Get the fields needed to authenticate a user by id, as a `UserSnapshot`.
+
+        Builds it from `get_core` by default: override it to select only the
+        columns of `UserProtocol`, skipping the other fields of the model.
+        """
+        user = await self.get_core(id)
+        if user is None:
+            return None
+        return UserSnapshot.from_user(user)
+
+    async def get_full(self, id: ID) -> Optional[UP]:
+        """
+        Get a single user by id, as a full model.
+
+        Contrary to `get`, wrappers caching `UserSnapshot` query the database.
+        Calls `get` by default.
+        """
+        return await self.get(id)
+
     async def get_by_email(self, email: str) -> Optional[UP]:
         """Get a single user by email."""
         raise NotImplementedError()
@@ -31,6 +106,121 @@ class BaseUserDatabase(Generic[UP, ID]):
         """Delete a user."""
         raise NotImplementedError()
 
+    async def get_many(self, ids: Sequence[ID]) -> List[UP]:
+        """
+        Get several users by id, skipping the ones that don't exist.
+
+        Calls `get` for each id by default: override it to query them at once.
+        """
+        users = []
+        for id in ids:
+            user = await self.get(id)
+            if user is not None:
+                users.append(user)
+        return users
+
+    async def get_many_full(self, ids: Sequence[ID]) -> List[UP]:
+        """
+        Get several users by id, as full models, skipping the ones that don't exist.
+
+        Contrary to `get_many`, wrappers caching `UserSnapshot` query the database.
+        Calls `get_many` by default.
+        """
+        return await self.get_many(ids)
+
+    async def get_many_by_email(self, emails: Sequence[str]) -> List[UP]:
+        """
+        Get several users by e-mail, skipping the ones that don't exist.
+
+        Calls `get_by_email` for each e-mail by default:
+        override it to query them at once.
+        """
+        users = []
+        for email in emails:
+            user = await self.get_by_email(email)
+            if user is not None:
+                users.append(user)
+        return users
+
+    async def create_many(self, create_dicts: Sequence[Dict[str, Any]]) -> List[UP]:
+        """
+        Create several users.
+
+        Calls `create` for each user by default: override it to insert them at once.
+        """
+        return [await self.create(create_dict) for create_dict in create_dicts]
+
+    async def update_many(
+        self, users: Sequence[UP], update_dict: Dict[str, Any]
+    ) -> List[UP]:
+        """
+        Apply the same update to several users.
+
+        Calls `update` for each user by default: override it to update them at once.
+        """
+        return [await self.update(user, update_dict) for user in users]
+
+    async def delete_many(self, users: Sequence[UP]) -> None:
+        """
+        Delete several users.
+
+        Calls `delete` for each user by default: override it to delete them at once.
+        """
+        for user in users:
+            await self.delete(user)
+
+    async def paginate(
+        self,
+        filter: Optional[UserFilter] = None,
+        after: Optional[ID] = None,
+        limit: int = 100,
+    ) -> List[UP]:
+        """
+        Get a page of users, ordered by id.
+
+        Pages are selected by keyset: the database should seek to the first id
+        greater than `after` thanks to the primary key index, instead of
+        scanning the skipped rows like an OFFSET would.
+
+        :param filter: Optional criteria the users should match.
+        :param after: Optional id of the last user of the previous page.
+        :param limit: Maximum number of users to return.
+        :return: The users, ordered by id.
+        """
+        raise NotImplementedError()
+
+    async def stream(
+        self, filter: Optional[UserFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[UP]:
+        """
+        Iterate over the users, ordered by id.
+
+        Users are fetched by batches with `paginate`, so memory usage
+        doesn't depend on the number of users.
+
+        :param filter: Optional criteria the users should match.
+        :param batch_size: Number of users fetched per query.
+        """
+        after: Optional[ID] = None
+        while True:
+            users = await self.paginate(filter, after, batch_size)
+            for user in users:
+                yield user
+            if len(users) < batch_size:
+                return
+            after = users[-1].id
+
+    async def load_oauth_accounts(
+        self: "BaseUserDatabase[UOAP, ID]", user: UOAP
+    ) -> UOAP:
+        """
+        Load the OAuth accounts of a user fetched with `get_core`.
+
+        Returns the user as is by default, since `get_core` calls `get`,
+        which loads them.
+        """
+        return user
+
     async def add_oauth_account(
         self: "BaseUserDatabase[UOAP, ID]", user: UOAP, create_dict: Dict[str, Any]
     ) -> UOAP:
@@ -46,5 +236,71 @@ class BaseUserDatabase(Generic[UP, ID]):
         """Update an OAuth account on a user."""
         raise NotImplementedError()
 
+    async def upsert_oauth_account(
+        self: "BaseUserDatabase[UOAP, ID]",
+        oauth_name: str,
+        account_id: str,
+        update_dict: Dict[str, Any],
+    ) -> Optional[UOAP]:
+        """
+        Update an OAuth account, looked up by provider and account id.
+
+        Calls `get_by_oauth_account` then `update_oauth_account` by default:
+        override it to update the account and load its user in a single
+        round trip, e.g. with an `UPDATE ... RETURNING` statement.
+
+        :param oauth_name: Name of the OAuth client.
+        :param account_id: Id of the user on the service provider.
+        :param update_dict: Fields of the OAuth account to update.
+        :return: The user owning the updated account, or `None` if the account
+        doesn't exist: the caller should then add it to a user.
+        """
+        user = await self.get_by_oauth_account(oauth_name, account_id)
+        if user is None:
+            return None
+        for oauth_account in user.oauth_accounts:
+            if (
+                oauth_account.oauth_name == oauth_name
+                and oauth_account.account_id == account_id
+            ):
+                return await self.update_oauth_account(user, oauth_account, update_dict)
+        return user
+
+
+async def _get_own_user(user_db: BaseUserDatabase[UP, ID], user: UP) -> UP:
+    """
+    Fetch a user again with an adapter, before writing it.
+
+    Wrappers sharing their results between requests may return snapshots,
+    or instances attached to the session of another request.
+    """
+    model = await user_db.get_full(user.id)
+    if model is None:
+        raise exceptions.UserNotExists()
+    return model
+
+
+async def _get_own_users(
+    user_db: BaseUserDatabase[UP, ID], users: Sequence[UP]
+) -> List[UP]:
+    """Fetch several users again with an adapter, like `_get_own_user`."""
+    if not users:
+        return []
+    models = {
+        user.id: user for user in await user_db.get_many_full([u.id for u in users])
+    }
+    try:
+        return [models[user.id] for user in users]
+    except KeyError as e:
+        raise exceptions.UserNotExists() from e
+
+
+def _get_own_oauth_account(user: UOAP, oauth_account: OAP) -> OAP:
+    """Find an OAuth account in a user returned by `_get_own_user`."""
+    for own_oauth_account in user.oauth_accounts:
+        if own_oauth_account.id == oauth_account.id:
+            return cast(OAP, own_oauth_account)
+    return oauth_account
+
 
 UserDatabaseDependency = DependencyCallable[BaseUserDatabase[UP, ID]]
@@ -0,0 +1,363 @@
+import dataclasses
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from fastapi_users.db.base import (
+    BaseUserDatabase,
+    UserFilter,
+    _get_own_oauth_account,
+    _get_own_user,
+    _get_own_users,
+)
+from fastapi_users.models import ID, OAP, UOAP, UP
+from fastapi_users.snapshot import UserSnapshot
+
+OAuthKey = Tuple[str, str]
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Hit and miss counters of a user cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+class BaseUserCache(Generic[UP, ID]):
+    """Base cache for storing users by id, e-mail and OAuth account."""
+
+    stats: CacheStats
+
+    async def get(self, id: ID) -> Optional[UP]:
+        """Get a cached user by id."""
+        raise NotImplementedError()
+
+    async def get_by_email(self, email: str) -> Optional[UP]:
+        """Get a cached user by e-mail."""
+        raise NotImplementedError()
+
+    async def get_by_oauth_account(self, oauth: str, account_id: str) -> Optional[UP]:
+        """Get a cached user by OAuth account id."""
+        raise NotImplementedError()
+
+    async def set(self, user: UP, *, oauth_key: Optional[OAuthKey] = None) -> None:
+        """Store a user, optionally indexed by the OAuth account it was fetched by."""
+        raise NotImplementedError()
+
+    async def invalidate(self, user: UP) -> None:
+        """Remove a user from the cache."""
+        raise NotImplementedError()
+
+    async def clear(self) -> None:
+        """Remove every user from the cache."""
+        raise NotImplementedError()
+
+
+@dataclasses.dataclass
+class _CacheEntry(Generic[UP]):
+    user: UP
+    expires_at: float
+    email: str
+    oauth_keys: List[OAuthKey]
+
+
+class UserCache(BaseUserCache[UP, ID]):
+    """
+    In-memory user cache with LRU eviction and time-to-live.
+
+    Users are stored once, by id. The e-mail and OAuth account indexes
+    only point to the id, so a single invalidation clears every index.
+
+    It's meant to be instantiated once per process and shared by
+    every `CachedUserDatabase`.
+
+    :param max_size: Maximum number of users to keep.
+    The least recently used are evicted first.
+    :param ttl_seconds: Number of seconds a user is kept in the cache.
+    :param snapshots: If `True`, users are stored as `UserSnapshot`
+    instead of the instances returned by the database adapter.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10_000,
+        ttl_seconds: float = 60.0,
+        snapshots: bool = False,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.snapshots = snapshots
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, _CacheEntry[UP]]" = OrderedDict()
+        self._email_index: Dict[str, Hashable] = {}
+        self._oauth_index: Dict[OAuthKey, Hashable] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, id: ID) -> Optional[UP]:
+        return self._lookup(id)
+
+    async def get_by_email(self, email: str) -> Optional[UP]:
+        return self._lookup(self._email_index.get(email.lower()))
+
+    async def get_by_oauth_account(self, oauth: str, account_id: str) -> Optional[UP]:
+        return self._lookup(self._oauth_index.get((oauth, account_id)))
+
+    async def set(self, user: UP, *, oauth_key: Optional[OAuthKey] = None) -> None:
+        self._remove(user.id)
+
+        email = user.email.lower()
+        oauth_keys = [
+            (oauth_account.oauth_name, oauth_account.account_id)
+            for oauth_account in getattr(user, "oauth_accounts", None) or []
+        ]
+        if oauth_key is not None and oauth_key not in oauth_keys:
+            oauth_keys.append(oauth_key)
+        if self.snapshots:
+            user = cast(UP, UserSnapshot.from_user(user))
+
+        self._entries[user.id] = _CacheEntry(
+            user, time.monotonic() + self.ttl_seconds, email, oauth_keys
+        )
+        self._email_index[email] = user.id
+        for key in oauth_keys:
+            self._oauth_index[key] = user.id
+
+        while len(self._entries) > self.max_size:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+            self.stats.evictions += 1
+
+    async def invalidate(self, user: UP) -> None:
+        self._remove(user.id)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._email_index.clear()
+        self._oauth_index.clear()
+
+    def _lookup(self, id: Optional[Hashable]) -> Optional[UP]:
+        entry = self._entries.get(id) if id is not None else None
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(id)
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(id)
+        self.stats.hits += 1
+        return entry.user
+
+    def _remove(self, id: Hashable) -> None:
+        entry = self._entries.pop(id, None)
+        if entry is None:
+            return
+        if self._email_index.get(entry.email) == id:
+            del self._email_index[entry.email]
+        for key in entry.oauth_keys:
+            if self._oauth_index.get(key) == id:
+                del self._oauth_index[key]
+
+
+class CachedUserDatabase(BaseUserDatabase[UP, ID]):
+    """
+    Database adapter wrapper serving user lookups from a cache.
+
+    Lookups by id, e-mail and OAuth account are read from the cache first
+    and stored in it on miss. Writes are forwarded to the wrapped adapter
+    and invalidate the cached user.
+
+    The users passed to the write methods are fetched again with the wrapped
+    adapter: the cached ones may be `UserSnapshot`, or instances attached to
+    the session of another request.
+
+    Any other attribute is looked up on the wrapped adapter.
+
+    :param user_db: Database adapter instance to wrap.
+    :param cache: User cache instance, usually shared by the whole process.
+    """
+
+    def __init__(self, user_db: BaseUserDatabase[UP, ID], cache: BaseUserCache[UP, ID]):
+        self.user_db = user_db
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.user_db, name)
+
+    async def get(self, id: ID) -> Optional[UP]:
+        user = await self.cache.get(id)
+        if user is None:
+            user = await self.user_db.get(id)
+            if user is not None:
+                await self.cache.set(user)
+        return user
+
+    async def get_core(self, id: ID) -> Optional[UP]:
+        # Cache full users only, so that `get` hits can be returned as is.
+        return await self.get(id)
+
+    async def get_auth_view(self, id: ID) -> Optional[UserSnapshot]:
+        user = await self.get(id)
+        if user is None:
+            return None
+        return UserSnapshot.from_user(user)
+
+    async def get_full(self, id: ID) -> Optional[UP]:
+        return await self.user_db.get_full(id)
+
+    async def get_by_email(self, email: str) -> Optional[UP]:
+        user = await self.cache.get_by_email(email)
+        if user is None:
+            user = await self.user_db.get_by_email(email)
+            if user is not None:
+                await self.cache.set(user)
+        return user
+
+    async def get_by_oauth_account(self, oauth: str, account_id: str) -> Optional[UP]:
+        user = await self.cache.get_by_oauth_account(oauth, account_id)
+        if user is None:
+            user = await self.user_db.get_by_oauth_account(oauth, account_id)
+            if user is not None:
+                await self.cache.set(user, oauth_key=(oauth, account_id))
+        return user
+
+    async def create(self, create_dict: Dict[str, Any]) -> UP:
+        return await self.user_db.create(create_dict)
+
+    async def update(self, user: UP, update_dict: Dict[str, Any]) -> UP:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            return await self.user_db.update(user, update_dict)
+        finally:
+            await self.cache.invalidate(user)
+
+    async def delete(self, user: UP) -> None:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            await self.user_db.delete(user)
+        finally:
+            await self.cache.invalidate(user)
+
+    async def get_many(self, ids: Sequence[ID]) -> List[UP]:
+        users: Dict[ID, UP] = {}
+        missing_ids: List[ID] = []
+        for id in ids:
+            user = await self.cache.get(id)
+            if user is None:
+                missing_ids.append(id)
+            else:
+                users[id] = user
+        if missing_ids:
+            for user in await self.user_db.get_many(missing_ids):
+                await self.cache.set(user)
+                users[user.id] = user
+        return [users[id] for id in ids if id in users]
+
+    async def get_many_full(self, ids: Sequence[ID]) -> List[UP]:
+        return await self.user_db.get_many_full(ids)
+
+    async def get_many_by_email(self, emails: Sequence[str]) -> List[UP]:
+        return await self.user_db.get_many_by_email(emails)
+
+    async def paginate(
+        self,
+        filter: Optional[UserFilter] = None,
+        after: Optional[ID] = None,
+        limit: int = 100,
+    ) -> List[UP]:
+        return await self.user_db.paginate(filter, after, limit)
+
+    async def stream(
+        self, filter: Optional[UserFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[UP]:
+        async for user in self.user_db.stream(filter, batch_size):
+            yield user
+
+    async def create_many(self, create_dicts: Sequence[Dict[str, Any]]) -> List[UP]:
+        return await self.user_db.create_many(create_dicts)
+
+    async def update_many(
+        self, users: Sequence[UP], update_dict: Dict[str, Any]
+    ) -> List[UP]:
+        try:
+            users = await _get_own_users(self.user_db, users)
+            return await self.user_db.update_many(users, update_dict)
+        finally:
+            for user in users:
+                await self.cache.invalidate(user)
+
+    async def delete_many(self, users: Sequence[UP]) -> None:
+        try:
+            users = await _get_own_users(self.user_db, users)
+            await self.user_db.delete_many(users)
+        finally:
+            for user in users:
+                await self.cache.invalidate(user)
+
+    async def load_oauth_accounts(
+        self: "CachedUserDatabase[UOAP, ID]", user: UOAP
+    ) -> UOAP:
+        user = await _get_own_user(self.user_db, user)
+        return await self.user_db.load_oauth_accounts(user)
+
+    async def add_oauth_account(
+        self: "CachedUserDatabase[UOAP, ID]", user: UOAP, create_dict: Dict[str, Any]
+    ) -> UOAP:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            return await self.user_db.add_oauth_account(user, create_dict)
+        finally:
+            await self.cache.invalidate(user)
+
+    async def update_oauth_account(
+        self: "CachedUserDatabase[UOAP, ID]",
+        user: UOAP,
+        oauth_account: OAP,
+        update_dict: Dict[str, Any],
+    ) -> UOAP:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            oauth_account = _get_own_oauth_account(user, oauth_account)
+            return await self.user_db.update_oauth_account(
+                user, oauth_account, update_dict
+            )
+        finally:
+            await self.cache.invalidate(user)
+
+    async def upsert_oauth_account(
+        self: "CachedUserDatabase[UOAP, ID]",
+        oauth_name: str,
+        account_id: str,
+        update_dict: Dict[str, Any],
+    ) -> Optional[UOAP]:
+        user = await self.user_db.upsert_oauth_account(
+            oauth_name, account_id, update_dict
+        )
+        if user is not None:
+            await self.cache.invalidate(user)
+        return user
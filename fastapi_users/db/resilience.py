@@ -0,0 +1,453 @@
+import asyncio
+import dataclasses
+import functools
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    cast,
+)
+
+from fastapi_users import exceptions
+from fastapi_users.db.base import (
+    BaseUserDatabase,
+    UserFilter,
+    _get_own_oauth_account,
+    _get_own_user,
+    _get_own_users,
+)
+from fastapi_users.models import ID, OAP, UOAP, UP
+from fastapi_users.snapshot import UserSnapshot
+
+Fetch = Callable[[BaseUserDatabase], Awaitable[Optional[Any]]]
+GetBackgroundUserDB = Callable[[], AsyncContextManager[BaseUserDatabase]]
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing service for a while.
+
+    After `failure_threshold` consecutive failures, the circuit opens: calls
+    are refused for `recovery_seconds`. Then, a single trial call is allowed:
+    the circuit closes if it succeeds, or opens again if it fails.
+
+    :param failure_threshold: Number of consecutive failures opening the circuit.
+    :param recovery_seconds: Number of seconds before allowing a trial call.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.recovery_seconds:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """Return whether a call is allowed, reserving the trial call if needed."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """Release the trial call without outcome, e.g. if it was cancelled."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+
+@dataclasses.dataclass
+class ResilienceStats:
+    """Counters of a resilient user cache."""
+
+    fresh: int = 0
+    stale: int = 0
+    fallback: int = 0
+    revalidations: int = 0
+    failures: int = 0
+
+
+@dataclasses.dataclass
+class _Entry(Generic[UP]):
+    user: UP
+    fetched_at: float
+
+
+class ResilientUserCache(Generic[UP, ID]):
+    """
+    Last known users, served when the database is slow or unavailable.
+
+    Depending on its age, a user fetched before is:
+
+    * served as is, if it's younger than `fresh_seconds`;
+    * served and revalidated in the background, if it's younger than
+    `stale_seconds` and `get_background_user_db` is set. Otherwise,
+    it's revalidated before being served;
+    * served if the database fails, times out or if the circuit breaker is open,
+    as long as it's younger than `max_stale_seconds`.
+
+    It's meant to be instantiated once per process and shared by
+    every `ResilientUserDatabase`.
+
+    :param fresh_seconds: Age under which a user is served without querying.
+    :param stale_seconds: Age under which a user is served while
+    being revalidated in the background.
+    :param max_stale_seconds: Age under which a user is served when
+    the database is unavailable.
+    :param timeout_seconds: Optional timeout of the database lookups.
+    Lookups timing out are cancelled, so they are performed with an adapter of
+    `get_background_user_db`, rather than the session of the request:
+    without it, no timeout is applied.
+    :param max_size: Maximum number of users to keep.
+    :param circuit_breaker: Optional circuit breaker. Defaults to one opening
+    after 5 consecutive failures, for 30 seconds.
+    :param get_background_user_db: Optional callable returning an async context
+    manager yielding a database adapter, used for background revalidations
+    and lookups with a timeout.
+    The adapter of the request triggering it can't be used, as the request may
+    be finished by then: without it, users are revalidated synchronously.
+    """
+
+    def __init__(
+        self,
+        *,
+        fresh_seconds: float = 5.0,
+        stale_seconds: float = 60.0,
+        max_stale_seconds: float = 3600.0,
+        timeout_seconds: Optional[float] = None,
+        max_size: int = 10_000,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        get_background_user_db: Optional[GetBackgroundUserDB] = None,
+    ):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_size = max_size
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.get_background_user_db = get_background_user_db
+        self.stats = ResilienceStats()
+        self._entries: "OrderedDict[Hashable, _Entry[UP]]" = OrderedDict()
+        self._keys_by_id: Dict[Any, Set[Hashable]] = {}
+        self._revalidations: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    async def lookup(
+        self, key: Hashable, user_db: BaseUserDatabase[UP, ID], fetch: Fetch
+    ) -> Optional[UP]:
+        """
+        Look up a user, following the freshness policy.
+
+        :param key: Key identifying the lookup.
+        :param user_db: Database adapter to query.
+        :param fetch: Coroutine function performing the lookup on an adapter.
+        :raises UserDatabaseUnavailable: The database is unavailable
+        and no user younger than `max_stale_seconds` is known.
+        :return: The user, or `None` if it doesn't exist.
+        """
+        entry = self._entries.get(key)
+        age = time.monotonic() - entry.fetched_at if entry else float("inf")
+
+        if entry is not None and age < self.fresh_seconds:
+            self._entries.move_to_end(key)
+            self.stats.fresh += 1
+            return entry.user
+
+        get_background_user_db = self.get_background_user_db
+        if (
+            entry is not None
+            and age < self.stale_seconds
+            and get_background_user_db is not None
+        ):
+            self._entries.move_to_end(key)
+            self.stats.stale += 1
+            self._revalidate(key, get_background_user_db, fetch)
+            return entry.user
+
+        try:
+            if self.timeout_seconds is not None and get_background_user_db is not None:
+                return await self._background_fetch(key, get_background_user_db, fetch)
+            return await self._fetch(key, user_db, fetch)
+        except asyncio.CancelledError:  # pragma: no cover
+            raise  # It's an Exception subclass on Python 3.7
+        except Exception as e:
+            if entry is not None and age < self.max_stale_seconds:
+                self.stats.fallback += 1
+                return entry.user
+            raise exceptions.UserDatabaseUnavailable() from e
+
+    def invalidate(self, user: UP) -> None:
+        """Forget every lookup of a user."""
+        for key in self._keys_by_id.pop(user.id, set()):
+            self._entries.pop(key, None)
+            # It may have read the user before the write
+            revalidation = self._revalidations.get(key)
+            if revalidation is not None:
+                revalidation.cancel()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_id.clear()
+
+    async def _fetch(
+        self,
+        key: Hashable,
+        user_db: BaseUserDatabase[UP, ID],
+        fetch: Fetch,
+        timeout_seconds: Optional[float] = None,
+    ) -> Optional[UP]:
+        if not self.circuit_breaker.allow():
+            raise exceptions.UserDatabaseUnavailable()
+        try:
+            user = await asyncio.wait_for(fetch(user_db), timeout_seconds)
+        except asyncio.CancelledError:
+            self.circuit_breaker.release()
+            raise
+        except Exception:
+            self.stats.failures += 1
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+        self._store(key, user)
+        return user
+
+    def _store(self, key: Hashable, user: Optional[UP]) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._keys_by_id.get(previous.user.id, set()).discard(key)
+        if user is None:
+            return
+
+        self._entries[key] = _Entry(user, time.monotonic())
+        self._keys_by_id.setdefault(user.id, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest_key, oldest = self._entries.popitem(last=False)
+            self._keys_by_id.get(oldest.user.id, set()).discard(oldest_key)
+
+    def _revalidate(
+        self,
+        key: Hashable,
+        get_background_user_db: GetBackgroundUserDB,
+        fetch: Fetch,
+    ) -> None:
+        if key in self._revalidations:
+            return
+        self.stats.revalidations += 1
+        revalidation = asyncio.ensure_future(
+            self._background_fetch(key, get_background_user_db, fetch)
+        )
+        self._revalidations[key] = revalidation
+        revalidation.add_done_callback(functools.partial(self._revalidated, key))
+
+    async def _background_fetch(
+        self,
+        key: Hashable,
+        get_background_user_db: GetBackgroundUserDB,
+        fetch: Fetch,
+    ) -> Optional[UP]:
+        # Its own session can be torn down if the lookup is cancelled on timeout
+        async with get_background_user_db() as background_user_db:
+            return await self._fetch(
+                key, background_user_db, fetch, self.timeout_seconds
+            )
+
+    def _revalidated(self, key: Hashable, revalidation: "asyncio.Future[Any]") -> None:
+        del self._revalidations[key]
+        # The failure is already recorded: retrieve the exception to silence it.
+        if not revalidation.cancelled():
+            revalidation.exception()
+
+
+class ResilientUserDatabase(BaseUserDatabase[UP, ID]):
+    """
+    Database adapter wrapper keeping user lookups available during outages.
+
+    Lookups by id, used by the authentication strategies, go through
+    a `ResilientUserCache`. Lookups by e-mail and OAuth account, used to log in
+    and to check the uniqueness of e-mails, are forwarded to the wrapped adapter:
+    they must not return an outdated password, status or e-mail.
+    Writes are forwarded to the wrapped adapter and invalidate the known user.
+    The users passed to them are fetched again with the wrapped adapter,
+    as the known ones may be attached to the session of another request.
+
+    Any other attribute is looked up on the wrapped adapter.
+
+    :param user_db: Database adapter instance to wrap.
+    :param cache: Resilient user cache, usually shared by the whole process.
+    """
+
+    def __init__(
+        self, user_db: BaseUserDatabase[UP, ID], cache: ResilientUserCache[UP, ID]
+    ):
+        self.user_db = user_db
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.user_db, name)
+
+    async def get(self, id: ID) -> Optional[UP]:
+        return await self.cache.lookup(
+            ("get", id), self.user_db, lambda user_db: user_db.get(id)
+        )
+
+    async def get_core(self, id: ID) -> Optional[UP]:
+        return await self.cache.lookup(
+            ("get_core", id), self.user_db, lambda user_db: user_db.get_core(id)
+        )
+
+    async def get_auth_view(self, id: ID) -> Optional[UserSnapshot]:
+        user = await self.cache.lookup(
+            ("get_auth_view", id),
+            self.user_db,
+            lambda user_db: user_db.get_auth_view(id),
+        )
+        return cast(Optional[UserSnapshot], user)
+
+    async def get_full(self, id: ID) -> Optional[UP]:
+        return await self.user_db.get_full(id)
+
+    async def get_by_email(self, email: str) -> Optional[UP]:
+        return await self.user_db.get_by_email(email)
+
+    async def get_by_oauth_account(self, oauth: str, account_id: str) -> Optional[UP]:
+        return await self.user_db.get_by_oauth_account(oauth, account_id)
+
+    async def create(self, create_dict: Dict[str, Any]) -> UP:
+        return await self.user_db.create(create_dict)
+
+    async def update(self, user: UP, update_dict: Dict[str, Any]) -> UP:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            return await self.user_db.update(user, update_dict)
+        finally:
+            self.cache.invalidate(user)
+
+    async def delete(self, user: UP) -> None:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            await self.user_db.delete(user)
+        finally:
+            self.cache.invalidate(user)
+
+    async def get_many(self, ids: Sequence[ID]) -> List[UP]:
+        return await self.user_db.get_many(ids)
+
+    async def get_many_full(self, ids: Sequence[ID]) -> List[UP]:
+        return await self.user_db.get_many_full(ids)
+
+    async def get_many_by_email(self, emails: Sequence[str]) -> List[UP]:
+        return await self.user_db.get_many_by_email(emails)
+
+    async def paginate(
+        self,
+        filter: Optional[UserFilter] = None,
+        after: Optional[ID] = None,
+        limit: int = 100,
+    ) -> List[UP]:
+        return await self.user_db.paginate(filter, after, limit)
+
+    async def stream(
+        self, filter: Optional[UserFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[UP]:
+        async for user in self.user_db.stream(filter, batch_size):
+            yield user
+
+    async def create_many(self, create_dicts: Sequence[Dict[str, Any]]) -> List[UP]:
+        return await self.user_db.create_many(create_dicts)
+
+    async def update_many(
+        self, users: Sequence[UP], update_dict: Dict[str, Any]
+    ) -> List[UP]:
+        try:
+            users = await _get_own_users(self.user_db, users)
+            return await self.user_db.update_many(users, update_dict)
+        finally:
+            for user in users:
+                self.cache.invalidate(user)
+
+    async def delete_many(self, users: Sequence[UP]) -> None:
+        try:
+            users = await _get_own_users(self.user_db, users)
+            await self.user_db.delete_many(users)
+        finally:
+            for user in users:
+                self.cache.invalidate(user)
+
+    async def load_oauth_accounts(
+        self: "ResilientUserDatabase[UOAP, ID]", user: UOAP
+    ) -> UOAP:
+        user = await _get_own_user(self.user_db, user)
+        return await self.user_db.load_oauth_accounts(user)
+
+    async def add_oauth_account(
+        self: "ResilientUserDatabase[UOAP, ID]",
+        user: UOAP,
+        create_dict: Dict[str, Any],
+    ) -> UOAP:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            return await self.user_db.add_oauth_account(user, create_dict)
+        finally:
+            self.cache.invalidate(user)
+
+    async def update_oauth_account(
+        self: "ResilientUserDatabase[UOAP, ID]",
+        user: UOAP,
+        oauth_account: OAP,
+        update_dict: Dict[str, Any],
+    ) -> UOAP:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            oauth_account = _get_own_oauth_account(user, oauth_account)
+            return await self.user_db.update_oauth_account(
+                user, oauth_account, update_dict
+            )
+        finally:
+            self.cache.invalidate(user)
+
+    async def upsert_oauth_account(
+        self: "ResilientUserDatabase[UOAP, ID]",
+        oauth_name: str,
+        account_id: str,
+        update_dict: Dict[str, Any],
+    ) -> Optional[UOAP]:
+        user = await self.user_db.upsert_oauth_account(
+            oauth_name, account_id, update_dict
+        )
+        if user is not None:
+            self.cache.invalidate(user)
+        return user
@@ -0,0 +1,295 @@
+import contextlib
+import hashlib
+import mmap
+import os
+import pickle
+import stat
+import struct
+import sys
+import time
+from typing import Any, Iterator, Optional, Tuple, cast
+
+from fastapi_users.db.cache import BaseUserCache, CacheStats, OAuthKey
+from fastapi_users.models import ID, UP
+from fastapi_users.snapshot import UserSnapshotSerializer
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Protocol  # pragma: no cover
+else:
+    from typing import Protocol  # pragma: no cover
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+MAGIC = b"FAPIUSR1"
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+
+# Version (seqlock), key hash, expiration timestamp, key length, value length
+SLOT_VERSION = struct.Struct("<Q")
+SLOT_HEADER = struct.Struct("<QQdHI")
+SLOT_DATA_OFFSET = 32
+
+
+class UserSerializer(Protocol[UP]):
+    """Protocol that user serializers of the shared memory cache should follow."""
+
+    def dumps(self, user: UP) -> bytes:
+        """Serialize a user."""
+
+    def loads(self, data: bytes) -> UP:
+        """Deserialize a user."""
+
+
+class PickleUserSerializer:
+    """Serialize users with `pickle`."""
+
+    def dumps(self, user: Any) -> bytes:
+        return pickle.dumps(user, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+def _hash_key(key: bytes) -> int:
+    # Python's hash() is salted per process: use a stable one.
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") or 1
+
+
+class SharedMemoryUserCache(BaseUserCache[UP, ID]):
+    """
+    User cache shared by the processes of a host, in a memory-mapped file.
+
+    The file is a hash table of fixed-size slots, indexed by user id.
+    A user is stored in one of the `probe` slots following the hash of its id;
+    when they are all taken, the one expiring first is evicted.
+
+    Each slot is versioned: writers make the version odd while they
+    write the slot, so readers detect and discard torn reads without locking.
+    Writers of different processes are serialized by a lock on the slot.
+
+    Only lookups by id are supported: lookups by e-mail or
+    OAuth account always miss.
+
+    :param path: Path of the memory-mapped file, preferably on a tmpfs
+    like `/dev/shm`. It's created if it doesn't exist. It can't be a symlink,
+    and should be owned by the current user, without permissions for others.
+    :param slots: Number of slots.
+    :param slot_size: Size in bytes of a slot.
+    Users whose serialization doesn't fit aren't cached.
+    :param ttl_seconds: Number of seconds a user is kept in the cache.
+    :param probe: Number of slots where a user may be stored.
+    :param serializer: Object serializing the users to bytes, and back.
+    Defaults to `UserSnapshotSerializer`: cached users are `UserSnapshot`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 65536,
+        slot_size: int = 512,
+        ttl_seconds: float = 60.0,
+        probe: int = 8,
+        serializer: Optional[UserSerializer[UP]] = None,
+        read_retries: int = 3,
+    ):
+        if slot_size <= SLOT_DATA_OFFSET:
+            raise ValueError(f"slot_size should be greater than {SLOT_DATA_OFFSET}.")
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.ttl_seconds = ttl_seconds
+        self.probe = min(probe, slots)
+        self.serializer: UserSerializer[UP] = serializer or cast(
+            UserSerializer[UP], UserSnapshotSerializer()
+        )
+        self.read_retries = read_retries
+        self.stats = CacheStats()
+
+        size = HEADER_SIZE + slots * slot_size
+        # Don't follow a symlink planted by another user, e.g. in /dev/shm
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0)
+        self._fd = os.open(path, flags, 0o600)
+        try:
+            file_stat = os.fstat(self._fd)
+            if (
+                not stat.S_ISREG(file_stat.st_mode)
+                or file_stat.st_mode & 0o077
+                or (hasattr(os, "getuid") and file_stat.st_uid != os.getuid())
+            ):
+                raise ValueError(
+                    f"{path} should be a regular file owned by the current user, "
+                    "and not accessible by others."
+                )
+            current_size = file_stat.st_size
+            if current_size == 0:
+                os.ftruncate(self._fd, size)
+            elif current_size != size:
+                raise ValueError(
+                    f"{path} is {current_size} bytes long, expected {size} bytes."
+                )
+            self._mmap = mmap.mmap(self._fd, size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+        magic, file_slots, file_slot_size = HEADER.unpack_from(self._mmap, 0)
+        if magic == b"\x00" * len(MAGIC):
+            # A zero-filled file is a valid empty table.
+            HEADER.pack_into(self._mmap, 0, MAGIC, slots, slot_size)
+        elif (magic, file_slots, file_slot_size) != (MAGIC, slots, slot_size):
+            self.close()
+            raise ValueError(f"{path} has an incompatible layout.")
+
+    def close(self) -> None:
+        """Unmap the file. It's not removed, as other processes may use it."""
+        self._mmap.close()
+        os.close(self._fd)
+
+    async def get(self, id: ID) -> Optional[UP]:
+        key = self._encode_key(id)
+        key_hash = _hash_key(key)
+        now = time.time()
+        for index in self._probe_indexes(key_hash):
+            entry = self._read(index)
+            if entry is None:
+                continue
+            entry_hash, expires_at, entry_key, value = entry
+            if entry_hash == key_hash and entry_key == key and expires_at > now:
+                self.stats.hits += 1
+                return self.serializer.loads(value)
+        self.stats.misses += 1
+        return None
+
+    async def get_by_email(self, email: str) -> Optional[UP]:
+        self.stats.misses += 1
+        return None
+
+    async def get_by_oauth_account(self, oauth: str, account_id: str) -> Optional[UP]:
+        self.stats.misses += 1
+        return None
+
+    async def set(self, user: UP, *, oauth_key: Optional[OAuthKey] = None) -> None:
+        key = self._encode_key(user.id)
+        value = self.serializer.dumps(user)
+        if SLOT_DATA_OFFSET + len(key) + len(value) > self.slot_size:
+            return
+        key_hash = _hash_key(key)
+        now = time.time()
+        index = self._find_slot(key_hash, key, now)
+        if index is not None:
+            self._write(index, key_hash, now + self.ttl_seconds, key, value)
+
+    async def invalidate(self, user: UP) -> None:
+        key = self._encode_key(user.id)
+        key_hash = _hash_key(key)
+        for index in self._probe_indexes(key_hash):
+            entry = self._read(index)
+            # A slot being written may hold this user: empty it too.
+            if entry is None or (entry[0] == key_hash and entry[2] == key):
+                self._write(index, 0, 0.0, b"", b"")
+
+    async def clear(self) -> None:
+        for index in range(self.slots):
+            self._write(index, 0, 0.0, b"", b"")
+
+    def _encode_key(self, id: Any) -> bytes:
+        return str(id).encode("utf-8")
+
+    def _probe_indexes(self, key_hash: int) -> Iterator[int]:
+        start = key_hash % self.slots
+        for i in range(self.probe):
+            yield (start + i) % self.slots
+
+    def _find_slot(self, key_hash: int, key: bytes, now: float) -> Optional[int]:
+        """
+        Find the slot where to store a key.
+
+        :return: The slot already holding the key if any, else a free or expired
+        slot, else the slot expiring first. `None` if every slot is being written.
+        """
+        target: Optional[int] = None
+        target_expires_at = float("inf")
+        for index in self._probe_indexes(key_hash):
+            entry = self._read(index)
+            if entry is None:
+                continue
+            entry_hash, expires_at, entry_key, _ = entry
+            if entry_hash == key_hash and entry_key == key:
+                return index
+            if entry_hash == 0 or expires_at <= now:
+                expires_at = float("-inf")
+            if expires_at < target_expires_at:
+                target, target_expires_at = index, expires_at
+        if target is not None and target_expires_at != float("-inf"):
+            self.stats.evictions += 1
+        return target
+
+    def _offset(self, index: int) -> int:
+        return HEADER_SIZE + index * self.slot_size
+
+    def _read(self, index: int) -> Optional[Tuple[int, float, bytes, bytes]]:
+        """
+        Read a slot without locking.
+
+        :return: The key hash, expiration timestamp, key and value of the slot,
+        or `None` if it's being written.
+        """
+        offset = self._offset(index)
+        end = offset + self.slot_size
+        for _ in range(self.read_retries):
+            data = self._mmap[offset:end]
+            (version,) = SLOT_VERSION.unpack_from(self._mmap, offset)
+            (copied_version,) = SLOT_VERSION.unpack_from(data)
+            if version % 2 == 1 or version != copied_version:
+                continue
+            _, key_hash, expires_at, key_length, value_length = SLOT_HEADER.unpack_from(
+                data
+            )
+            key_end = SLOT_DATA_OFFSET + key_length
+            value_end = key_end + value_length
+            return (
+                key_hash,
+                expires_at,
+                data[SLOT_DATA_OFFSET:key_end],
+                data[key_end:value_end],
+            )
+        return None
+
+    def _write(
+        self, index: int, key_hash: int, expires_at: float, key: bytes, value: bytes
+    ) -> None:
+        offset = self._offset(index)
+        with self._lock(offset):
+            (version,) = SLOT_VERSION.unpack_from(self._mmap, offset)
+            # An odd version is left by a writer which crashed: skip it.
+            version += version % 2
+            SLOT_VERSION.pack_into(self._mmap, offset, version + 1)
+            SLOT_HEADER.pack_into(
+                self._mmap,
+                offset,
+                version + 1,
+                key_hash,
+                expires_at,
+                len(key),
+                len(value),
+            )
+            key_start = offset + SLOT_DATA_OFFSET
+            value_start = key_start + len(key)
+            value_end = value_start + len(value)
+            self._mmap[key_start:value_start] = key
+            self._mmap[value_start:value_end] = value
+            SLOT_VERSION.pack_into(self._mmap, offset, version + 2)
+
+    @contextlib.contextmanager
+    def _lock(self, offset: int) -> Iterator[None]:
+        if fcntl is None:  # pragma: no cover
+            yield
+            return
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot_size, offset)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
@@ -0,0 +1,292 @@
+import asyncio
+import functools
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from fastapi_users.db.base import (
+    BaseUserDatabase,
+    UserFilter,
+    _get_own_oauth_account,
+    _get_own_user,
+    _get_own_users,
+)
+from fastapi_users.db.resilience import GetBackgroundUserDB
+from fastapi_users.models import ID, OAP, UOAP, UP
+from fastapi_users.snapshot import UserSnapshot
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing the same key.
+
+    The first caller of a key starts the call; the callers arriving while
+    it's in flight wait for the same result, or the same exception.
+
+    The call runs in its own task: cancelling a caller waiting for it
+    doesn't cancel it for the others.
+
+    :param get_background_user_db: Optional callable returning an async context
+    manager yielding a database adapter, used by `SingleFlightUserDatabase`
+    to perform the coalesced lookups. Without it, they are performed with
+    the adapter of the first caller.
+    :attribute coalesced: Number of calls which waited for an in-flight one.
+    """
+
+    def __init__(self, get_background_user_db: Optional[GetBackgroundUserDB] = None):
+        self.get_background_user_db = get_background_user_db
+        self.coalesced = 0
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[T]], shield: bool = True
+    ) -> T:
+        """
+        Call `fn`, unless a call with the same key is already in flight.
+
+        :param key: Key identifying the call.
+        :param fn: Coroutine function to call.
+        :param shield: If False, cancelling the caller starting the call cancels
+        it, e.g. because it uses the database session of this caller.
+        The callers waiting for it then start a new one. Defaults to True.
+        :return: The result of the call.
+        """
+        while True:
+            call = self._calls.get(key)
+            if call is None:
+                call = asyncio.ensure_future(fn())
+                self._calls[key] = call
+                call.add_done_callback(functools.partial(self._done, key))
+                return await (asyncio.shield(call) if shield else call)
+            self.coalesced += 1
+            # Unlike shield, returns once the call is cancelled
+            await asyncio.wait({call})
+            if not call.cancelled():
+                return call.result()
+
+    def forget(self, key: Hashable) -> None:
+        """
+        Make the next call with this key start a new call.
+
+        Callers already waiting for the in-flight call still get its result.
+
+        :param key: Key identifying the call.
+        """
+        self._calls.pop(key, None)
+
+    def _done(self, key: Hashable, call: "asyncio.Future[Any]") -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved if every caller was cancelled.
+        if not call.cancelled():
+            call.exception()
+
+
+class SingleFlightUserDatabase(BaseUserDatabase[UP, ID]):
+    """
+    Database adapter wrapper coalescing concurrent identical user lookups.
+
+    Concurrent calls to `get`, `get_by_email` or `get_by_oauth_account`
+    with the same arguments issue a single query. It's performed with an adapter
+    of the `get_background_user_db` of the group, if set. Otherwise, it's
+    performed with the wrapped adapter of the first caller, and cancelled along
+    with it. Their result may thus come from another adapter: the users
+    passed to the write methods are fetched again with the wrapped adapter.
+
+    Any other attribute is looked up on the wrapped adapter.
+
+    :param user_db: Database adapter instance to wrap.
+    :param group: Single-flight group, usually shared by the whole process.
+    """
+
+    def __init__(self, user_db: BaseUserDatabase[UP, ID], group: SingleFlight):
+        self.user_db = user_db
+        self.group = group
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.user_db, name)
+
+    async def get(self, id: ID) -> Optional[UP]:
+        return await self._do(("get", id), lambda user_db: user_db.get(id))
+
+    async def get_core(self, id: ID) -> Optional[UP]:
+        return await self._do(("get_core", id), lambda user_db: user_db.get_core(id))
+
+    async def get_auth_view(self, id: ID) -> Optional[UserSnapshot]:
+        return await self._do(
+            ("get_auth_view", id), lambda user_db: user_db.get_auth_view(id)
+        )
+
+    async def get_full(self, id: ID) -> Optional[UP]:
+        return await self.user_db.get_full(id)
+
+    async def get_by_email(self, email: str) -> Optional[UP]:
+        return await self._do(
+            ("get_by_email", email.lower()),
+            lambda user_db: user_db.get_by_email(email),
+        )
+
+    async def get_by_oauth_account(self, oauth: str, account_id: str) -> Optional[UP]:
+        return await self._do(
+            ("get_by_oauth_account", oauth, account_id),
+            lambda user_db: user_db.get_by_oauth_account(oauth, account_id),
+        )
+
+    async def create(self, create_dict: Dict[str, Any]) -> UP:
+        user = await self.user_db.create(create_dict)
+        self._forget(user)
+        return user
+
+    async def update(self, user: UP, update_dict: Dict[str, Any]) -> UP:
+        self._forget(user)
+        try:
+            user = await _get_own_user(self.user_db, user)
+            return await self.user_db.update(user, update_dict)
+        finally:
+            self._forget(user)
+
+    async def delete(self, user: UP) -> None:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            await self.user_db.delete(user)
+        finally:
+            self._forget(user)
+
+    async def get_many(self, ids: Sequence[ID]) -> List[UP]:
+        return await self.user_db.get_many(ids)
+
+    async def get_many_full(self, ids: Sequence[ID]) -> List[UP]:
+        return await self.user_db.get_many_full(ids)
+
+    async def get_many_by_email(self, emails: Sequence[str]) -> List[UP]:
+        return await self.user_db.get_many_by_email(emails)
+
+    async def paginate(
+        self,
+        filter: Optional[UserFilter] = None,
+        after: Optional[ID] = None,
+        limit: int = 100,
+    ) -> List[UP]:
+        return await self.user_db.paginate(filter, after, limit)
+
+    async def stream(
+        self, filter: Optional[UserFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[UP]:
+        async for user in self.user_db.stream(filter, batch_size):
+            yield user
+
+    async def create_many(self, create_dicts: Sequence[Dict[str, Any]]) -> List[UP]:
+        users = await self.user_db.create_many(create_dicts)
+        for user in users:
+            self._forget(user)
+        return users
+
+    async def update_many(
+        self, users: Sequence[UP], update_dict: Dict[str, Any]
+    ) -> List[UP]:
+        for user in users:
+            self._forget(user)
+        try:
+            users = await _get_own_users(self.user_db, users)
+            return await self.user_db.update_many(users, update_dict)
+        finally:
+            for user in users:
+                self._forget(user)
+
+    async def delete_many(self, users: Sequence[UP]) -> None:
+        try:
+            users = await _get_own_users(self.user_db, users)
+            await self.user_db.delete_many(users)
+        finally:
+            for user in users:
+                self._forget(user)
+
+    async def load_oauth_accounts(
+        self: "SingleFlightUserDatabase[UOAP, ID]", user: UOAP
+    ) -> UOAP:
+        user = await _get_own_user(self.user_db, user)
+        return await self.user_db.load_oauth_accounts(user)
+
+    async def add_oauth_account(
+        self: "SingleFlightUserDatabase[UOAP, ID]",
+        user: UOAP,
+        create_dict: Dict[str, Any],
+    ) -> UOAP:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            return await self.user_db.add_oauth_account(user, create_dict)
+        finally:
+            self._forget(user)
+
+    async def update_oauth_account(
+        self: "SingleFlightUserDatabase[UOAP, ID]",
+        user: UOAP,
+        oauth_account: OAP,
+        update_dict: Dict[str, Any],
+    ) -> UOAP:
+        try:
+            user = await _get_own_user(self.user_db, user)
+            oauth_account = _get_own_oauth_account(user, oauth_account)
+            return await self.user_db.update_oauth_account(
+                user, oauth_account, update_dict
+            )
+        finally:
+            self._forget(user)
+
+    async def upsert_oauth_account(
+        self: "SingleFlightUserDatabase[UOAP, ID]",
+        oauth_name: str,
+        account_id: str,
+        update_dict: Dict[str, Any],
+    ) -> Optional[UOAP]:
+        user = await self.user_db.upsert_oauth_account(
+            oauth_name, account_id, update_dict
+        )
+        if user is not None:
+            self._forget(user)
+        return user
+
+    async def _do(
+        self,
+        key: Hashable,
+        fetch: Callable[[BaseUserDatabase[UP, ID]], Awaitable[T]],
+    ) -> T:
+        get_background_user_db = self.group.get_background_user_db
+        if get_background_user_db is None:
+            # Bound to the session of this request: cancelled along with it
+            return await self.group.do(key, lambda: fetch(self.user_db), shield=False)
+
+        async def background_fetch() -> T:
+            async with get_background_user_db() as background_user_db:
+                return await fetch(background_user_db)
+
+        return await self.group.do(key, background_fetch)
+
+    def _forget(self, user: UP) -> None:
+        """Make the lookups following a write see its result."""
+        self.group.forget(("get", user.id))
+        self.group.forget(("get_core", user.id))
+        self.group.forget(("get_auth_view", user.id))
+        self.group.forget(("get_by_email", user.email.lower()))
+        for oauth_account in getattr(user, "oauth_accounts", None) or []:
+            self.group.forget(
+                (
+                    "get_by_oauth_account",
+                    oauth_account.oauth_name,
+                    oauth_account.account_id,
+                )
+            )
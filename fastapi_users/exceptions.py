@@ -13,6 +13,10 @@ class UserAlreadyExists(FastAPIUsersException):
     pass
 
 
+class DuplicateUserEmail(FastAPIUsersException):
+    """Raised by database adapters when the e-mail unique constraint is violated."""
+
+
 class UserNotExists(FastAPIUsersException):
     pass
 
@@ -36,3 +40,11 @@ class InvalidResetPasswordToken(FastAPIUsersException):
 class InvalidPasswordException(FastAPIUsersException):
     def __init__(self, reason: Any) -> None:
         self.reason = reason
+
+
+class InvalidHashedPasswordException(FastAPIUsersException):
+    """Raised when an imported password hash can't be verified."""
+
+
+class UserDatabaseUnavailable(FastAPIUsersException):
+    pass
@@ -0,0 +1,121 @@
+import csv
+import datetime
+import enum
+import io
+import json
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+
+from fastapi_users import schemas
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+# Spreadsheet software evaluates cells starting with those as formulas
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return str(value)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+class UserExportSerializer:
+    """
+    Serialize users to NDJSON or CSV, by chunks.
+
+    The exported fields are computed once from the user schema: its scalar
+    fields are read directly on the rows, without validating a schema
+    instance for each of them. Nested fields, like the OAuth accounts,
+    are not exported.
+
+    In CSV, text values starting like a formula are prefixed with a quote,
+    so that spreadsheet software doesn't evaluate them.
+
+    :param user_schema: Pydantic schema of a public user.
+    """
+
+    def __init__(self, user_schema: Type[schemas.U]):
+        self.fields: List[str] = [
+            field.name
+            for field in user_schema.__fields__.values()
+            if field.shape == SHAPE_SINGLETON
+            and not (
+                isinstance(field.type_, type) and issubclass(field.type_, BaseModel)
+            )
+        ]
+        self._encode_json: Callable[[Any], str] = json.JSONEncoder(
+            default=_default, separators=(",", ":"), ensure_ascii=False
+        ).encode
+
+    async def stream(
+        self,
+        rows: AsyncIterator[Dict[str, Any]],
+        format: ExportFormat,
+        chunk_size: int = 1000,
+        is_disconnected: Optional[Callable[[], Any]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Serialize rows, yielding chunks of `chunk_size` rows.
+
+        :param rows: Async iterator of dictionaries holding the exported fields.
+        :param format: Export format.
+        :param chunk_size: Number of rows per chunk.
+        :param is_disconnected: Optional coroutine function returning
+        whether the client is gone. It's checked before each chunk:
+        the iteration stops if it returns `True`.
+        """
+        csv_buffer = io.StringIO()
+        csv_writer = csv.writer(csv_buffer, lineterminator="\n")
+        chunk: List[str] = []
+
+        if format == ExportFormat.CSV:
+            csv_writer.writerow(self.fields)
+            chunk.append(self._flush(csv_buffer))
+
+        async for row in rows:
+            if format == ExportFormat.CSV:
+                csv_writer.writerow([_csv_value(row[field]) for field in self.fields])
+                chunk.append(self._flush(csv_buffer))
+            else:
+                chunk.append(self._encode_json(row) + "\n")
+
+            if len(chunk) >= chunk_size:
+                if is_disconnected is not None and await is_disconnected():
+                    return
+                yield "".join(chunk)
+                chunk = []
+
+        if chunk:
+            yield "".join(chunk)
+
+    @staticmethod
+    def _flush(buffer: io.StringIO) -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
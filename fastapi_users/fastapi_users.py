@@ -30,9 +30,20 @@ class FastAPIUsers(Generic[models.UP, models.ID]):
     :param get_user_manager: Dependency callable getter to inject the
     user manager class instance.
     :param auth_backends: List of authentication backends.
-
+    :param lazy_user_manager: If `True`, the user manager is only resolved
+    by the authenticator when a token needs to be read. The routers then get
+    the same user manager as the authenticator. Defaults to `False`.
+    :param concurrent_backends: If `True`, the authenticator reads the tokens
+    with all the candidate backends concurrently, each with its own user manager.
+    Requires `lazy_user_manager`. Defaults to `False`.
+
+    :attribute get_user_manager: Dependency callable to inject the user manager
+    used by the routers.
     :attribute current_user: Dependency callable getter to inject authenticated user
     with a specific set of parameters.
+    :attribute middleware_user: Dependency callable getter to inject the user
+    authenticated by the `AuthenticationMiddleware`
+    with a specific set of parameters.
     """
 
     authenticator: Authenticator
@@ -41,10 +52,21 @@ class FastAPIUsers(Generic[models.UP, models.ID]):
         self,
         get_user_manager: UserManagerDependency[models.UP, models.ID],
         auth_backends: Sequence[AuthenticationBackend],
+        *,
+        lazy_user_manager: bool = False,
+        concurrent_backends: bool = False,
     ):
-        self.authenticator = Authenticator(auth_backends, get_user_manager)
+        self.authenticator = Authenticator(
+            auth_backends,
+            get_user_manager,
+            lazy_user_manager=lazy_user_manager,
+            concurrent_backends=concurrent_backends,
+        )
         self.get_user_manager = get_user_manager
+        if lazy_user_manager:
+            self.get_user_manager = self.authenticator.connection_user_manager()
         self.current_user = self.authenticator.current_user
+        self.middleware_user = self.authenticator.middleware_user
 
     def get_register_router(
         self, user_schema: Type[schemas.U], user_create_schema: Type[schemas.UC]
@@ -150,6 +172,15 @@ class FastAPIUsers(Generic[models.UP, models.ID]):
         user_schema: Type[schemas.U],
         user_update_schema: Type[schemas.UU],
         requires_verification: bool = False,
+        max_page_size: int = 100,
+        export_batch_size: int = 1000,
+        user_import_schema: Type[schemas.BaseUserImport] = schemas.BaseUserImport,
+        import_batch_size: int = 500,
+        max_batch_size: int = 100,
+        enable_list: bool = False,
+        enable_export: bool = False,
+        enable_import: bool = False,
+        enable_batch: bool = False,
     ) -> APIRouter:
         """
         Return a router with routes to manage users.
@@ -158,6 +189,26 @@ class FastAPIUsers(Generic[models.UP, models.ID]):
         :param user_update_schema: Pydantic schema for updating a user.
         :param requires_verification: Whether the endpoints
         require the users to be verified or not. Defaults to False.
+        :param max_page_size: Maximum number of users returned
+        by the listing route. Defaults to 100.
+        :param export_batch_size: Number of users fetched per database query
+        and sent per chunk by the export route. Defaults to 1000.
+        :param user_import_schema: Pydantic schema of a user
+        to import. Defaults to `BaseUserImport`.
+        :param import_batch_size: Number of users created at once
+        by the import route. Defaults to 500.
+        :param max_batch_size: Maximum number of ids accepted
+        by the batch routes. Defaults to 100.
+        :param enable_list: Whether to add the route listing the users.
+        It requires the `paginate` method of the database adapter.
+        Defaults to False.
+        :param enable_export: Whether to add the route exporting the users.
+        It requires the `paginate` method of the database adapter.
+        Defaults to False.
+        :param enable_import: Whether to add the route importing users.
+        Defaults to False.
+        :param enable_batch: Whether to add the routes getting, updating and
+        deleting several users at once. Defaults to False.
         """
         return get_users_router(
             self.get_user_manager,
@@ -165,4 +216,13 @@ class FastAPIUsers(Generic[models.UP, models.ID]):
             user_update_schema,
             self.authenticator,
             requires_verification,
+            max_page_size,
+            export_batch_size,
+            user_import_schema,
+            import_batch_size,
+            max_batch_size,
+            enable_list=enable_list,
+            enable_export=enable_export,
+            enable_import=enable_import,
+            enable_batch=enable_batch,
         )
@@ -0,0 +1,64 @@
+import os
+import re
+import time
+import uuid
+
+# Crockford's base32
+ULID_ALPHABET = b"0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# Encode 10 bits at once: 130 bits take 13 lookups.
+_ULID_PAIRS = [
+    chr(first) + chr(second) for first in ULID_ALPHABET for second in ULID_ALPHABET
+]
+_ULID_PAIRS_SHIFTS = tuple(range(120, -10, -10))
+
+# 26 characters encode 130 bits: the first one is at most 7.
+ULID_REGEX = re.compile(r"[0-7][0-9A-HJKMNP-TV-Z]{25}")
+
+_VERSION_7 = 0x7 << 76
+_VARIANT_RFC_4122 = 0x2 << 62
+_VERSION_VARIANT_MASK = ~((0xF << 76) | (0x3 << 62))
+
+
+def _timestamp_and_randomness() -> int:
+    """Return a 48 bits timestamp in milliseconds followed by 80 random bits."""
+    return (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a UUID version 7.
+
+    Its first 48 bits are a Unix timestamp in milliseconds: ids generated later
+    are greater, so they're inserted at the end of the indexes.
+    Ids generated during the same millisecond are ordered randomly.
+    """
+    value = _timestamp_and_randomness() & _VERSION_VARIANT_MASK
+    return uuid.UUID(int=value | _VERSION_7 | _VARIANT_RFC_4122)
+
+
+def ulid() -> str:
+    """
+    Generate a ULID.
+
+    Like a UUID version 7, its first 48 bits are a Unix timestamp in milliseconds.
+    It's represented by 26 characters of Crockford's base32, which sort
+    in the same order as the ids.
+    """
+    value = _timestamp_and_randomness()
+    return "".join(
+        [_ULID_PAIRS[(value >> shift) & 0x3FF] for shift in _ULID_PAIRS_SHIFTS]
+    )
+
+
+def parse_ulid(value: str) -> str:
+    """
+    Validate a ULID.
+
+    :param value: The ULID, in any case.
+    :raises ValueError: The value is not a ULID.
+    :return: The ULID, in upper case.
+    """
+    ulid = value.upper()
+    if ULID_REGEX.fullmatch(ulid) is None:
+        raise ValueError(f"{value!r} is not a valid ULID.")
+    return ulid
@@ -1,20 +1,55 @@
+import asyncio
+import dataclasses
+import time
 import uuid
-from typing import Any, Dict, Generic, Optional, Union
+from concurrent.futures import Executor
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Union,
+    cast,
+)
 
 import jwt
 from fastapi import Request
 from fastapi.security import OAuth2PasswordRequestForm
 
 from fastapi_users import exceptions, models, schemas
-from fastapi_users.db import BaseUserDatabase
+from fastapi_users.bloom import EmailBloomFilter
+from fastapi_users.db import BaseUserDatabase, UserFilter
+from fastapi_users.ids import parse_ulid
 from fastapi_users.jwt import SecretType, decode_jwt, generate_jwt
 from fastapi_users.password import PasswordHelper, PasswordHelperProtocol
+from fastapi_users.snapshot import UserSnapshot
 from fastapi_users.types import DependencyCallable
 
 RESET_PASSWORD_TOKEN_AUDIENCE = "fastapi-users:reset"
 VERIFY_USER_TOKEN_AUDIENCE = "fastapi-users:verify"
 
 
+@dataclasses.dataclass
+class UserImportResult(Generic[models.UP]):
+    """
+    Outcome of the import of a user.
+
+    :param index: Position of the user in the imported users.
+    :param email: E-mail of the user.
+    :param user: The created user, if the import succeeded.
+    :param error: The reason why the user was not created, if it failed.
+    """
+
+    index: int
+    email: str
+    user: Optional[models.UP] = None
+    error: Optional[exceptions.FastAPIUsersException] = None
+
+
 class BaseUserManager(Generic[models.UP, models.ID]):
     """
     User management logic.
@@ -25,6 +60,22 @@ class BaseUserManager(Generic[models.UP, models.ID]):
     :attribute verification_token_secret: Secret to encode verification token.
     :attribute verification_token_lifetime_seconds: Lifetime of verification token.
     :attribute verification_token_audience: JWT audience of verification token.
+    :attribute password_hash_executor: Optional executor hashing the passwords.
+    Defaults to the event loop's default thread pool.
+    :attribute unique_email_constraint: Whether the database adapter enforces
+    the uniqueness of the e-mails, raising `DuplicateUserEmail`. If True, the e-mail
+    is not looked up before creating a user or changing its e-mail.
+    Defaults to False.
+    :attribute normalized_email_field: Optional name of a field of the user model
+    where the normalized e-mail is stored on creation and e-mail change.
+    Defaults to None.
+    :attribute auth_view: Whether the authentication strategies get the user
+    as a `UserSnapshot`, fetched with `get_auth_view`, instead of the full model.
+    Defaults to False.
+    :attribute email_filter: Optional filter of the registered e-mails, usually
+    shared by the whole process. E-mails it doesn't hold are not looked up
+    in database by `get_by_email_filtered`. Fill it with `build_email_filter`.
+    Defaults to None.
 
     :param user_db: Database adapter instance.
     """
@@ -37,6 +88,12 @@ class BaseUserManager(Generic[models.UP, models.ID]):
     verification_token_lifetime_seconds: int = 3600
     verification_token_audience: str = VERIFY_USER_TOKEN_AUDIENCE
 
+    password_hash_executor: Optional[Executor] = None
+    unique_email_constraint: bool = False
+    normalized_email_field: Optional[str] = None
+    auth_view: bool = False
+    email_filter: Optional[EmailBloomFilter] = None
+
     user_db: BaseUserDatabase[models.UP, models.ID]
     password_helper: PasswordHelperProtocol
 
@@ -76,6 +133,54 @@ class BaseUserManager(Generic[models.UP, models.ID]):
 
         return user
 
+    async def get_many(self, ids: Sequence[models.ID]) -> List[models.UP]:
+        """
+        Get several users by id.
+
+        :param ids: Ids. of the users to retrieve.
+        :return: The existing users, in the order of the ids.
+        Ids. of users that don't exist are skipped.
+        """
+        return await self.user_db.get_many(ids)
+
+    async def paginate(
+        self,
+        filter: Optional[UserFilter] = None,
+        after: Optional[models.ID] = None,
+        limit: int = 100,
+    ) -> List[models.UP]:
+        """
+        Get a page of users, ordered by id.
+
+        :param filter: Optional criteria the users should match.
+        :param after: Optional id of the last user of the previous page.
+        :param limit: Maximum number of users to return.
+        :return: The users, ordered by id.
+        """
+        return await self.user_db.paginate(filter, after, limit)
+
+    async def stream(
+        self,
+        filter: Optional[UserFilter] = None,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None,
+    ) -> AsyncIterator[Union[models.UP, Dict[str, Any]]]:
+        """
+        Iterate over the users, ordered by id, at constant memory.
+
+        Meant for background jobs like exports, reindexing or migrations.
+
+        :param filter: Optional criteria the users should match.
+        :param batch_size: Number of users fetched per database query.
+        :param fields: Optional names of the fields to keep. If set,
+        dictionaries holding only those fields are yielded instead of the users.
+        """
+        async for user in self.user_db.stream(filter, batch_size):
+            if fields is None:
+                yield user
+            else:
+                yield {field: getattr(user, field) for field in fields}
+
     async def get_by_email(self, user_email: str) -> models.UP:
         """
         Get a user by e-mail.
@@ -84,13 +189,147 @@ class BaseUserManager(Generic[models.UP, models.ID]):
         :raises UserNotExists: The user does not exist.
         :return: A user.
         """
-        user = await self.user_db.get_by_email(user_email)
+        user = await self.user_db.get_by_email(self.normalize_email(user_email))
+
+        if user is None:
+            raise exceptions.UserNotExists()
+
+        return user
+
+    async def get_by_email_filtered(self, user_email: str) -> models.UP:
+        """
+        Get a user by e-mail, unless `email_filter` doesn't hold it.
+
+        Only meant for the requests which don't tell whether the user exists:
+        login, forgot password and verification requests. A filter missing
+        the e-mails registered by other processes would make existence
+        or uniqueness checks wrong: use `get_by_email` for them.
+
+        :param user_email: E-mail of the user to retrieve.
+        :raises UserNotExists: The user does not exist.
+        :return: A user.
+        """
+        email_filter = self.email_filter
+        if email_filter is None:
+            return await self.get_by_email(user_email)
+
+        email = self.normalize_email(user_email)
+        if email_filter.is_absent(email):
+            # Take as long as a lookup not to tell which e-mails are registered
+            await asyncio.sleep(cast(float, email_filter.lookup_seconds))
+            user = None
+        else:
+            start = time.perf_counter()
+            user = await self.user_db.get_by_email(email)
+            email_filter.record_lookup(time.perf_counter() - start)
 
         if user is None:
             raise exceptions.UserNotExists()
 
         return user
 
+    async def build_email_filter(self, batch_size: int = 1000) -> None:
+        """
+        Fill `email_filter` with the e-mails of every user.
+
+        Call it once at startup: until then, every e-mail is looked up.
+        The e-mails of the users created or updated by the manager are added
+        to the filter as they go.
+
+        :param batch_size: Number of users fetched per database query.
+        """
+        if self.email_filter is None:
+            raise ValueError("email_filter is not set.")
+
+        async def emails() -> AsyncIterator[str]:
+            async for user in self.user_db.stream(batch_size=batch_size):
+                yield self.normalize_email(user.email)
+
+        await self.email_filter.build(emails())
+
+    async def get_core(self, id: models.ID) -> models.UP:
+        """
+        Get a user by id, without loading its relationships.
+
+        It's used by the authentication strategies: call `load_oauth_accounts`
+        if you need the OAuth accounts of the authenticated user.
+        If `auth_view` is True, the user is a `UserSnapshot`:
+        call `get_full_user` if you need the other fields of the model.
+
+        If `get` is overridden, e.g. to exclude soft-deleted users, and
+        `auth_view` is False, it's called instead, so that the authentication
+        follows the same rules.
+
+        :param id: Id. of the user to retrieve.
+        :raises UserNotExists: The user does not exist.
+        :return: A user.
+        """
+        user: Optional[models.UP]
+        if self.auth_view:
+            user = cast(Optional[models.UP], await self.user_db.get_auth_view(id))
+        elif type(self).get is not BaseUserManager.get:
+            return await self.get(id)
+        else:
+            user = await self.user_db.get_core(id)
+
+        if user is None:
+            raise exceptions.UserNotExists()
+
+        return user
+
+    async def get_full_user(self, user: models.UP) -> models.UP:
+        """
+        Get the full model of a user returned by `get_core`, `get` or `get_many`.
+
+        They return a `UserSnapshot` if `auth_view` is True or if the database
+        adapter caches snapshots: the model is then fetched with `get_full`,
+        bypassing the cache.
+
+        :param user: The user, possibly a `UserSnapshot`.
+        :raises UserNotExists: The user does not exist anymore.
+        :return: The user model. Users which are not a snapshot
+        are returned as is.
+        """
+        if not isinstance(user, UserSnapshot):
+            return user
+        model = await self.user_db.get_full(user.id)
+
+        if model is None:
+            raise exceptions.UserNotExists()
+
+        return model
+
+    async def get_full_users(self, users: Sequence[models.UP]) -> List[models.UP]:
+        """
+        Get the full models of several users, like `get_full_user`.
+
+        :param users: The users, possibly `UserSnapshot`.
+        :return: The user models, in the same order. Snapshots of users
+        which don't exist anymore are skipped.
+        """
+        snapshot_ids = [user.id for user in users if isinstance(user, UserSnapshot)]
+        if not snapshot_ids:
+            return list(users)
+        full_users = {
+            user.id: user for user in await self.user_db.get_many_full(snapshot_ids)
+        }
+        return [
+            full_users[user.id] if isinstance(user, UserSnapshot) else user
+            for user in users
+            if not isinstance(user, UserSnapshot) or user.id in full_users
+        ]
+
+    async def load_oauth_accounts(
+        self: "BaseUserManager[models.UOAP, models.ID]", user: models.UOAP
+    ) -> models.UOAP:
+        """
+        Load the OAuth accounts of a user retrieved with `get_core`.
+
+        :param user: The user.
+        :return: The user, with its OAuth accounts.
+        """
+        return await self.user_db.load_oauth_accounts(user)
+
     async def get_by_oauth_account(self, oauth: str, account_id: str) -> models.UP:
         """
         Get a user by OAuth account.
@@ -128,24 +367,137 @@ class BaseUserManager(Generic[models.UP, models.ID]):
         """
         await self.validate_password(user_create.password, user_create)
 
-        existing_user = await self.user_db.get_by_email(user_create.email)
-        if existing_user is not None:
-            raise exceptions.UserAlreadyExists()
-
         user_dict = (
             user_create.create_update_dict()
             if safe
             else user_create.create_update_dict_superuser()
         )
+        self._set_normalized_email(user_dict)
         password = user_dict.pop("password")
-        user_dict["hashed_password"] = self.password_helper.hash(password)
+        if self.unique_email_constraint:
+            user_dict["hashed_password"] = await self._hash_password(password)
+        else:
+            # Hash while the e-mail is looked up: the hash is dropped if it's taken
+            hashed_password = asyncio.ensure_future(self._hash_password(password))
+            try:
+                await self._check_email_available(user_create.email)
+                user_dict["hashed_password"] = await hashed_password
+            finally:
+                hashed_password.cancel()
 
-        created_user = await self.user_db.create(user_dict)
+        try:
+            created_user = await self.user_db.create(user_dict)
+        except exceptions.DuplicateUserEmail as e:
+            raise exceptions.UserAlreadyExists() from e
 
         await self.on_after_register(created_user, request)
 
         return created_user
 
+    async def create_many(
+        self,
+        user_creates: Sequence[schemas.UC],
+        safe: bool = False,
+        request: Optional[Request] = None,
+    ) -> List[models.UP]:
+        """
+        Create several users in database.
+
+        The e-mails are checked with a single query, the passwords are hashed
+        concurrently and the users are created at once.
+        If one of them is invalid, none is created.
+
+        Triggers the on_after_register_many handler on success.
+
+        :param user_creates: The UserCreate models to create.
+        :param safe: If True, sensitive values like is_superuser or is_verified
+        will be ignored during the creation, defaults to False.
+        :param request: Optional FastAPI request that
+        triggered the operation, defaults to None.
+        :raises UserAlreadyExists: A user already exists with the same e-mail,
+        or two users to create have the same e-mail.
+        :raises InvalidPasswordException: A password is invalid.
+        :return: The new users.
+        """
+        emails = set()
+        for user_create in user_creates:
+            await self.validate_password(user_create.password, user_create)
+            email = self.normalize_email(user_create.email)
+            if email in emails:
+                raise exceptions.UserAlreadyExists()
+            emails.add(email)
+
+        if not self.unique_email_constraint:
+            if await self.user_db.get_many_by_email(list(emails)):
+                raise exceptions.UserAlreadyExists()
+
+        user_dicts = [
+            (
+                user_create.create_update_dict()
+                if safe
+                else user_create.create_update_dict_superuser()
+            )
+            for user_create in user_creates
+        ]
+        for user_dict in user_dicts:
+            self._set_normalized_email(user_dict)
+        hashed_passwords = await asyncio.gather(
+            *(
+                self._hash_password(user_dict.pop("password"))
+                for user_dict in user_dicts
+            )
+        )
+        for user_dict, hashed_password in zip(user_dicts, hashed_passwords):
+            user_dict["hashed_password"] = hashed_password
+
+        try:
+            created_users = await self.user_db.create_many(user_dicts)
+        except exceptions.DuplicateUserEmail as e:
+            raise exceptions.UserAlreadyExists() from e
+
+        await self.on_after_register_many(created_users, request)
+
+        return created_users
+
+    async def import_users(
+        self,
+        user_imports: AsyncIterable[schemas.UI],
+        batch_size: int = 500,
+        safe: bool = False,
+        request: Optional[Request] = None,
+    ) -> AsyncIterator[UserImportResult[models.UP]]:
+        """
+        Import users by batches.
+
+        For each batch, the e-mails are checked with a single query,
+        the passwords are hashed concurrently and the users are created at once.
+
+        Triggers the on_after_import handler for each batch.
+
+        :param user_imports: Async iterable of the UserImport models to create.
+        :param batch_size: Number of users processed at once.
+        :param safe: If True, sensitive values like is_superuser or is_verified
+        will be ignored during the creation, defaults to False.
+        :param request: Optional FastAPI request that
+        triggered the operation, defaults to None.
+        :return: Async iterator of the outcome of each user, in the input order.
+        A user is not created if its password or its password hash is invalid,
+        or if a user already exists with the same e-mail. If the adapter raises
+        `DuplicateUserEmail` for a batch, its users are created one by one.
+        """
+        batch: List[schemas.UI] = []
+        index = 0
+        async for user_import in user_imports:
+            batch.append(user_import)
+            if len(batch) >= batch_size:
+                for result in await self._import_batch(batch, index, safe, request):
+                    yield result
+                index += len(batch)
+                batch = []
+        if batch:
+            for result in await self._import_batch(batch, index, safe, request):
+                yield result
+
     async def oauth_callback(
         self: "BaseUserManager[models.UOAP, models.ID]",
         oauth_name: str,
@@ -156,7 +508,7 @@ class BaseUserManager(Generic[models.UP, models.ID]):
         refresh_token: Optional[str] = None,
         request: Optional[Request] = None,
         *,
-        associate_by_email: bool = False
+        associate_by_email: bool = False,
     ) -> models.UOAP:
         """
         Handle the callback after a successful OAuth authentication.
@@ -181,6 +533,9 @@ class BaseUserManager(Generic[models.UP, models.ID]):
         triggered the operation, defaults to None
         :param associate_by_email: If True, any existing user with the same
         e-mail address will be associated to this user. Defaults to False.
+        :raises UserAlreadyExists: A user exists with the same e-mail
+        and `associate_by_email` is False, or the adapter raised
+        `DuplicateUserEmail` while creating the user.
         :return: A user.
         """
         oauth_account_dict = {
@@ -192,35 +547,34 @@ class BaseUserManager(Generic[models.UP, models.ID]):
             "refresh_token": refresh_token,
         }
 
+        # Update oauth
+        existing_user = await self.user_db.upsert_oauth_account(
+            oauth_name, account_id, oauth_account_dict
+        )
+        if existing_user is not None:
+            return existing_user
+
         try:
-            user = await self.get_by_oauth_account(oauth_name, account_id)
+            # Associate account
+            user = await self.get_by_email(account_email)
+            if not associate_by_email:
+                raise exceptions.UserAlreadyExists()
+            user = await self.user_db.add_oauth_account(user, oauth_account_dict)
         except exceptions.UserNotExists:
+            # Create account
+            password = self.password_helper.generate()
+            user_dict = {
+                "email": account_email,
+                "hashed_password": self.password_helper.hash(password),
+            }
+            self._set_normalized_email(user_dict)
             try:
-                # Associate account
-                user = await self.get_by_email(account_email)
-                if not associate_by_email:
-                    raise exceptions.UserAlreadyExists()
-                user = await self.user_db.add_oauth_account(user, oauth_account_dict)
-            except exceptions.UserNotExists:
-                # Create account
-                password = self.password_helper.generate()
-                user_dict = {
-                    "email": account_email,
-                    "hashed_password": self.password_helper.hash(password),
-                }
                 user = await self.user_db.create(user_dict)
-                user = await self.user_db.add_oauth_account(user, oauth_account_dict)
-                await self.on_after_register(user, request)
-        else:
-            # Update oauth
-            for existing_oauth_account in user.oauth_accounts:
-                if (
-                    existing_oauth_account.account_id == account_id
-                    and existing_oauth_account.oauth_name == oauth_name
-                ):
-                    user = await self.user_db.update_oauth_account(
-                        user, existing_oauth_account, oauth_account_dict
-                    )
+            except exceptions.DuplicateUserEmail as e:
+                # A user registered with the same e-mail meanwhile
+                raise exceptions.UserAlreadyExists() from e
+            user = await self.user_db.add_oauth_account(user, oauth_account_dict)
+            await self.on_after_register(user, request)
 
         return user
 
@@ -260,6 +614,7 @@ class BaseUserManager(Generic[models.UP, models.ID]):
             "refresh_token": refresh_token,
         }
 
+        user = await self.get_full_user(user)
         user = await self.user_db.add_oauth_account(user, oauth_account_dict)
 
         await self.on_after_update(user, {}, request)
@@ -444,6 +799,7 @@ class BaseUserManager(Generic[models.UP, models.ID]):
         triggered the operation, defaults to None.
         :return: The updated user.
         """
+        user = await self.get_full_user(user)
         if safe:
             updated_user_data = user_update.create_update_dict()
         else:
@@ -462,12 +818,81 @@ class BaseUserManager(Generic[models.UP, models.ID]):
 
         :param user: The user to delete.
         """
+        user = await self.get_full_user(user)
         await self.on_before_delete(user, request)
         await self.user_db.delete(user)
         await self.on_after_delete(user, request)
 
+    async def update_many(
+        self,
+        user_update: schemas.UU,
+        users: Sequence[models.UP],
+        safe: bool = False,
+        request: Optional[Request] = None,
+    ) -> List[models.UP]:
+        """
+        Apply the same update to several users.
+
+        The users are updated at once, unless the update contains a password,
+        which is hashed for each user.
+
+        Triggers the on_after_update_many handler on success.
+
+        :param user_update: The UserUpdate model containing
+        the changes to apply to the users.
+        :param users: The users to update. Snapshots are replaced by the full
+        models, users which don't exist anymore are skipped.
+        :param safe: If True, sensitive values like is_superuser or is_verified
+        will be ignored during the update, defaults to False
+        :param request: Optional FastAPI request that
+        triggered the operation, defaults to None.
+        :raises UserAlreadyExists: The update sets the e-mail of several users.
+        :return: The updated users.
+        """
+        users = await self.get_full_users(users)
+        if safe:
+            updated_user_data = user_update.create_update_dict()
+        else:
+            updated_user_data = user_update.create_update_dict_superuser()
+        updated_users = await self._update_many(users, updated_user_data)
+        await self.on_after_update_many(updated_users, updated_user_data, request)
+        return updated_users
+
+    async def delete_many(
+        self,
+        users: Sequence[models.UP],
+        request: Optional[Request] = None,
+    ) -> None:
+        """
+        Delete several users at once.
+
+        Triggers the on_before_delete_many and on_after_delete_many handlers.
+
+        :param users: The users to delete. Snapshots are replaced by the full
+        models, users which don't exist anymore are skipped.
+        :param request: Optional FastAPI request that
+        triggered the operation, defaults to None.
+        """
+        users = await self.get_full_users(users)
+        await self.on_before_delete_many(users, request)
+        await self.user_db.delete_many(users)
+        await self.on_after_delete_many(users, request)
+
+    def normalize_email(self, email: str) -> str:
+        """
+        Normalize an e-mail, so that equivalent e-mails are equal.
+
+        Every e-mail looked up in the database adapter is normalized,
+        and so is the one stored in `normalized_email_field`.
+        Defaults to lower case.
+
+        :param email: The e-mail to normalize.
+        :return: The normalized e-mail.
+        """
+        return email.lower()
+
     async def validate_password(
-        self, password: str, user: Union[schemas.UC, models.UP]
+        self, password: str, user: Union[schemas.UC, schemas.UI, models.UP]
     ) -> None:
         """
         Validate a password.
@@ -481,6 +906,21 @@ class BaseUserManager(Generic[models.UP, models.ID]):
         """
         return  # pragma: no cover
 
+    def validate_hashed_password(self, hashed_password: str) -> None:
+        """
+        Validate an imported password hash.
+
+        The hash has to be one the password helper can verify, i.e. a well-formed
+        hash of one of the schemes of its context. Password helpers without
+        an `identify` method, like custom ones, are trusted.
+
+        :param hashed_password: The password hash to validate.
+        :raises InvalidHashedPasswordException: The password hash is invalid.
+        """
+        identify = getattr(self.password_helper, "identify", None)
+        if identify is not None and identify(hashed_password) is None:
+            raise exceptions.InvalidHashedPasswordException()
+
     async def on_after_register(
         self, user: models.UP, request: Optional[Request] = None
     ) -> None:
@@ -599,6 +1039,88 @@ class BaseUserManager(Generic[models.UP, models.ID]):
         """
         return  # pragma: no cover
 
+    async def on_after_register_many(
+        self, users: Sequence[models.UP], request: Optional[Request] = None
+    ) -> None:
+        """
+        Perform logic after successful registration of several users.
+
+        Calls on_after_register for each user by default.
+        *You can overload this method to handle them at once.*
+
+        :param users: The registered users.
+        :param request: Optional FastAPI request that
+        triggered the operation, defaults to None.
+        """
+        for user in users:
+            await self.on_after_register(user, request)
+
+    async def on_after_import(
+        self, users: Sequence[models.UP], request: Optional[Request] = None
+    ) -> None:
+        """
+        Perform logic after a batch of users is imported.
+
+        Unlike the registration, it does nothing by default.
+
+        :param users: The imported users.
+        :param request: Optional FastAPI request that
+        triggered the operation, defaults to None.
+        """
+        return  # pragma: no cover
+
+    async def on_after_update_many(
+        self,
+        users: Sequence[models.UP],
+        update_dict: Dict[str, Any],
+        request: Optional[Request] = None,
+    ) -> None:
+        """
+        Perform logic after successful update of several users.
+
+        Calls on_after_update for each user by default.
+        *You can overload this method to handle them at once.*
+
+        :param users: The updated users.
+        :param update_dict: Dictionary with the updated user fields.
+        :param request: Optional FastAPI request that
+        triggered the operation, defaults to None.
+        """
+        for user in users:
+            await self.on_after_update(user, update_dict, request)
+
+    async def on_before_delete_many(
+        self, users: Sequence[models.UP], request: Optional[Request] = None
+    ) -> None:
+        """
+        Perform logic before the deletion of several users.
+
+        Calls on_before_delete for each user by default.
+        *You can overload this method to handle them at once.*
+
+        :param users: The users to be deleted.
+        :param request: Optional FastAPI request that
+        triggered the operation, defaults to None.
+        """
+        for user in users:
+            await self.on_before_delete(user, request)
+
+    async def on_after_delete_many(
+        self, users: Sequence[models.UP], request: Optional[Request] = None
+    ) -> None:
+        """
+        Perform logic after the deletion of several users.
+
+        Calls on_after_delete for each user by default.
+        *You can overload this method to handle them at once.*
+
+        :param users: The deleted users.
+        :param request: Optional FastAPI request that
+        triggered the operation, defaults to None.
+        """
+        for user in users:
+            await self.on_after_delete(user, request)
+
     async def authenticate(
         self, credentials: OAuth2PasswordRequestForm
     ) -> Optional[models.UP]:
@@ -610,7 +1132,7 @@ class BaseUserManager(Generic[models.UP, models.ID]):
         :param credentials: The user credentials.
         """
         try:
-            user = await self.get_by_email(credentials.username)
+            user = await self.get_by_email_filtered(credentials.username)
         except exceptions.UserNotExists:
             # Run the hasher to mitigate timing attack
             # Inspired from Django: https://code.djangoproject.com/ticket/20760
@@ -629,23 +1151,158 @@ class BaseUserManager(Generic[models.UP, models.ID]):
         return user
 
     async def _update(self, user: models.UP, update_dict: Dict[str, Any]) -> models.UP:
-        validated_update_dict = {}
-        for field, value in update_dict.items():
-            if field == "email" and value != user.email:
-                try:
-                    await self.get_by_email(value)
-                    raise exceptions.UserAlreadyExists()
-                except exceptions.UserNotExists:
+        hashed_password: Optional["asyncio.Future[str]"] = None
+        if "password" in update_dict:
+            await self.validate_password(update_dict["password"], user)
+            # Hash while the e-mail is looked up: the hash is dropped if it's taken
+            hashed_password = asyncio.ensure_future(
+                self._hash_password(update_dict["password"])
+            )
+
+        validated_update_dict: Dict[str, Any] = {}
+        try:
+            for field, value in update_dict.items():
+                if field == "email" and value != user.email:
+                    # Changing the case, for example, keeps the same address
+                    if self.normalize_email(value) != self.normalize_email(user.email):
+                        if not self.unique_email_constraint:
+                            try:
+                                await self.get_by_email(value)
+                                raise exceptions.UserAlreadyExists()
+                            except exceptions.UserNotExists:
+                                pass
+                        validated_update_dict["is_verified"] = False
                     validated_update_dict["email"] = value
-                    validated_update_dict["is_verified"] = False
-            elif field == "password":
-                await self.validate_password(value, user)
-                validated_update_dict["hashed_password"] = self.password_helper.hash(
-                    value
-                )
-            else:
-                validated_update_dict[field] = value
-        return await self.user_db.update(user, validated_update_dict)
+                    self._set_normalized_email(validated_update_dict)
+                elif field == "password":
+                    validated_update_dict["hashed_password"] = await cast(
+                        "asyncio.Future[str]", hashed_password
+                    )
+                else:
+                    validated_update_dict[field] = value
+        finally:
+            if hashed_password is not None:
+                hashed_password.cancel()
+        try:
+            return await self.user_db.update(user, validated_update_dict)
+        except exceptions.DuplicateUserEmail as e:
+            raise exceptions.UserAlreadyExists() from e
+
+    async def _update_many(
+        self, users: Sequence[models.UP], update_dict: Dict[str, Any]
+    ) -> List[models.UP]:
+        if "email" in update_dict and len(users) > 1:
+            raise exceptions.UserAlreadyExists()
+        if "email" in update_dict or "password" in update_dict:
+            return [await self._update(user, update_dict) for user in users]
+        return await self.user_db.update_many(users, update_dict)
+
+    async def _import_batch(
+        self,
+        user_imports: Sequence[schemas.UI],
+        start: int,
+        safe: bool,
+        request: Optional[Request],
+    ) -> List[UserImportResult[models.UP]]:
+        results: List[UserImportResult[models.UP]] = [
+            UserImportResult(start + i, user_import.email)
+            for i, user_import in enumerate(user_imports)
+        ]
+
+        # Position in the batch of the users to create, by e-mail
+        positions: Dict[str, int] = {}
+        for i, user_import in enumerate(user_imports):
+            email = self.normalize_email(user_import.email)
+            if email in positions:
+                results[i].error = exceptions.UserAlreadyExists()
+                continue
+            try:
+                if user_import.password is not None:
+                    await self.validate_password(user_import.password, user_import)
+                else:
+                    self.validate_hashed_password(
+                        cast(str, user_import.hashed_password)
+                    )
+            except (
+                exceptions.InvalidPasswordException,
+                exceptions.InvalidHashedPasswordException,
+            ) as e:
+                results[i].error = e
+                continue
+            positions[email] = i
+
+        existing_users = await self.user_db.get_many_by_email(list(positions))
+        for existing_user in existing_users:
+            i = positions.pop(self.normalize_email(existing_user.email))
+            results[i].error = exceptions.UserAlreadyExists()
+
+        user_dicts = [
+            (
+                user_imports[i].create_update_dict()
+                if safe
+                else user_imports[i].create_update_dict_superuser()
+            )
+            for i in positions.values()
+        ]
+        for user_dict in user_dicts:
+            self._set_normalized_email(user_dict)
+        passwords = [user_dict.pop("password", None) for user_dict in user_dicts]
+        hashed_passwords = iter(
+            await asyncio.gather(
+                *(self._hash_password(p) for p in passwords if p is not None)
+            )
+        )
+        for user_dict, password in zip(user_dicts, passwords):
+            if password is not None:
+                user_dict["hashed_password"] = next(hashed_passwords)
+
+        if user_dicts:
+            try:
+                created_users = await self.user_db.create_many(user_dicts)
+                for i, created_user in zip(positions.values(), created_users):
+                    results[i].user = created_user
+            except exceptions.DuplicateUserEmail:
+                # Concurrently created e-mails: find them one by one
+                created_users = []
+                for i, user_dict in zip(positions.values(), user_dicts):
+                    try:
+                        created_user = await self.user_db.create(user_dict)
+                    except exceptions.DuplicateUserEmail:
+                        results[i].error = exceptions.UserAlreadyExists()
+                    else:
+                        results[i].user = created_user
+                        created_users.append(created_user)
+            await self.on_after_import(created_users, request)
+
+        return results
+
+    def _set_normalized_email(self, user_dict: Dict[str, Any]) -> None:
+        """
+        Store the normalized e-mail of a user dictionary, if enabled.
+
+        It's also added to `email_filter`, before the user is written
+        so that it can't be missed by a concurrent lookup.
+        """
+        if "email" not in user_dict:
+            return
+        email = self.normalize_email(user_dict["email"])
+        if self.normalized_email_field is not None:
+            user_dict[self.normalized_email_field] = email
+        if self.email_filter is not None:
+            self.email_filter.add(email)
+
+    async def _check_email_available(self, email: str) -> None:
+        """Raise `UserAlreadyExists` if a user has this e-mail."""
+        existing_user = await self.user_db.get_by_email(self.normalize_email(email))
+        if existing_user is not None:
+            raise exceptions.UserAlreadyExists()
+
+    async def _hash_password(self, password: str) -> str:
+        """Hash a password in an executor, not to block the event loop."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.password_hash_executor, self.password_helper.hash, password
+        )
 
 
 class UUIDIDMixin:
@@ -658,6 +1315,42 @@ class UUIDIDMixin:
             raise exceptions.InvalidID() from e
 
 
+class UUID7IDMixin:
+    """
+    Parse UUID version 7 ids, generated with `fastapi_users.ids.uuid7`.
+
+    Since they start with a timestamp, new users are inserted at the end
+    of the primary key index instead of at random positions.
+    """
+
+    def parse_id(self, value: Any) -> uuid.UUID:
+        if not isinstance(value, uuid.UUID):
+            try:
+                value = uuid.UUID(value)
+            except (TypeError, ValueError, AttributeError) as e:
+                raise exceptions.InvalidID() from e
+        if value.version != 7:
+            raise exceptions.InvalidID()
+        return value
+
+
+class ULIDIDMixin:
+    """
+    Parse ULID ids, generated with `fastapi_users.ids.ulid`.
+
+    Ids are strings of 26 characters, in upper case. Like UUID version 7,
+    they start with a timestamp.
+    """
+
+    def parse_id(self, value: Any) -> str:
+        if not isinstance(value, str):
+            raise exceptions.InvalidID()
+        try:
+            return parse_ulid(value)
+        except ValueError as e:
+            raise exceptions.InvalidID() from e
+
+
 class IntegerIDMixin:
     def parse_id(self, value: Any) -> int:
         if isinstance(value, float):
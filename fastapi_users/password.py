@@ -1,5 +1,5 @@
 import sys
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 if sys.version_info < (3, 8):
     from typing_extensions import Protocol  # pragma: no cover
@@ -30,6 +30,14 @@ class PasswordHelper(PasswordHelperProtocol):
         else:
             self.context = context  # pragma: no cover
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # CryptContext is not picklable: send its configuration instead,
+        # e.g. to hash in a process pool.
+        return {"context": self.context.to_string()}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.context = CryptContext.from_string(state["context"])
+
     def verify_and_update(
         self, plain_password: str, hashed_password: str
     ) -> Tuple[bool, str]:
@@ -38,5 +46,22 @@ class PasswordHelper(PasswordHelperProtocol):
     def hash(self, password: str) -> str:
         return self.context.hash(password)
 
+    def identify(self, hashed_password: str) -> Optional[str]:
+        """
+        Identify the scheme of a password hash.
+
+        :param hashed_password: The password hash.
+        :return: The name of the scheme, or None if the hash is malformed
+        or doesn't belong to one of the schemes of the context.
+        """
+        scheme = self.context.identify(hashed_password)
+        if scheme is None:
+            return None
+        try:
+            self.context.handler(scheme).from_string(hashed_password)
+        except ValueError:
+            return None
+        return scheme
+
     def generate(self) -> str:
         return pwd.genword()
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Dict, Union
+from typing import Dict, List, Optional, Union
 
 from pydantic import BaseModel
 
@@ -13,6 +13,18 @@ class ErrorCodeReasonModel(BaseModel):
     reason: str
 
 
+class ImportErrorModel(BaseModel):
+    line: int
+    email: Optional[str]
+    code: str
+    reason: Optional[str]
+
+
+class ImportReportModel(BaseModel):
+    created: int
+    errors: List[ImportErrorModel]
+
+
 class ErrorCode(str, Enum):
     REGISTER_INVALID_PASSWORD = "REGISTER_INVALID_PASSWORD"
     REGISTER_USER_ALREADY_EXISTS = "REGISTER_USER_ALREADY_EXISTS"
@@ -25,3 +37,8 @@ class ErrorCode(str, Enum):
     VERIFY_USER_ALREADY_VERIFIED = "VERIFY_USER_ALREADY_VERIFIED"
     UPDATE_USER_EMAIL_ALREADY_EXISTS = "UPDATE_USER_EMAIL_ALREADY_EXISTS"
     UPDATE_USER_INVALID_PASSWORD = "UPDATE_USER_INVALID_PASSWORD"
+    LIST_USERS_INVALID_CURSOR = "LIST_USERS_INVALID_CURSOR"
+    IMPORT_USER_INVALID = "IMPORT_USER_INVALID"
+    IMPORT_USER_ALREADY_EXISTS = "IMPORT_USER_ALREADY_EXISTS"
+    IMPORT_USER_INVALID_PASSWORD = "IMPORT_USER_INVALID_PASSWORD"
+    IMPORT_USER_INVALID_HASHED_PASSWORD = "IMPORT_USER_INVALID_HASHED_PASSWORD"
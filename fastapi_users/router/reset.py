@@ -49,7 +49,7 @@ def get_reset_password_router(
         user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
     ):
         try:
-            user = await user_manager.get_by_email(email)
+            user = await user_manager.get_by_email_filtered(email)
         except exceptions.UserNotExists:
             return None
 
@@ -1,11 +1,36 @@
-from typing import Any, Type
+import collections
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple, Type
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError, conlist, create_model
 
 from fastapi_users import exceptions, models, schemas
 from fastapi_users.authentication import Authenticator
+from fastapi_users.db import UserFilter
+from fastapi_users.export import MEDIA_TYPES, ExportFormat, UserExportSerializer
 from fastapi_users.manager import BaseUserManager, UserManagerDependency
-from fastapi_users.router.common import ErrorCode, ErrorModel
+from fastapi_users.router.common import (
+    ErrorCode,
+    ErrorModel,
+    ImportErrorModel,
+    ImportReportModel,
+)
+from fastapi_users.snapshot import FIELDS as SNAPSHOT_FIELDS
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Split a stream of bytes in lines, numbered from 1."""
+    line_number = 0
+    remainder = b""
+    async for chunk in chunks:
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            line_number += 1
+            yield line_number, line
+    if remainder:
+        yield line_number + 1, remainder
 
 
 def get_users_router(
@@ -14,9 +39,31 @@ def get_users_router(
     user_update_schema: Type[schemas.UU],
     authenticator: Authenticator,
     requires_verification: bool = False,
+    max_page_size: int = 100,
+    export_batch_size: int = 1000,
+    user_import_schema: Type[schemas.BaseUserImport] = schemas.BaseUserImport,
+    import_batch_size: int = 500,
+    max_batch_size: int = 100,
+    enable_list: bool = False,
+    enable_export: bool = False,
+    enable_import: bool = False,
+    enable_batch: bool = False,
 ) -> APIRouter:
     """Generate a router with the authentication routes."""
     router = APIRouter()
+    users_page_schema = schemas.UsersPage[user_schema]  # type: ignore
+    users_batch_schema = schemas.UsersBatch[user_schema]  # type: ignore
+    batch_ids_field = (conlist(str, min_items=1, max_items=max_batch_size), ...)
+    users_batch_ids_schema: Any = create_model("UsersBatchIds", ids=batch_ids_field)
+    users_batch_update_schema: Any = create_model(
+        "UsersBatchUpdate", ids=batch_ids_field, update=(user_update_schema, ...)
+    )
+    export_serializer = UserExportSerializer(user_schema)
+    # The authentication strategies don't load the OAuth accounts, and only
+    # the fields of a snapshot if the user manager enables `auth_view`.
+    # Adapters caching snapshots also return them from `get` and `get_many`.
+    needs_oauth_accounts = "oauth_accounts" in user_schema.__fields__
+    needs_full_user = not set(user_schema.__fields__).issubset(SNAPSHOT_FIELDS)
 
     get_current_active_user = authenticator.current_user(
         active=True, verified=requires_verification
@@ -31,10 +78,369 @@ def get_users_router(
     ) -> models.UP:
         try:
             parsed_id = user_manager.parse_id(id)
-            return await user_manager.get(parsed_id)
+            user = await user_manager.get(parsed_id)
+            if needs_full_user:
+                user = await user_manager.get_full_user(user)
+            return user
         except (exceptions.UserNotExists, exceptions.InvalidID) as e:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND) from e
 
+    async def get_users_batch(
+        ids: List[str], user_manager: BaseUserManager[models.UP, models.ID]
+    ) -> Tuple[List[models.UP], List[str]]:
+        parsed_ids: Dict[str, models.ID] = {}
+        missing: List[str] = []
+        for id in dict.fromkeys(ids):
+            try:
+                parsed_ids[id] = user_manager.parse_id(id)
+            except exceptions.InvalidID:
+                missing.append(id)
+        users = await user_manager.get_many(list(parsed_ids.values()))
+        if needs_full_user:
+            users = await user_manager.get_full_users(users)
+        found_ids = {user.id for user in users}
+        missing += [
+            id for id, parsed_id in parsed_ids.items() if parsed_id not in found_ids
+        ]
+        return users, missing
+
+    list_router = APIRouter()
+
+    @list_router.get(
+        "/",
+        response_model=users_page_schema,
+        dependencies=[Depends(get_current_superuser)],
+        name="users:list_users",
+        responses={
+            status.HTTP_401_UNAUTHORIZED: {
+                "description": "Missing token or inactive user.",
+            },
+            status.HTTP_403_FORBIDDEN: {
+                "description": "Not a superuser.",
+            },
+            status.HTTP_400_BAD_REQUEST: {
+                "model": ErrorModel,
+                "content": {
+                    "application/json": {
+                        "examples": {
+                            ErrorCode.LIST_USERS_INVALID_CURSOR: {
+                                "summary": "The cursor is not a valid user id.",
+                                "value": {
+                                    "detail": ErrorCode.LIST_USERS_INVALID_CURSOR
+                                },
+                            },
+                        }
+                    }
+                },
+            },
+        },
+    )
+    async def list_users(
+        cursor: Optional[str] = None,
+        limit: int = Query(max_page_size, ge=1, le=max_page_size),
+        is_active: Optional[bool] = None,
+        is_verified: Optional[bool] = None,
+        is_superuser: Optional[bool] = None,
+        email_prefix: Optional[str] = None,
+        user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
+    ):
+        after: Optional[models.ID] = None
+        if cursor is not None:
+            try:
+                after = user_manager.parse_id(cursor)
+            except exceptions.InvalidID as e:
+                raise HTTPException(
+                    status.HTTP_400_BAD_REQUEST,
+                    detail=ErrorCode.LIST_USERS_INVALID_CURSOR,
+                ) from e
+
+        user_filter = UserFilter(
+            is_active=is_active,
+            is_verified=is_verified,
+            is_superuser=is_superuser,
+            email_prefix=email_prefix,
+        )
+        # Fetch one more user to know if there is a next page
+        users = await user_manager.paginate(user_filter, after, limit + 1)
+        next_cursor = str(users[limit - 1].id) if len(users) > limit else None
+        return users_page_schema(
+            items=[user_schema.from_orm(user) for user in users[:limit]],
+            next_cursor=next_cursor,
+        )
+
+    if enable_list:
+        router.include_router(list_router)
+
+    export_router = APIRouter()
+
+    @export_router.get(
+        "/export",
+        response_class=StreamingResponse,
+        dependencies=[Depends(get_current_superuser)],
+        name="users:export_users",
+        responses={
+            status.HTTP_200_OK: {
+                "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+                "description": "The users, one per line.",
+            },
+            status.HTTP_401_UNAUTHORIZED: {
+                "description": "Missing token or inactive user.",
+            },
+            status.HTTP_403_FORBIDDEN: {
+                "description": "Not a superuser.",
+            },
+        },
+    )
+    async def export_users(
+        request: Request,
+        format: ExportFormat = ExportFormat.NDJSON,
+        is_active: Optional[bool] = None,
+        is_verified: Optional[bool] = None,
+        is_superuser: Optional[bool] = None,
+        email_prefix: Optional[str] = None,
+        user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
+    ):
+        user_filter = UserFilter(
+            is_active=is_active,
+            is_verified=is_verified,
+            is_superuser=is_superuser,
+            email_prefix=email_prefix,
+        )
+        rows = user_manager.stream(
+            user_filter, export_batch_size, fields=export_serializer.fields
+        )
+        return StreamingResponse(
+            export_serializer.stream(
+                rows,  # type: ignore
+                format,
+                chunk_size=export_batch_size,
+                is_disconnected=request.is_disconnected,
+            ),
+            media_type=MEDIA_TYPES[format],
+            headers={
+                "Content-Disposition": f'attachment; filename="users.{format.value}"'
+            },
+        )
+
+    if enable_export:
+        router.include_router(export_router)
+
+    import_router = APIRouter()
+
+    @import_router.post(
+        "/import",
+        response_model=ImportReportModel,
+        dependencies=[Depends(get_current_superuser)],
+        name="users:import_users",
+        openapi_extra={
+            "requestBody": {
+                "content": {
+                    "application/x-ndjson": {
+                        "schema": user_import_schema.schema(),
+                    }
+                },
+                "description": "The users to import, one JSON object per line.",
+                "required": True,
+            }
+        },
+        responses={
+            status.HTTP_401_UNAUTHORIZED: {
+                "description": "Missing token or inactive user.",
+            },
+            status.HTTP_403_FORBIDDEN: {
+                "description": "Not a superuser.",
+            },
+        },
+    )
+    async def import_users(
+        request: Request,
+        user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
+    ):
+        errors: List[ImportErrorModel] = []
+        # Line numbers of the users being imported, in order
+        line_numbers: Deque[int] = collections.deque()
+
+        async def user_imports() -> AsyncIterator[schemas.BaseUserImport]:
+            async for line_number, line in _iter_lines(request.stream()):
+                if not line.strip():
+                    continue
+                try:
+                    user_import = user_import_schema.parse_raw(line)
+                except ValidationError as e:
+                    errors.append(
+                        ImportErrorModel(
+                            line=line_number,
+                            email=None,
+                            code=ErrorCode.IMPORT_USER_INVALID,
+                            reason=str(e),
+                        )
+                    )
+                    continue
+                line_numbers.append(line_number)
+                yield user_import
+
+        created = 0
+        async for result in user_manager.import_users(
+            user_imports(), import_batch_size, safe=False, request=request
+        ):
+            line_number = line_numbers.popleft()
+            if isinstance(result.error, exceptions.InvalidPasswordException):
+                errors.append(
+                    ImportErrorModel(
+                        line=line_number,
+                        email=result.email,
+                        code=ErrorCode.IMPORT_USER_INVALID_PASSWORD,
+                        reason=result.error.reason,
+                    )
+                )
+            elif isinstance(result.error, exceptions.InvalidHashedPasswordException):
+                errors.append(
+                    ImportErrorModel(
+                        line=line_number,
+                        email=result.email,
+                        code=ErrorCode.IMPORT_USER_INVALID_HASHED_PASSWORD,
+                        reason=None,
+                    )
+                )
+            elif result.error is not None:
+                errors.append(
+                    ImportErrorModel(
+                        line=line_number,
+                        email=result.email,
+                        code=ErrorCode.IMPORT_USER_ALREADY_EXISTS,
+                        reason=None,
+                    )
+                )
+            else:
+                created += 1
+
+        errors.sort(key=lambda error: error.line)
+        return ImportReportModel(created=created, errors=errors)
+
+    if enable_import:
+        router.include_router(import_router)
+
+    batch_router = APIRouter()
+
+    @batch_router.post(
+        "/batch/get",
+        response_model=users_batch_schema,
+        dependencies=[Depends(get_current_superuser)],
+        name="users:get_users_batch",
+        responses={
+            status.HTTP_401_UNAUTHORIZED: {
+                "description": "Missing token or inactive user.",
+            },
+            status.HTTP_403_FORBIDDEN: {
+                "description": "Not a superuser.",
+            },
+        },
+    )
+    async def get_users(
+        batch: users_batch_ids_schema,  # type: ignore
+        user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
+    ):
+        users, missing = await get_users_batch(batch.ids, user_manager)
+        return users_batch_schema(
+            items=[user_schema.from_orm(user) for user in users], missing=missing
+        )
+
+    @batch_router.post(
+        "/batch/patch",
+        response_model=users_batch_schema,
+        dependencies=[Depends(get_current_superuser)],
+        name="users:patch_users_batch",
+        responses={
+            status.HTTP_401_UNAUTHORIZED: {
+                "description": "Missing token or inactive user.",
+            },
+            status.HTTP_403_FORBIDDEN: {
+                "description": "Not a superuser.",
+            },
+            status.HTTP_400_BAD_REQUEST: {
+                "model": ErrorModel,
+                "content": {
+                    "application/json": {
+                        "examples": {
+                            ErrorCode.UPDATE_USER_EMAIL_ALREADY_EXISTS: {
+                                "summary": "A user with this email already exists.",
+                                "value": {
+                                    "detail": ErrorCode.UPDATE_USER_EMAIL_ALREADY_EXISTS
+                                },
+                            },
+                            ErrorCode.UPDATE_USER_INVALID_PASSWORD: {
+                                "summary": "Password validation failed.",
+                                "value": {
+                                    "detail": {
+                                        "code": ErrorCode.UPDATE_USER_INVALID_PASSWORD,
+                                        "reason": "Password should be"
+                                        "at least 3 characters",
+                                    }
+                                },
+                            },
+                        }
+                    }
+                },
+            },
+        },
+    )
+    async def update_users(
+        batch: users_batch_update_schema,  # type: ignore
+        request: Request,
+        user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
+    ):
+        users, missing = await get_users_batch(batch.ids, user_manager)
+        try:
+            if users:
+                users = await user_manager.update_many(
+                    batch.update, users, safe=False, request=request
+                )
+        except exceptions.InvalidPasswordException as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "code": ErrorCode.UPDATE_USER_INVALID_PASSWORD,
+                    "reason": e.reason,
+                },
+            )
+        except exceptions.UserAlreadyExists:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=ErrorCode.UPDATE_USER_EMAIL_ALREADY_EXISTS,
+            )
+        return users_batch_schema(
+            items=[user_schema.from_orm(user) for user in users], missing=missing
+        )
+
+    @batch_router.post(
+        "/batch/delete",
+        response_model=users_batch_schema,
+        dependencies=[Depends(get_current_superuser)],
+        name="users:delete_users_batch",
+        responses={
+            status.HTTP_401_UNAUTHORIZED: {
+                "description": "Missing token or inactive user.",
+            },
+            status.HTTP_403_FORBIDDEN: {
+                "description": "Not a superuser.",
+            },
+        },
+    )
+    async def delete_users(
+        batch: users_batch_ids_schema,  # type: ignore
+        request: Request,
+        user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
+    ):
+        users, missing = await get_users_batch(batch.ids, user_manager)
+        if users:
+            await user_manager.delete_many(users, request=request)
+        return users_batch_schema(
+            items=[user_schema.from_orm(user) for user in users], missing=missing
+        )
+
+    if enable_batch:
+        router.include_router(batch_router)
+
     @router.get(
         "/me",
         response_model=user_schema,
@@ -47,7 +453,12 @@ def get_users_router(
     )
     async def me(
         user: models.UP = Depends(get_current_active_user),
+        user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
     ):
+        if needs_full_user:
+            user = await user_manager.get_full_user(user)
+        if needs_oauth_accounts:
+            user = await user_manager.load_oauth_accounts(user)  # type: ignore
         return user_schema.from_orm(user)
 
     @router.patch(
@@ -96,6 +507,8 @@ def get_users_router(
             user = await user_manager.update(
                 user_update, user, safe=True, request=request
             )
+            if needs_oauth_accounts:
+                user = await user_manager.load_oauth_accounts(user)  # type: ignore
             return user_schema.from_orm(user)
         except exceptions.InvalidPasswordException as e:
             raise HTTPException(
@@ -25,7 +25,7 @@ def get_verify_router(
         user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
     ):
         try:
-            user = await user_manager.get_by_email(email)
+            user = await user_manager.get_by_email_filtered(email)
             await user_manager.request_verify(user, request)
         except (
             exceptions.UserNotExists,
@@ -1,8 +1,34 @@
-from typing import Generic, List, Optional, TypeVar
+from typing import Any, Dict, Generic, List, Optional, TypeVar
 
-from pydantic import BaseModel, EmailStr
+from pydantic import UUID1, BaseModel, EmailStr, root_validator
+from pydantic.generics import GenericModel
 
 from fastapi_users import models
+from fastapi_users.ids import ULID_REGEX, parse_ulid
+
+
+class UUID7(UUID1):
+    """UUID version 7 type, to use as the id type of the user schemas."""
+
+    _required_version = 7
+
+
+class ULID(str):
+    """ULID type, to use as the id type of the user schemas."""
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: Dict[str, Any]) -> None:
+        field_schema.update(type="string", format="ulid", pattern=ULID_REGEX.pattern)
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value: Any) -> str:
+        if not isinstance(value, str):
+            raise TypeError("string required")
+        return parse_ulid(value)
 
 
 class CreateUpdateDictModel(BaseModel):
@@ -43,6 +69,28 @@ class BaseUserCreate(CreateUpdateDictModel):
     is_verified: Optional[bool] = False
 
 
+class BaseUserImport(CreateUpdateDictModel):
+    """
+    Base model of an imported user.
+
+    Either a plain `password`, which will be hashed, or a `hashed_password`
+    computed by a compatible password helper should be set.
+    """
+
+    email: EmailStr
+    password: Optional[str]
+    hashed_password: Optional[str]
+    is_active: Optional[bool] = True
+    is_superuser: Optional[bool] = False
+    is_verified: Optional[bool] = False
+
+    @root_validator(skip_on_failure=True)
+    def check_password(cls, values):
+        if (values.get("password") is None) == (values.get("hashed_password") is None):
+            raise ValueError("Either password or hashed_password should be set.")
+        return values
+
+
 class BaseUserUpdate(CreateUpdateDictModel):
     password: Optional[str]
     email: Optional[EmailStr]
@@ -54,6 +102,21 @@ class BaseUserUpdate(CreateUpdateDictModel):
 U = TypeVar("U", bound=BaseUser)
 UC = TypeVar("UC", bound=BaseUserCreate)
 UU = TypeVar("UU", bound=BaseUserUpdate)
+UI = TypeVar("UI", bound=BaseUserImport)
+
+
+class UsersPage(GenericModel, Generic[U]):
+    """Page of users, with the cursor to pass to get the next one."""
+
+    items: List[U]
+    next_cursor: Optional[str] = None
+
+
+class UsersBatch(GenericModel, Generic[U]):
+    """Users of a batch operation, with the ids which didn't match any user."""
+
+    items: List[U]
+    missing: List[str]
 
 
 class BaseOAuthAccount(Generic[models.ID], BaseModel):
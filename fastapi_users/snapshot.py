@@ -0,0 +1,233 @@
+import struct
+import uuid
+from typing import Any, Dict, Generic, Tuple, Type
+
+from fastapi_users import models
+
+FORMAT_VERSION = 1
+
+# Format version, flags, id tag
+HEADER = struct.Struct("<BBB")
+LENGTH = struct.Struct("<H")
+INTEGER_ID = struct.Struct("<q")
+INTEGER_ID_MIN = -(2**63)
+INTEGER_ID_MAX = 2**63 - 1
+MAX_LENGTH = 2**16 - 1
+
+FLAG_ACTIVE = 1
+FLAG_SUPERUSER = 2
+FLAG_VERIFIED = 4
+
+TAG_UUID = 0
+TAG_INTEGER = 1
+TAG_STRING = 2
+
+FIELDS = ("id", "email", "hashed_password", "is_active", "is_superuser", "is_verified")
+
+
+class UserSnapshot(Generic[models.ID]):
+    """
+    Immutable and lightweight copy of the fields of `models.UserProtocol`.
+
+    It doesn't hold any reference to an ORM session, making it cheap to keep
+    in a cache and to serialize. It can be converted back to an ORM instance
+    with `to_model`.
+
+    Other fields of the user model are not copied.
+    """
+
+    __slots__ = FIELDS
+
+    id: models.ID
+    email: str
+    hashed_password: str
+    is_active: bool
+    is_superuser: bool
+    is_verified: bool
+
+    def __init__(
+        self,
+        id: models.ID,
+        email: str,
+        hashed_password: str,
+        is_active: bool = True,
+        is_superuser: bool = False,
+        is_verified: bool = False,
+    ) -> None:
+        _set = object.__setattr__
+        _set(self, "id", id)
+        _set(self, "email", email)
+        _set(self, "hashed_password", hashed_password)
+        _set(self, "is_active", is_active)
+        _set(self, "is_superuser", is_superuser)
+        _set(self, "is_verified", is_verified)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (type(self), self._astuple())
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, UserSnapshot):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __hash__(self) -> int:
+        return hash(self._astuple())
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(id={self.id!r}, email={self.email!r}, "
+            f"is_active={self.is_active!r}, is_superuser={self.is_superuser!r}, "
+            f"is_verified={self.is_verified!r})"
+        )
+
+    @classmethod
+    def from_user(cls, user: models.UserProtocol[models.ID]) -> "UserSnapshot":
+        """
+        Copy the fields of a user.
+
+        :param user: The user, usually an ORM instance.
+        :return: A user snapshot.
+        """
+        if isinstance(user, UserSnapshot):
+            return user
+        return cls(
+            user.id,
+            user.email,
+            user.hashed_password,
+            user.is_active,
+            user.is_superuser,
+            user.is_verified,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the fields as a dictionary."""
+        return dict(zip(FIELDS, self._astuple()))
+
+    def to_model(self, user_model: Type[models.UP]) -> models.UP:
+        """
+        Build a user model instance from the snapshot.
+
+        The instance is **not** bound to any database session.
+
+        :param user_model: The user model class.
+        :return: An instance of the user model.
+        """
+        return user_model(**self.to_dict())
+
+    def dumps(self) -> bytes:
+        """
+        Serialize the snapshot in a compact binary format.
+
+        :raises TypeError: The id is not a UUID, a signed 64-bit integer
+        or a string.
+        :raises ValueError: The id, e-mail or hashed password is longer
+        than 65535 bytes.
+        :return: The serialized snapshot.
+        """
+        flags = (
+            (FLAG_ACTIVE if self.is_active else 0)
+            | (FLAG_SUPERUSER if self.is_superuser else 0)
+            | (FLAG_VERIFIED if self.is_verified else 0)
+        )
+        id = self.id
+        if isinstance(id, uuid.UUID):
+            tag, id_bytes = TAG_UUID, id.bytes
+        elif isinstance(id, int) and not isinstance(id, bool):
+            if not INTEGER_ID_MIN <= id <= INTEGER_ID_MAX:
+                raise TypeError("Can't serialize an integer id out of 64 bits.")
+            tag, id_bytes = TAG_INTEGER, INTEGER_ID.pack(id)
+        elif isinstance(id, str):
+            tag, id_bytes = TAG_STRING, _pack_string(id)
+        else:
+            raise TypeError(f"Can't serialize an id of type {type(id).__name__}.")
+
+        return b"".join(
+            (
+                HEADER.pack(FORMAT_VERSION, flags, tag),
+                id_bytes,
+                _pack_string(self.email),
+                _pack_string(self.hashed_password),
+            )
+        )
+
+    @classmethod
+    def loads(cls, data: bytes) -> "UserSnapshot":
+        """
+        Deserialize a snapshot serialized with `dumps`.
+
+        :param data: The serialized snapshot.
+        :raises ValueError: The data is not a serialized snapshot.
+        :return: A user snapshot.
+        """
+        try:
+            version, flags, tag = HEADER.unpack_from(data)
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported snapshot format {version}.")
+            offset = HEADER.size
+            id: Any
+            if tag == TAG_UUID:
+                end = offset + 16
+                id = uuid.UUID(bytes=bytes(data[offset:end]))
+                offset = end
+            elif tag == TAG_INTEGER:
+                (id,) = INTEGER_ID.unpack_from(data, offset)
+                offset += INTEGER_ID.size
+            elif tag == TAG_STRING:
+                id, offset = _read_string(data, offset)
+            else:
+                raise ValueError(f"Unsupported id tag {tag}.")
+            email, offset = _read_string(data, offset)
+            hashed_password, offset = _read_string(data, offset)
+        except (struct.error, UnicodeDecodeError) as e:
+            raise ValueError("Invalid snapshot data.") from e
+
+        return cls(
+            id,
+            email,
+            hashed_password,
+            bool(flags & FLAG_ACTIVE),
+            bool(flags & FLAG_SUPERUSER),
+            bool(flags & FLAG_VERIFIED),
+        )
+
+    def _astuple(self) -> Tuple[Any, ...]:
+        return (
+            self.id,
+            self.email,
+            self.hashed_password,
+            self.is_active,
+            self.is_superuser,
+            self.is_verified,
+        )
+
+
+def _pack_string(value: str) -> bytes:
+    encoded = value.encode("utf-8")
+    if len(encoded) > MAX_LENGTH:
+        raise ValueError(f"Can't serialize a string longer than {MAX_LENGTH} bytes.")
+    return LENGTH.pack(len(encoded)) + encoded
+
+
+def _read_string(data: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = LENGTH.unpack_from(data, offset)
+    start = offset + LENGTH.size
+    end = start + length
+    if end > len(data):
+        raise ValueError("Invalid snapshot data.")
+    return bytes(data[start:end]).decode("utf-8"), end
+
+
+class UserSnapshotSerializer:
+    """Serialize users as `UserSnapshot`, in their compact binary format."""
+
+    def dumps(self, user: models.UserProtocol) -> bytes:
+        return UserSnapshot.from_user(user).dumps()
+
+    def loads(self, data: bytes) -> UserSnapshot:
+        return UserSnapshot.loads(data)
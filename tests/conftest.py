@@ -25,7 +25,7 @@ from pytest_mock import MockerFixture
 from fastapi_users import exceptions, models, schemas
 from fastapi_users.authentication import AuthenticationBackend, BearerTransport
 from fastapi_users.authentication.strategy import Strategy
-from fastapi_users.db import BaseUserDatabase
+from fastapi_users.db import BaseUserDatabase, UserFilter
 from fastapi_users.jwt import SecretType
 from fastapi_users.manager import BaseUserManager, UUIDIDMixin
 from fastapi_users.openapi import OpenAPIResponseType
@@ -81,6 +81,10 @@ class UserUpdate(schemas.BaseUserUpdate):
     first_name: Optional[str]
 
 
+class UserImport(schemas.BaseUserImport):
+    first_name: Optional[str]
+
+
 class UserOAuth(User, schemas.BaseOAuthAccountMixin):
     pass
 
@@ -125,6 +129,26 @@ class UserManagerMock(BaseTestUserManager[models.UP]):
     _update: MagicMock
 
 
+class SessionUserDatabase(BaseUserDatabase[UserModel, IDType]):
+    """Like SQLAlchemy, only updates users attached to its own session."""
+
+    def __init__(self, user_db: BaseUserDatabase[UserModel, IDType]):
+        self.user_db = user_db
+        self.session = object()
+
+    async def get(self, id: IDType) -> Optional[UserModel]:
+        user = await self.user_db.get(id)
+        if user is None:
+            return None  # pragma: no cover
+        user = dataclasses.replace(user)
+        user.session = self.session  # type: ignore
+        return user
+
+    async def update(self, user: UserModel, update_dict: Dict[str, Any]) -> UserModel:
+        assert user.session is self.session  # type: ignore
+        return await self.user_db.update(user, update_dict)
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     """Force the pytest-asyncio loop to be the main one."""
@@ -363,6 +387,30 @@ def mock_user_db(
         async def delete(self, user: UserModel) -> None:
             pass
 
+        async def paginate(
+            self,
+            filter: Optional[UserFilter] = None,
+            after: Optional[UUID4] = None,
+            limit: int = 100,
+        ) -> List[UserModel]:
+            users = sorted(
+                (
+                    u
+                    for u in (
+                        user,
+                        verified_user,
+                        inactive_user,
+                        superuser,
+                        verified_superuser,
+                    )
+                    if filter is None or filter.matches(u)
+                ),
+                key=lambda u: u.id,
+            )
+            if after is not None:
+                users = [u for u in users if u.id > after]
+            return users[:limit]
+
     return MockUserDatabase()
 
 
@@ -1,4 +1,7 @@
-from typing import AsyncGenerator, Generic, List, Optional, Sequence
+import asyncio
+import copy
+import dataclasses
+from typing import AsyncGenerator, Generic, List, Optional, Sequence, cast
 
 import httpx
 import pytest
@@ -156,3 +159,433 @@ async def test_authenticators_with_same_name(get_test_auth_client, get_backend_n
     with pytest.raises(DuplicateBackendNamesError):
         async for _ in get_test_auth_client([get_backend_none(), get_backend_none()]):
             pass
+
+
+class NoTokenSecurityScheme(SecurityBase):
+    def __call__(self, request: Request) -> Optional[str]:
+        return None
+
+
+class NoTokenTransport(Transport):
+    scheme: NoTokenSecurityScheme
+
+    def __init__(self):
+        self.scheme = NoTokenSecurityScheme()
+
+
+@pytest.fixture
+def get_lazy_test_client(user_manager, get_test_client):
+    async def _get_lazy_test_client(
+        backends: List[AuthenticationBackend], calls: List[None]
+    ) -> AsyncGenerator[httpx.AsyncClient, None]:
+        async def get_user_manager():
+            calls.append(None)
+            yield user_manager
+
+        app = FastAPI()
+        authenticator = Authenticator(
+            backends, get_user_manager, lazy_user_manager=True
+        )
+
+        @app.get("/test-optional-current-user")
+        def test_optional_current_user(
+            user: Optional[UserModel] = Depends(
+                authenticator.current_user(optional=True)
+            ),
+        ):
+            return {"authenticated": user is not None}
+
+        async for client in get_test_client(app):
+            yield client
+
+    return _get_lazy_test_client
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_lazy_user_manager_anonymous(get_lazy_test_client, user: UserModel):
+    backend = AuthenticationBackend(
+        name="anonymous",
+        transport=NoTokenTransport(),
+        get_strategy=lambda: UserStrategy(user),
+    )
+    calls: List[None] = []
+    async for client in get_lazy_test_client([backend], calls):
+        response = await client.get("/test-optional-current-user")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"authenticated": False}
+        assert calls == []
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_lazy_user_manager_token(get_lazy_test_client, get_backend_user):
+    calls: List[None] = []
+    async for client in get_lazy_test_client([get_backend_user()], calls):
+        response = await client.get("/test-optional-current-user")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"authenticated": True}
+        assert len(calls) == 1
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_lazy_user_manager_validation_error(get_test_client, get_backend_user):
+    async def get_user_manager(required: int):
+        return None  # pragma: no cover
+
+    app = FastAPI()
+    authenticator = Authenticator(
+        [get_backend_user()], get_user_manager, lazy_user_manager=True
+    )
+
+    @app.get("/test-current-user")
+    def test_current_user(user=Depends(authenticator.current_user())):
+        return None  # pragma: no cover
+
+    async for client in get_test_client(app):
+        response = await client.get("/test-current-user")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class FailingStrategy(Strategy):
+    async def read_token(
+        self, token: Optional[str], user_manager: BaseUserManager[models.UP, models.ID]
+    ) -> Optional[models.UP]:
+        raise AssertionError("Token shouldn't be read by this strategy")
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_authenticator_classifier_rejects(get_test_auth_client, user: UserModel):
+    backend_rejecting = AuthenticationBackend(
+        name="rejecting",
+        transport=MockTransport(),
+        get_strategy=lambda: FailingStrategy(),
+        token_classifier=lambda token: False,
+    )
+    backend_user = AuthenticationBackend(
+        name="user", transport=MockTransport(), get_strategy=lambda: UserStrategy(user)
+    )
+    async for client in get_test_auth_client([backend_rejecting, backend_user]):
+        response = await client.get("/test-current-user")
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_authenticator_classifier_matches_first(
+    get_test_auth_client, user: UserModel
+):
+    backend_unclassified = AuthenticationBackend(
+        name="unclassified",
+        transport=MockTransport(),
+        get_strategy=lambda: FailingStrategy(),
+    )
+    backend_matching = AuthenticationBackend(
+        name="matching",
+        transport=MockTransport(),
+        get_strategy=lambda: UserStrategy(user),
+        token_classifier=lambda token: token == "mock",
+    )
+    async for client in get_test_auth_client([backend_unclassified, backend_matching]):
+        response = await client.get("/test-current-user")
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_authenticator_classifier_fallback(get_test_auth_client, user: UserModel):
+    backend_matching = AuthenticationBackend(
+        name="matching",
+        transport=MockTransport(),
+        get_strategy=lambda: NoneStrategy(),
+        token_classifier=lambda token: True,
+    )
+    backend_unclassified = AuthenticationBackend(
+        name="unclassified",
+        transport=MockTransport(),
+        get_strategy=lambda: UserStrategy(user),
+    )
+    async for client in get_test_auth_client([backend_matching, backend_unclassified]):
+        response = await client.get("/test-current-user")
+        assert response.status_code == status.HTTP_200_OK
+
+
+class SlowStrategy(Strategy, Generic[models.UP]):
+    def __init__(self, user: Optional[models.UP], delay: float, events: List[str]):
+        self.user = user
+        self.delay = delay
+        self.events = events
+
+    async def read_token(
+        self, token: Optional[str], user_manager: BaseUserManager[models.UP, models.ID]
+    ) -> Optional[models.UP]:
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.events.append("cancelled")
+            raise
+        self.events.append("read")
+        return self.user
+
+
+class ErrorStrategy(Strategy):
+    async def read_token(
+        self, token: Optional[str], user_manager: BaseUserManager[models.UP, models.ID]
+    ) -> Optional[models.UP]:
+        raise RuntimeError()
+
+
+def get_backend(name: str) -> AuthenticationBackend:
+    return AuthenticationBackend(
+        name=name, transport=MockTransport(), get_strategy=lambda: NoneStrategy()
+    )
+
+
+def get_concurrent_authenticator(
+    backends: List[AuthenticationBackend], get_user_manager
+) -> Authenticator:
+    authenticator = Authenticator(
+        backends, get_user_manager, lazy_user_manager=True, concurrent_backends=True
+    )
+
+    async def resolve_user_manager(connection, exit_stack=None):
+        return get_user_manager()
+
+    authenticator._resolve_user_manager = resolve_user_manager  # type: ignore
+    authenticator._solve_user_manager = resolve_user_manager  # type: ignore
+    return authenticator
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+class TestConcurrentBackends:
+    async def test_priority_order(
+        self, get_user_manager, user: UserModel, superuser: UserModel
+    ):
+        events: List[str] = []
+        backends = [
+            AuthenticationBackend(
+                name="slow",
+                transport=MockTransport(),
+                get_strategy=lambda: SlowStrategy(user, 0.05, events),
+            ),
+            AuthenticationBackend(
+                name="fast",
+                transport=MockTransport(),
+                get_strategy=lambda: SlowStrategy(superuser, 0, events),
+            ),
+        ]
+        authenticator = get_concurrent_authenticator(backends, get_user_manager)
+        result = await authenticator._authenticate(
+            user_manager=get_user_manager(),
+            slow="mock",
+            strategy_slow=backends[0].get_strategy(),
+            fast="mock",
+            strategy_fast=backends[1].get_strategy(),
+        )
+        assert result == (user, "mock")
+        assert events == ["read", "read"]
+
+    async def test_cancel_remaining(self, get_user_manager, user: UserModel):
+        events: List[str] = []
+        authenticator = get_concurrent_authenticator(
+            [get_backend("fast"), get_backend("slow")], get_user_manager
+        )
+        result = await authenticator._authenticate(
+            user_manager=get_user_manager(),
+            fast="mock",
+            strategy_fast=SlowStrategy(user, 0, events),
+            slow="mock",
+            strategy_slow=SlowStrategy(user, 10, events),
+        )
+        assert result == (user, "mock")
+        assert events == ["read", "cancelled"]
+
+    async def test_none(self, get_user_manager):
+        events: List[str] = []
+        authenticator = get_concurrent_authenticator(
+            [get_backend("a"), get_backend("b")], get_user_manager
+        )
+        result = await authenticator._authenticate(
+            user_manager=get_user_manager(),
+            optional=True,
+            a="mock",
+            strategy_a=SlowStrategy(None, 0.01, events),
+            b="mock",
+            strategy_b=SlowStrategy(None, 0, events),
+        )
+        assert result == (None, "mock")
+        assert events == ["read", "read"]
+
+    async def test_error(self, get_user_manager, user: UserModel):
+        events: List[str] = []
+        authenticator = get_concurrent_authenticator(
+            [get_backend("error"), get_backend("slow")], get_user_manager
+        )
+        with pytest.raises(RuntimeError):
+            await authenticator._authenticate(
+                user_manager=get_user_manager(),
+                error="mock",
+                strategy_error=ErrorStrategy(),
+                slow="mock",
+                strategy_slow=SlowStrategy(user, 10, events),
+            )
+        assert events == ["cancelled"]
+
+    async def test_fetch_with_first_user_manager(
+        self, get_user_manager, user: UserModel
+    ):
+        authenticator = get_concurrent_authenticator(
+            [get_backend("a"), get_backend("b")], get_user_manager
+        )
+        result = await authenticator._authenticate(
+            user_manager=get_user_manager(),
+            a="mock",
+            strategy_a=NoneStrategy(),
+            b="mock",
+            strategy_b=UserStrategy(dataclasses.replace(user)),
+        )
+        assert result[0] is user
+
+    async def test_fetch_with_first_user_manager_deleted(self, get_user_manager):
+        authenticator = get_concurrent_authenticator(
+            [get_backend("a"), get_backend("b")], get_user_manager
+        )
+        result = await authenticator._authenticate(
+            user_manager=get_user_manager(),
+            optional=True,
+            a="mock",
+            strategy_a=NoneStrategy(),
+            b="mock",
+            strategy_b=UserStrategy(UserModel(email="", hashed_password="")),
+        )
+        assert result == (None, "mock")
+
+    async def test_user_manager_per_read(self, get_test_client, user_manager):
+        user_managers: List[BaseUserManager] = []
+
+        class RecordingStrategy(Strategy):
+            async def read_token(
+                self,
+                token: Optional[str],
+                user_manager: BaseUserManager[models.UP, models.ID],
+            ) -> Optional[models.UP]:
+                user_managers.append(user_manager)
+                return None
+
+        async def get_user_manager():
+            yield copy.copy(user_manager)
+
+        backends = [
+            AuthenticationBackend(
+                name=name,
+                transport=MockTransport(),
+                get_strategy=lambda: RecordingStrategy(),
+            )
+            for name in ("a", "b")
+        ]
+        authenticator = Authenticator(
+            backends, get_user_manager, lazy_user_manager=True, concurrent_backends=True
+        )
+        app = FastAPI()
+
+        @app.get("/test-optional-current-user")
+        def test_optional_current_user(
+            user: Optional[UserModel] = Depends(
+                authenticator.current_user(optional=True)
+            ),
+        ):
+            return {"authenticated": user is not None}
+
+        async for client in get_test_client(app):
+            response = await client.get("/test-optional-current-user")
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json() == {"authenticated": False}
+        assert len(user_managers) == 2
+        assert user_managers[0] is not user_managers[1]
+
+
+@pytest.mark.authentication
+def test_concurrent_backends_requires_lazy_user_manager(get_user_manager):
+    with pytest.raises(ValueError):
+        Authenticator(
+            [get_backend("a"), get_backend("b")],
+            get_user_manager,
+            concurrent_backends=True,
+        )
+
+
+class CountingStrategy(Strategy, Generic[models.UP]):
+    def __init__(self, user: models.UP, calls: List[str]):
+        self.user = user
+        self.calls = calls
+
+    async def read_token(
+        self, token: Optional[str], user_manager: BaseUserManager[models.UP, models.ID]
+    ) -> Optional[models.UP]:
+        self.calls.append(cast(str, token))
+        return self.user
+
+
+@pytest.mark.authentication
+def test_dependencies_memoized(get_user_manager, get_backend_user):
+    authenticator = Authenticator([get_backend_user()], get_user_manager)
+
+    assert authenticator.current_user(active=True) is authenticator.current_user(
+        active=True
+    )
+    assert authenticator.current_user(active=True) is not authenticator.current_user(
+        active=True, superuser=True
+    )
+    assert authenticator.current_user_token(
+        active=True
+    ) is authenticator.current_user_token(active=True)
+    assert authenticator.current_user_token(
+        active=True
+    ) is not authenticator.current_user(active=True)
+    assert authenticator.middleware_user(active=True) is authenticator.middleware_user(
+        active=True
+    )
+    assert authenticator.middleware_user_token(
+        active=True
+    ) is authenticator.middleware_user_token(active=True)
+    assert (
+        authenticator.connection_user_manager()
+        is authenticator.connection_user_manager()
+    )
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_token_read_once_per_request(
+    get_user_manager, get_test_client, superuser: UserModel
+):
+    calls: List[str] = []
+    backend = AuthenticationBackend(
+        name="counting",
+        transport=MockTransport(),
+        get_strategy=lambda: CountingStrategy(superuser, calls),
+    )
+    authenticator = Authenticator([backend], get_user_manager)
+    app = FastAPI()
+
+    @app.get("/test-current-user")
+    def test_current_user(
+        active_user: UserModel = Depends(authenticator.current_user(active=True)),
+        superuser: UserModel = Depends(
+            authenticator.current_user(active=True, superuser=True)
+        ),
+        user_token=Depends(authenticator.current_user_token()),
+    ):
+        return active_user is superuser is user_token[0]
+
+    async for client in get_test_client(app):
+        response = await client.get("/test-current-user")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() is True
+        assert calls == ["mock"]
+
+        response = await client.get("/test-current-user")
+        assert calls == ["mock", "mock"]
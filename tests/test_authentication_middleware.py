@@ -0,0 +1,198 @@
+from typing import AsyncGenerator, List
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, WebSocket, status
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from fastapi_users import FastAPIUsers
+from fastapi_users.authentication import AuthenticationMiddleware
+from fastapi_users.authentication.authenticator import (
+    MissingAuthenticationMiddlewareError,
+)
+from fastapi_users.db import BaseUserDatabase
+from tests.conftest import (
+    IDType,
+    SessionUserDatabase,
+    User,
+    UserManager,
+    UserModel,
+    UserUpdate,
+)
+
+
+@pytest.fixture
+def app_factory(user_manager, mock_authentication):
+    def _app_factory(middleware: bool = True, calls: List[None] = None) -> FastAPI:
+        async def get_user_manager():
+            if calls is not None:
+                calls.append(None)
+            yield user_manager
+
+        fastapi_users = FastAPIUsers[UserModel, IDType](
+            get_user_manager, [mock_authentication]
+        )
+        app = FastAPI()
+        if middleware:
+            app.add_middleware(AuthenticationMiddleware, fastapi_users=fastapi_users)
+
+        current_active_user = fastapi_users.middleware_user(active=True)
+        current_superuser = fastapi_users.middleware_user(active=True, superuser=True)
+        optional_user = fastapi_users.middleware_user(optional=True)
+
+        @app.get("/current-user", response_model=User)
+        def current_user(user: UserModel = Depends(current_active_user)):
+            return user
+
+        @app.get("/current-superuser", response_model=User)
+        def current_superuser_route(user: UserModel = Depends(current_superuser)):
+            return user
+
+        @app.get("/current-user-token")
+        def current_user_token(
+            user_token=Depends(fastapi_users.authenticator.middleware_user_token()),
+        ):
+            user, token = user_token
+            return {"email": user.email, "token": token}
+
+        @app.get("/optional-user")
+        def optional_user_route(user: UserModel = Depends(optional_user)):
+            return {"authenticated": user is not None}
+
+        @app.get("/dependency-user", response_model=User)
+        def dependency_user(
+            user: UserModel = Depends(fastapi_users.current_user(active=True)),
+        ):
+            return user
+
+        @app.websocket("/ws")
+        async def websocket_route(
+            websocket: WebSocket, user: UserModel = Depends(current_active_user)
+        ):
+            await websocket.accept()
+            await websocket.send_json({"email": user.email})
+            await websocket.close()
+
+        return app
+
+    return _app_factory
+
+
+@pytest.fixture
+async def test_app_client(
+    app_factory, get_test_client
+) -> AsyncGenerator[httpx.AsyncClient, None]:
+    async for client in get_test_client(app_factory()):
+        yield client
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+class TestMiddlewareHTTP:
+    async def test_missing_token(self, test_app_client: httpx.AsyncClient):
+        response = await test_app_client.get("/current-user")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_valid_token(self, test_app_client: httpx.AsyncClient, user):
+        response = await test_app_client.get(
+            "/current-user", headers={"Authorization": f"Bearer {user.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == str(user.id)
+
+    async def test_not_superuser(self, test_app_client: httpx.AsyncClient, user):
+        response = await test_app_client.get(
+            "/current-superuser", headers={"Authorization": f"Bearer {user.id}"}
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_superuser(self, test_app_client: httpx.AsyncClient, superuser):
+        response = await test_app_client.get(
+            "/current-superuser", headers={"Authorization": f"Bearer {superuser.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    async def test_user_token(self, test_app_client: httpx.AsyncClient, user):
+        response = await test_app_client.get(
+            "/current-user-token", headers={"Authorization": f"Bearer {user.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"email": user.email, "token": str(user.id)}
+
+    async def test_optional(self, test_app_client: httpx.AsyncClient):
+        response = await test_app_client.get("/optional-user")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"authenticated": False}
+
+    async def test_dependency_reuses_middleware_result(
+        self, app_factory, get_test_client, user
+    ):
+        calls: List[None] = []
+        async for client in get_test_client(app_factory(calls=calls)):
+            response = await client.get(
+                "/dependency-user", headers={"Authorization": f"Bearer {user.id}"}
+            )
+            assert response.status_code == status.HTTP_200_OK
+            # The dependency resolves the user manager, but the token isn't re-read
+            assert len(calls) == 2
+
+    async def test_anonymous_without_user_manager(self, app_factory, get_test_client):
+        calls: List[None] = []
+        async for client in get_test_client(app_factory(calls=calls)):
+            response = await client.get("/optional-user")
+            assert response.status_code == status.HTTP_200_OK
+            assert calls == []
+
+    @pytest.mark.parametrize("lazy_user_manager", [False, True])
+    async def test_update_me_same_session(
+        self,
+        get_test_client,
+        mock_authentication,
+        mock_user_db: BaseUserDatabase[UserModel, IDType],
+        user: UserModel,
+        lazy_user_manager: bool,
+    ):
+        async def get_user_manager():
+            yield UserManager(SessionUserDatabase(mock_user_db))
+
+        fastapi_users = FastAPIUsers[UserModel, IDType](
+            get_user_manager,
+            [mock_authentication],
+            lazy_user_manager=lazy_user_manager,
+        )
+        app = FastAPI()
+        app.add_middleware(AuthenticationMiddleware, fastapi_users=fastapi_users)
+        app.include_router(
+            fastapi_users.get_users_router(User, UserUpdate), prefix="/users"
+        )
+
+        async for client in get_test_client(app):
+            response = await client.patch(
+                "/users/me",
+                json={"is_verified": True},
+                headers={"Authorization": f"Bearer {user.id}"},
+            )
+            assert response.status_code == status.HTTP_200_OK
+
+    async def test_missing_middleware(self, app_factory, get_test_client):
+        async for client in get_test_client(app_factory(middleware=False)):
+            with pytest.raises(MissingAuthenticationMiddlewareError):
+                await client.get("/current-user")
+
+
+@pytest.mark.authentication
+class TestMiddlewareWebSocket:
+    def test_valid_token(self, app_factory, user):
+        with TestClient(app_factory()) as client:
+            with client.websocket_connect(
+                "/ws", headers={"Authorization": f"Bearer {user.id}"}
+            ) as websocket:
+                assert websocket.receive_json() == {"email": user.email}
+
+    def test_missing_token(self, app_factory):
+        with TestClient(app_factory()) as client:
+            with pytest.raises(WebSocketDisconnect) as excinfo:
+                with client.websocket_connect("/ws"):
+                    pass  # pragma: no cover
+            assert excinfo.value.code == status.WS_1008_POLICY_VIOLATION
@@ -1,4 +1,5 @@
 import pytest
+from pytest_mock import MockerFixture
 
 from fastapi_users.authentication.strategy import (
     JWTStrategy,
@@ -129,11 +130,18 @@ class TestReadToken:
 
     @pytest.mark.asyncio
     async def test_valid_token(
-        self, jwt_strategy: JWTStrategy[UserModel, IDType], user_manager, token, user
+        self,
+        mocker: MockerFixture,
+        jwt_strategy: JWTStrategy[UserModel, IDType],
+        user_manager,
+        token,
+        user,
     ):
+        get_core_spy = mocker.spy(user_manager, "get_core")
         authenticated_user = await jwt_strategy.read_token(token(user.id), user_manager)
         assert authenticated_user is not None
         assert authenticated_user.id == user.id
+        get_core_spy.assert_called_once_with(user.id)
 
 
 @pytest.mark.parametrize("jwt_strategy", ["HS256", "RS256", "ES256"], indirect=True)
@@ -1,5 +1,5 @@
 import pytest
-from fastapi import Response, status
+from fastapi import Response, WebSocket, status
 
 from fastapi_users.authentication.transport import (
     BearerTransport,
@@ -45,3 +45,49 @@ def test_get_openapi_login_responses_success(bearer_transport: BearerTransport):
 def test_get_openapi_logout_responses_success(bearer_transport: BearerTransport):
     openapi_responses = bearer_transport.get_openapi_logout_responses_success()
     assert openapi_responses == {}
+
+
+def get_websocket(query_string: bytes = b"", headers=None, subprotocols=None):
+    scope = {
+        "type": "websocket",
+        "path": "/ws",
+        "query_string": query_string,
+        "headers": headers or [],
+        "subprotocols": subprotocols or [],
+    }
+    return WebSocket(scope, receive=None, send=None)  # type: ignore
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "websocket,expected",
+    [
+        (get_websocket(), None),
+        (get_websocket(headers=[(b"authorization", b"Bearer TOKEN")]), "TOKEN"),
+        (get_websocket(query_string=b"access_token=TOKEN"), "TOKEN"),
+        (get_websocket(subprotocols=["chat", "access_token.TO.KEN"]), "TO.KEN"),
+        (get_websocket(subprotocols=["chat"]), None),
+    ],
+)
+async def test_get_websocket_token(
+    bearer_transport: BearerTransport, websocket: WebSocket, expected
+):
+    assert await bearer_transport.get_websocket_token(websocket) == expected
+
+
+@pytest.mark.authentication
+@pytest.mark.parametrize(
+    "websocket,expected",
+    [
+        (
+            get_websocket(subprotocols=["chat", "access_token.TOKEN"]),
+            "access_token.TOKEN",
+        ),
+        (get_websocket(subprotocols=["chat"]), None),
+    ],
+)
+def test_get_websocket_subprotocol(
+    bearer_transport: BearerTransport, websocket: WebSocket, expected
+):
+    assert bearer_transport.get_websocket_subprotocol(websocket) == expected
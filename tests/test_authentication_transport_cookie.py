@@ -1,7 +1,7 @@
 import re
 
 import pytest
-from fastapi import Response, status
+from fastapi import Response, WebSocket, status
 
 from fastapi_users.authentication.transport import CookieTransport
 
@@ -106,3 +106,18 @@ def test_get_openapi_logout_responses_success(cookie_transport: CookieTransport)
     assert cookie_transport.get_openapi_logout_responses_success() == {
         status.HTTP_200_OK: {"model": None}
     }
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_get_websocket_token(cookie_transport: CookieTransport):
+    scope = {
+        "type": "websocket",
+        "headers": [(b"cookie", f"{COOKIE_NAME}=TOKEN".encode())],
+    }
+    websocket = WebSocket(scope, receive=None, send=None)  # type: ignore
+    assert await cookie_transport.get_websocket_token(websocket) == "TOKEN"
+
+    scope = {"type": "websocket", "headers": []}
+    websocket = WebSocket(scope, receive=None, send=None)  # type: ignore
+    assert await cookie_transport.get_websocket_token(websocket) is None
@@ -0,0 +1,274 @@
+from typing import List, Optional, cast
+
+import pytest
+from fastapi import Depends, FastAPI, WebSocket, status
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+from starlette.websockets import WebSocketDisconnect
+
+from fastapi_users.authentication import (
+    AuthenticationBackend,
+    Authenticator,
+    BearerTransport,
+    CookieTransport,
+)
+from fastapi_users.authentication.authenticator import WebSocketAuthentication
+from tests.conftest import MockStrategy, UserManagerMock, UserModel
+
+
+@pytest.fixture
+def app_factory(get_user_manager, mock_authentication):
+    def _app_factory(revalidate_interval: Optional[float] = None) -> FastAPI:
+        cookie_authentication = AuthenticationBackend(
+            name="cookie",
+            transport=CookieTransport(cookie_name="auth"),
+            get_strategy=lambda: MockStrategy(),
+        )
+        authenticator = Authenticator(
+            [mock_authentication, cookie_authentication], get_user_manager
+        )
+        app = FastAPI()
+
+        @app.websocket("/ws")
+        async def websocket_route(
+            websocket: WebSocket,
+            authentication: WebSocketAuthentication[UserModel] = Depends(
+                authenticator.websocket_authentication(
+                    active=True, revalidate_interval=revalidate_interval
+                )
+            ),
+        ):
+            transport = cast(BearerTransport, mock_authentication.transport)
+            await websocket.accept(
+                subprotocol=transport.get_websocket_subprotocol(websocket)
+            )
+            try:
+                while True:
+                    await websocket.receive_text()
+                    user = await authentication.revalidate()
+                    assert user is not None
+                    await websocket.send_json({"email": user.email})
+            except WebSocketDisconnect:
+                pass
+
+        @app.websocket("/ws-watch")
+        async def websocket_watch_route(
+            websocket: WebSocket,
+            authentication: WebSocketAuthentication[UserModel] = Depends(
+                authenticator.websocket_authentication(
+                    active=True, revalidate_interval=revalidate_interval
+                )
+            ),
+        ):
+            await websocket.accept()
+            await authentication.watch()
+
+        @app.websocket("/ws-optional")
+        async def websocket_optional_route(
+            websocket: WebSocket,
+            authentication: WebSocketAuthentication[UserModel] = Depends(
+                authenticator.websocket_authentication(optional=True)
+            ),
+        ):
+            await websocket.accept()
+            await websocket.send_json(
+                {"authenticated": authentication.user is not None}
+            )
+            await websocket.close()
+
+        return app
+
+    return _app_factory
+
+
+@pytest.mark.authentication
+class TestWebSocketAuthentication:
+    def test_missing_token(self, app_factory):
+        with TestClient(app_factory()) as client:
+            with pytest.raises(WebSocketDisconnect) as excinfo:
+                with client.websocket_connect("/ws"):
+                    pass  # pragma: no cover
+            assert excinfo.value.code == status.WS_1008_POLICY_VIOLATION
+
+    def test_inactive_user(self, app_factory, inactive_user: UserModel):
+        with TestClient(app_factory()) as client:
+            with pytest.raises(WebSocketDisconnect) as excinfo:
+                with client.websocket_connect(f"/ws?access_token={inactive_user.id}"):
+                    pass  # pragma: no cover
+            assert excinfo.value.code == status.WS_1008_POLICY_VIOLATION
+
+    def test_optional(self, app_factory):
+        with TestClient(app_factory()) as client:
+            with client.websocket_connect("/ws-optional") as websocket:
+                assert websocket.receive_json() == {"authenticated": False}
+
+    @pytest.mark.parametrize(
+        "connect_kwargs",
+        [
+            pytest.param(
+                lambda user: {
+                    "url": "/ws",
+                    "headers": {"Authorization": f"Bearer {user.id}"},
+                },
+                id="header",
+            ),
+            pytest.param(
+                lambda user: {"url": f"/ws?access_token={user.id}"}, id="query"
+            ),
+            pytest.param(
+                lambda user: {
+                    "url": "/ws",
+                    "subprotocols": [f"access_token.{user.id}"],
+                },
+                id="subprotocol",
+            ),
+            pytest.param(
+                lambda user: {"url": "/ws", "headers": {"Cookie": f"auth={user.id}"}},
+                id="cookie",
+            ),
+        ],
+    )
+    def test_valid_token(self, app_factory, user: UserModel, connect_kwargs):
+        with TestClient(app_factory()) as client:
+            with client.websocket_connect(**connect_kwargs(user)) as websocket:
+                websocket.send_text("hello")
+                assert websocket.receive_json() == {"email": user.email}
+
+    def test_accepted_subprotocol(self, app_factory, user: UserModel):
+        subprotocol = f"access_token.{user.id}"
+        with TestClient(app_factory()) as client:
+            with client.websocket_connect(
+                "/ws", subprotocols=["chat", subprotocol]
+            ) as websocket:
+                assert websocket.accepted_subprotocol == subprotocol
+
+    def test_no_revalidation(
+        self,
+        app_factory,
+        mocker: MockerFixture,
+        user: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        get_spy = mocker.spy(user_manager, "get")
+        with TestClient(app_factory(revalidate_interval=3600)) as client:
+            with client.websocket_connect(f"/ws?access_token={user.id}") as websocket:
+                for _ in range(3):
+                    websocket.send_text("hello")
+                    assert websocket.receive_json() == {"email": user.email}
+        assert get_spy.call_count == 1
+
+    def test_revalidation(
+        self,
+        app_factory,
+        mocker: MockerFixture,
+        user: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        get_spy = mocker.spy(user_manager, "get")
+        with TestClient(app_factory(revalidate_interval=0)) as client:
+            with client.websocket_connect(f"/ws?access_token={user.id}") as websocket:
+                websocket.send_text("hello")
+                assert websocket.receive_json() == {"email": user.email}
+                assert get_spy.call_count == 2
+
+                user.is_active = False
+                websocket.send_text("hello")
+                message = websocket.receive()
+                assert message["type"] == "websocket.close"
+                assert message["code"] == status.WS_1008_POLICY_VIOLATION
+
+    def test_watch(
+        self,
+        app_factory,
+        mocker: MockerFixture,
+        user: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        get_spy = mocker.spy(user_manager, "get")
+        with TestClient(app_factory(revalidate_interval=0.01)) as client:
+            with client.websocket_connect(
+                f"/ws-watch?access_token={user.id}"
+            ) as websocket:
+                # The user is deactivated without any incoming message
+                user.is_active = False
+                message = websocket.receive()
+                assert message["type"] == "websocket.close"
+                assert message["code"] == status.WS_1008_POLICY_VIOLATION
+        assert get_spy.call_count >= 2
+
+
+@pytest.mark.authentication
+def test_revalidation_user_manager_closed(
+    mock_authentication, user: UserModel, user_manager: UserManagerMock[UserModel]
+):
+    opened: List[int] = []
+    closed: List[int] = []
+
+    async def get_user_manager():
+        opened.append(1)
+        yield user_manager
+        closed.append(1)
+
+    authenticator = Authenticator(
+        [mock_authentication], get_user_manager, lazy_user_manager=True
+    )
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def websocket_route(
+        websocket: WebSocket,
+        authentication: WebSocketAuthentication[UserModel] = Depends(
+            authenticator.websocket_authentication(revalidate_interval=0)
+        ),
+    ):
+        await websocket.accept()
+        try:
+            while True:
+                await websocket.receive_text()
+                await authentication.revalidate()
+                await websocket.send_json(
+                    {"opened": len(opened), "closed": len(closed)}
+                )
+        except WebSocketDisconnect:
+            pass
+
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/ws?access_token={user.id}") as websocket:
+            for i in range(1, 4):
+                websocket.send_text("hello")
+                assert websocket.receive_json() == {"opened": 1 + i, "closed": i}
+    assert len(closed) == 4
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_revalidate_force(user: UserModel, superuser: UserModel):
+    async def authenticate():
+        return superuser, "TOKEN"
+
+    authentication = WebSocketAuthentication(user, "TOKEN", authenticate)
+    assert await authentication.revalidate() == user
+    assert await authentication.revalidate(force=True) == superuser
+    assert authentication.user == superuser
+
+
+@pytest.mark.authentication
+@pytest.mark.asyncio
+async def test_watch_without_interval(user: UserModel):
+    async def authenticate():
+        return user, "TOKEN"  # pragma: no cover
+
+    authentication = WebSocketAuthentication(user, "TOKEN", authenticate)
+    with pytest.raises(ValueError):
+        await authentication.watch()
+
+
+@pytest.mark.authentication
+def test_websocket_authentication_memoized(get_user_manager, mock_authentication):
+    authenticator = Authenticator([mock_authentication], get_user_manager)
+    assert authenticator.websocket_authentication(
+        active=True
+    ) is authenticator.websocket_authentication(active=True)
+    assert authenticator.websocket_authentication(
+        active=True
+    ) is not authenticator.websocket_authentication(active=True, revalidate_interval=60)
@@ -0,0 +1,93 @@
+import pytest
+
+from fastapi_users.bloom import EmailBloomFilter
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+@pytest.fixture
+def email_filter() -> EmailBloomFilter:
+    return EmailBloomFilter(capacity=1000, error_rate=0.01)
+
+
+@pytest.mark.manager
+def test_size():
+    email_filter = EmailBloomFilter(capacity=1_000_000, error_rate=0.01)
+    assert email_filter.size == 9585059
+    assert email_filter.hash_count == 7
+
+
+@pytest.mark.manager
+def test_not_ready(email_filter: EmailBloomFilter):
+    assert "king.arthur@camelot.bt" in email_filter
+    email_filter.record_lookup(0.001)
+    assert email_filter.is_absent("king.arthur@camelot.bt") is False
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestBuild:
+    async def test_build(self, email_filter: EmailBloomFilter):
+        await email_filter.build(_aiter(["king.arthur@camelot.bt"]))
+        assert email_filter.ready is True
+        assert "king.arthur@camelot.bt" in email_filter
+        assert "lancelot@camelot.bt" not in email_filter
+
+    async def test_rebuild(self, email_filter: EmailBloomFilter):
+        await email_filter.build(_aiter(["king.arthur@camelot.bt"]))
+
+        async def emails():
+            # The current e-mails are used until the build completes
+            assert "king.arthur@camelot.bt" in email_filter
+            email_filter.add("galahad@camelot.bt")
+            yield "lancelot@camelot.bt"
+
+        await email_filter.build(emails())
+        assert "king.arthur@camelot.bt" not in email_filter
+        assert "lancelot@camelot.bt" in email_filter
+        assert "galahad@camelot.bt" in email_filter
+
+    async def test_add(self, email_filter: EmailBloomFilter):
+        await email_filter.build(_aiter([]))
+        email_filter.add("lancelot@camelot.bt")
+        assert "lancelot@camelot.bt" in email_filter
+
+    async def test_error_rate(self, email_filter: EmailBloomFilter):
+        await email_filter.build(_aiter(f"knight{i}@camelot.bt" for i in range(1000)))
+        assert all(f"knight{i}@camelot.bt" in email_filter for i in range(1000))
+        false_positives = sum(
+            f"squire{i}@camelot.bt" in email_filter for i in range(10000)
+        )
+        assert false_positives < 200
+
+
+@pytest.mark.manager
+def test_keyed():
+    first = EmailBloomFilter(capacity=1000)
+    second = EmailBloomFilter(capacity=1000)
+    assert list(first._positions("lancelot@camelot.bt")) != list(
+        second._positions("lancelot@camelot.bt")
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+async def test_is_absent(email_filter: EmailBloomFilter):
+    await email_filter.build(_aiter(["king.arthur@camelot.bt"]))
+    # The first lookup is needed to know how long to pad the response
+    assert email_filter.is_absent("lancelot@camelot.bt") is False
+
+    email_filter.record_lookup(0.002)
+    assert email_filter.is_absent("lancelot@camelot.bt") is True
+    assert email_filter.is_absent("king.arthur@camelot.bt") is False
+
+
+@pytest.mark.manager
+def test_record_lookup(email_filter: EmailBloomFilter):
+    email_filter.record_lookup(0.002)
+    assert email_filter.lookup_seconds == 0.002
+    email_filter.record_lookup(0.012)
+    assert email_filter.lookup_seconds == pytest.approx(0.003)
@@ -1,9 +1,18 @@
+import dataclasses
 import uuid
 
 import pytest
+from pytest_mock import MockerFixture
 
-from fastapi_users.db import BaseUserDatabase
-from tests.conftest import IDType, OAuthAccountModel, UserModel
+from fastapi_users import exceptions
+from fastapi_users.db import BaseUserDatabase, UserFilter
+from fastapi_users.db.base import (
+    _get_own_oauth_account,
+    _get_own_user,
+    _get_own_users,
+)
+from fastapi_users.snapshot import UserSnapshot
+from tests.conftest import IDType, OAuthAccountModel, UserModel, UserOAuthModel
 
 
 @pytest.mark.asyncio
@@ -31,8 +40,217 @@ async def test_not_implemented_methods(
     with pytest.raises(NotImplementedError):
         await base_user_db.delete(user)
 
+    with pytest.raises(NotImplementedError):
+        await base_user_db.paginate()
+
     with pytest.raises(NotImplementedError):
         await base_user_db.add_oauth_account(user, {})
 
     with pytest.raises(NotImplementedError):
         await base_user_db.update_oauth_account(user, oauth_account1, {})
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+async def test_bulk_methods_defaults(
+    mock_user_db: BaseUserDatabase[UserModel, IDType],
+    user: UserModel,
+    superuser: UserModel,
+):
+    users = await mock_user_db.get_many([superuser.id, uuid.uuid4(), user.id])
+    assert users == [superuser, user]
+
+    users = await mock_user_db.get_many_by_email(
+        [superuser.email, "lancelot@camelot.bt", user.email.upper()]
+    )
+    assert users == [superuser, user]
+
+    created_users = await mock_user_db.create_many(
+        [
+            {"email": "lancelot@camelot.bt", "hashed_password": "guinevere"},
+            {"email": "percival@camelot.bt", "hashed_password": "angharad"},
+        ]
+    )
+    assert [u.email for u in created_users] == [
+        "lancelot@camelot.bt",
+        "percival@camelot.bt",
+    ]
+
+    updated_users = await mock_user_db.update_many(
+        [user, superuser], {"is_active": False}
+    )
+    assert updated_users == [user, superuser]
+    assert user.is_active is False
+    assert superuser.is_active is False
+
+    await mock_user_db.delete_many([user, superuser])
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+async def test_lazy_loading_defaults(
+    mocker: MockerFixture,
+    mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+    user_oauth: UserOAuthModel,
+):
+    get_spy = mocker.spy(mock_user_db_oauth, "get")
+
+    user = await mock_user_db_oauth.get_core(user_oauth.id)
+    assert user is user_oauth
+    get_spy.assert_called_once_with(user_oauth.id)
+
+    assert await mock_user_db_oauth.load_oauth_accounts(user_oauth) is user_oauth
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+async def test_get_full_defaults(
+    mocker: MockerFixture,
+    mock_user_db: BaseUserDatabase[UserModel, IDType],
+    user: UserModel,
+    superuser: UserModel,
+):
+    get_spy = mocker.spy(mock_user_db, "get")
+    assert await mock_user_db.get_full(user.id) is user
+    get_spy.assert_called_once_with(user.id)
+
+    get_many_spy = mocker.spy(mock_user_db, "get_many")
+    assert await mock_user_db.get_many_full([superuser.id, user.id]) == [
+        superuser,
+        user,
+    ]
+    get_many_spy.assert_called_once_with([superuser.id, user.id])
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+async def test_get_own_user(
+    mock_user_db: BaseUserDatabase[UserModel, IDType],
+    user: UserModel,
+    superuser: UserModel,
+):
+    # E.g. an instance attached to the session of another request
+    shared_user = dataclasses.replace(user)
+    shared_superuser = dataclasses.replace(superuser)
+
+    assert await _get_own_user(mock_user_db, shared_user) is user
+    with pytest.raises(exceptions.UserNotExists):
+        await _get_own_user(mock_user_db, UserModel(email="", hashed_password=""))
+
+    assert await _get_own_users(mock_user_db, []) == []
+    own_users = await _get_own_users(mock_user_db, [shared_superuser, shared_user])
+    assert own_users[0] is superuser
+    assert own_users[1] is user
+    with pytest.raises(exceptions.UserNotExists):
+        await _get_own_users(
+            mock_user_db, [shared_user, UserModel(email="", hashed_password="")]
+        )
+
+
+@pytest.mark.db
+def test_get_own_oauth_account(
+    user_oauth: UserOAuthModel, oauth_account1: OAuthAccountModel
+):
+    shared_oauth_account = dataclasses.replace(oauth_account1)
+    assert _get_own_oauth_account(user_oauth, shared_oauth_account) is oauth_account1
+
+    unknown_oauth_account = dataclasses.replace(oauth_account1, id=uuid.uuid4())
+    assert (
+        _get_own_oauth_account(user_oauth, unknown_oauth_account)
+        is unknown_oauth_account
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+async def test_get_auth_view_default(
+    mock_user_db: BaseUserDatabase[UserModel, IDType], user: UserModel
+):
+    auth_view = await mock_user_db.get_auth_view(user.id)
+    assert auth_view == UserSnapshot.from_user(user)
+
+    assert await mock_user_db.get_auth_view(uuid.uuid4()) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+async def test_upsert_oauth_account_default(
+    mocker: MockerFixture,
+    mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+    user_oauth: UserOAuthModel,
+    oauth_account2: OAuthAccountModel,
+):
+    update_spy = mocker.spy(mock_user_db_oauth, "update_oauth_account")
+
+    user = await mock_user_db_oauth.upsert_oauth_account(
+        "service1", "unknown_account", {"access_token": "NEW_TOKEN"}
+    )
+    assert user is None
+    assert update_spy.called is False
+
+    user = await mock_user_db_oauth.upsert_oauth_account(
+        "service1", "user_oauth1", {"access_token": "NEW_TOKEN"}
+    )
+    assert user is user_oauth
+    assert user_oauth.oauth_accounts[0].access_token == "NEW_TOKEN"
+    assert oauth_account2.access_token == "TOKEN"
+    update_spy.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+async def test_upsert_oauth_account_default_not_loaded(
+    mocker: MockerFixture,
+    mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+    user_oauth: UserOAuthModel,
+):
+    # The adapter found the user, but didn't load the matching account
+    mocker.patch.object(
+        mock_user_db_oauth, "get_by_oauth_account", return_value=user_oauth
+    )
+    update_spy = mocker.spy(mock_user_db_oauth, "update_oauth_account")
+
+    user = await mock_user_db_oauth.upsert_oauth_account(
+        "service3", "user_oauth3", {"access_token": "NEW_TOKEN"}
+    )
+    assert user is user_oauth
+    assert update_spy.called is False
+
+
+@pytest.mark.db
+def test_user_filter(user: UserModel, superuser: UserModel, inactive_user: UserModel):
+    assert UserFilter().matches(user) is True
+    assert UserFilter(is_superuser=True).matches(user) is False
+    assert UserFilter(is_superuser=True).matches(superuser) is True
+    assert UserFilter(is_active=False).matches(inactive_user) is True
+    assert UserFilter(is_verified=True).matches(user) is False
+    assert UserFilter(email_prefix="KING").matches(user) is True
+    assert UserFilter(email_prefix="merlin").matches(user) is False
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+@pytest.mark.parametrize("batch_size", [1, 2, 5, 100])
+async def test_stream(
+    mocker: MockerFixture,
+    mock_user_db: BaseUserDatabase[UserModel, IDType],
+    batch_size: int,
+):
+    paginate_spy = mocker.spy(mock_user_db, "paginate")
+    users = [user async for user in mock_user_db.stream(batch_size=batch_size)]
+
+    assert len(users) == 5
+    assert [user.id for user in users] == sorted(user.id for user in users)
+    assert paginate_spy.call_count == 5 // batch_size + 1
+    for call in paginate_spy.call_args_list:
+        assert call[0][2] == batch_size
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+async def test_stream_filter(mock_user_db: BaseUserDatabase[UserModel, IDType]):
+    user_filter = UserFilter(is_active=True, is_superuser=False)
+    users = [user async for user in mock_user_db.stream(user_filter, batch_size=1)]
+
+    assert len(users) == 2
+    assert all(user_filter.matches(user) for user in users)
@@ -0,0 +1,495 @@
+import dataclasses
+import uuid
+
+import pytest
+from pytest_mock import MockerFixture
+
+from fastapi_users.db import (
+    BaseUserCache,
+    BaseUserDatabase,
+    CachedUserDatabase,
+    CacheStats,
+    UserCache,
+    UserFilter,
+)
+from fastapi_users.exceptions import UserNotExists
+from fastapi_users.snapshot import UserSnapshot
+from tests.conftest import IDType, OAuthAccountModel, UserModel, UserOAuthModel
+
+
+@pytest.fixture
+def user_cache() -> UserCache:
+    return UserCache(max_size=2, ttl_seconds=60)
+
+
+@pytest.fixture
+def cached_user_db(
+    mocker: MockerFixture,
+    mock_user_db: BaseUserDatabase[UserModel, IDType],
+    user_cache: UserCache,
+) -> CachedUserDatabase[UserModel, IDType]:
+    mocker.spy(mock_user_db, "get")
+    mocker.spy(mock_user_db, "get_by_email")
+    return CachedUserDatabase(mock_user_db, user_cache)
+
+
+@pytest.fixture
+def cached_user_db_oauth(
+    mocker: MockerFixture,
+    mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+) -> CachedUserDatabase[UserOAuthModel, IDType]:
+    mocker.spy(mock_user_db_oauth, "get_by_oauth_account")
+    return CachedUserDatabase(mock_user_db_oauth, UserCache())
+
+
+@pytest.mark.asyncio
+@pytest.mark.db
+async def test_not_implemented_methods(user: UserModel):
+    base_user_cache = BaseUserCache[UserModel, IDType]()
+
+    with pytest.raises(NotImplementedError):
+        await base_user_cache.get(uuid.uuid4())
+
+    with pytest.raises(NotImplementedError):
+        await base_user_cache.get_by_email("lancelot@camelot.bt")
+
+    with pytest.raises(NotImplementedError):
+        await base_user_cache.get_by_oauth_account("google", "user_oauth1")
+
+    with pytest.raises(NotImplementedError):
+        await base_user_cache.set(user)
+
+    with pytest.raises(NotImplementedError):
+        await base_user_cache.invalidate(user)
+
+    with pytest.raises(NotImplementedError):
+        await base_user_cache.clear()
+
+
+@pytest.mark.db
+def test_cache_stats():
+    stats = CacheStats()
+    assert stats.hit_ratio == 0.0
+
+    stats.hits = 3
+    stats.misses = 1
+    assert stats.hit_ratio == 0.75
+
+    stats.reset()
+    assert stats == CacheStats()
+
+
+@pytest.mark.db
+class TestUserCache:
+    @pytest.mark.asyncio
+    async def test_get(self, user_cache: UserCache, user: UserModel):
+        assert await user_cache.get(user.id) is None
+
+        await user_cache.set(user)
+        assert await user_cache.get(user.id) is user
+        assert await user_cache.get_by_email(user.email.upper()) is user
+        assert user_cache.stats == CacheStats(hits=2, misses=1)
+
+    @pytest.mark.asyncio
+    async def test_ttl(
+        self, mocker: MockerFixture, user_cache: UserCache, user: UserModel
+    ):
+        monotonic = mocker.patch("fastapi_users.db.cache.time.monotonic")
+        monotonic.return_value = 0.0
+        await user_cache.set(user)
+
+        monotonic.return_value = 59.0
+        assert await user_cache.get(user.id) is user
+
+        monotonic.return_value = 60.0
+        assert await user_cache.get(user.id) is None
+        assert await user_cache.get_by_email(user.email) is None
+        assert len(user_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(
+        self,
+        user_cache: UserCache,
+        user: UserModel,
+        verified_user: UserModel,
+        superuser: UserModel,
+    ):
+        await user_cache.set(user)
+        await user_cache.set(verified_user)
+        await user_cache.get(user.id)
+        await user_cache.set(superuser)
+
+        assert len(user_cache) == 2
+        assert await user_cache.get(verified_user.id) is None
+        assert await user_cache.get_by_email(verified_user.email) is None
+        assert await user_cache.get(user.id) is user
+        assert await user_cache.get(superuser.id) is superuser
+        assert user_cache.stats.evictions == 1
+
+    @pytest.mark.asyncio
+    async def test_oauth_index(self, user_oauth: UserOAuthModel):
+        user_cache = UserCache[UserOAuthModel, IDType]()
+        oauth_account = user_oauth.oauth_accounts[0]
+        await user_cache.set(user_oauth, oauth_key=("github", "github_id"))
+
+        assert (
+            await user_cache.get_by_oauth_account(
+                oauth_account.oauth_name, oauth_account.account_id
+            )
+            is user_oauth
+        )
+        assert await user_cache.get_by_oauth_account("github", "github_id") is (
+            user_oauth
+        )
+
+        await user_cache.invalidate(user_oauth)
+        assert (
+            await user_cache.get_by_oauth_account(
+                oauth_account.oauth_name, oauth_account.account_id
+            )
+            is None
+        )
+        assert await user_cache.get_by_oauth_account("github", "github_id") is None
+
+    @pytest.mark.asyncio
+    async def test_set_replaces_indexes(self, user_cache: UserCache, user: UserModel):
+        await user_cache.set(user)
+        old_email = user.email
+        user.email = "king.arthur@tintagel.bt"
+        await user_cache.set(user)
+
+        assert await user_cache.get_by_email(old_email) is None
+        assert await user_cache.get_by_email(user.email) is user
+
+    @pytest.mark.asyncio
+    async def test_clear(self, user_cache: UserCache, user: UserModel):
+        await user_cache.set(user)
+        await user_cache.clear()
+
+        assert len(user_cache) == 0
+        assert await user_cache.get_by_email(user.email) is None
+
+
+@pytest.mark.db
+class TestCachedUserDatabase:
+    @pytest.mark.asyncio
+    async def test_get(
+        self,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        assert await cached_user_db.get(user.id) is user
+        assert await cached_user_db.get(user.id) is user
+        assert await cached_user_db.get_by_email(user.email) is user
+
+        assert cached_user_db.user_db.get.call_count == 1  # type: ignore
+        assert cached_user_db.user_db.get_by_email.call_count == 0  # type: ignore
+        assert cached_user_db.cache.stats == CacheStats(hits=2, misses=1)
+
+    @pytest.mark.asyncio
+    async def test_get_core(
+        self,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        assert await cached_user_db.get(user.id) is user
+        assert await cached_user_db.get_core(user.id) is user
+        assert await cached_user_db.get_auth_view(user.id) == UserSnapshot.from_user(
+            user
+        )
+        assert await cached_user_db.get_auth_view(uuid.uuid4()) is None
+        assert cached_user_db.user_db.get.call_count == 2  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_load_oauth_accounts_snapshot(
+        self,
+        mocker: MockerFixture,
+        mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+        user_oauth: UserOAuthModel,
+    ):
+        cached_user_db = CachedUserDatabase(
+            mock_user_db_oauth, UserCache(snapshots=True)
+        )
+        load_spy = mocker.spy(mock_user_db_oauth, "load_oauth_accounts")
+
+        await cached_user_db.get_core(user_oauth.id)
+        snapshot = await cached_user_db.get_core(user_oauth.id)
+        assert isinstance(snapshot, UserSnapshot)
+
+        user = await cached_user_db.load_oauth_accounts(snapshot)  # type: ignore
+        assert user is user_oauth
+        load_spy.assert_called_once_with(user_oauth)
+
+    @pytest.mark.asyncio
+    async def test_get_by_email(
+        self,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        assert await cached_user_db.get_by_email(user.email) is user
+        assert await cached_user_db.get_by_email(user.email.upper()) is user
+        assert await cached_user_db.get(user.id) is user
+
+        assert cached_user_db.user_db.get.call_count == 0  # type: ignore
+        assert cached_user_db.user_db.get_by_email.call_count == 1  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_not_existing(
+        self, cached_user_db: CachedUserDatabase[UserModel, IDType]
+    ):
+        assert await cached_user_db.get(uuid.uuid4()) is None
+        assert await cached_user_db.get_by_email("lancelot@camelot.bt") is None
+        assert len(cached_user_db.cache) == 0  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_create(
+        self, cached_user_db: CachedUserDatabase[UserModel, IDType], user: UserModel
+    ):
+        created_user = await cached_user_db.create(
+            {"email": "lancelot@camelot.bt", "hashed_password": "guinevere"}
+        )
+        assert created_user.email == "lancelot@camelot.bt"
+        assert len(cached_user_db.cache) == 0  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_update(
+        self,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        old_email = user.email
+        await cached_user_db.get(user.id)
+
+        updated_user = await cached_user_db.update(
+            user, {"email": "king.arthur@tintagel.bt"}
+        )
+        assert updated_user.email == "king.arthur@tintagel.bt"
+        assert len(cached_user_db.cache) == 0  # type: ignore
+
+        assert await cached_user_db.get_by_email(old_email) is None
+        assert await cached_user_db.get(user.id) is updated_user
+        # The user is fetched again before the update
+        assert cached_user_db.user_db.get.call_count == 3  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_update_own_instance(
+        self,
+        mocker: MockerFixture,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        # The cached instance may be attached to the session of another request
+        shared_user = dataclasses.replace(user)
+        update_spy = mocker.spy(cached_user_db.user_db, "update")
+        await cached_user_db.update(shared_user, {"is_active": False})
+        update_spy.assert_called_once_with(user, {"is_active": False})
+
+    @pytest.mark.asyncio
+    async def test_update_error(
+        self,
+        mocker: MockerFixture,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        await cached_user_db.get(user.id)
+        mocker.patch.object(cached_user_db.user_db, "update", side_effect=RuntimeError)
+
+        with pytest.raises(RuntimeError):
+            await cached_user_db.update(user, {"is_active": False})
+        assert len(cached_user_db.cache) == 0  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_delete(
+        self,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        await cached_user_db.get(user.id)
+        await cached_user_db.delete(user)
+        assert len(cached_user_db.cache) == 0  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_get_many(
+        self,
+        mocker: MockerFixture,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+        superuser: UserModel,
+    ):
+        get_many_spy = mocker.spy(cached_user_db.user_db, "get_many")
+        await cached_user_db.get(user.id)
+
+        users = await cached_user_db.get_many([superuser.id, uuid.uuid4(), user.id])
+        assert users == [superuser, user]
+        get_many_spy.assert_called_once()
+        assert user.id not in get_many_spy.call_args[0][0]
+
+        assert await cached_user_db.get_many([user.id, superuser.id]) == [
+            user,
+            superuser,
+        ]
+        assert get_many_spy.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_bulk_writes(
+        self,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+        superuser: UserModel,
+    ):
+        created_users = await cached_user_db.create_many(
+            [{"email": "lancelot@camelot.bt", "hashed_password": "guinevere"}]
+        )
+        assert created_users[0].email == "lancelot@camelot.bt"
+        assert len(cached_user_db.cache) == 0  # type: ignore
+
+        await cached_user_db.get_many([user.id, superuser.id])
+        updated_users = await cached_user_db.update_many(
+            [user, superuser], {"is_active": False}
+        )
+        assert [u.is_active for u in updated_users] == [False, False]
+        assert len(cached_user_db.cache) == 0  # type: ignore
+
+        await cached_user_db.get_many([user.id, superuser.id])
+        await cached_user_db.delete_many([user, superuser])
+        assert len(cached_user_db.cache) == 0  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_bulk_writes_snapshots(
+        self,
+        mocker: MockerFixture,
+        mock_user_db: BaseUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        snapshot_user_db = CachedUserDatabase(mock_user_db, UserCache(snapshots=True))
+        await snapshot_user_db.get_many([user.id])
+        (snapshot,) = await snapshot_user_db.get_many([user.id])
+        assert isinstance(snapshot, UserSnapshot)
+
+        (updated_user,) = await snapshot_user_db.update_many(
+            [snapshot], {"first_name": "Arthur"}
+        )
+        assert updated_user is user
+        assert user.first_name == "Arthur"
+
+        snapshot = UserSnapshot.from_user(user)
+        mocker.patch.object(mock_user_db, "get_many", return_value=[])
+        with pytest.raises(UserNotExists):
+            await snapshot_user_db.delete_many([snapshot])
+
+    @pytest.mark.asyncio
+    async def test_get_full_snapshots(
+        self,
+        mocker: MockerFixture,
+        mock_user_db: BaseUserDatabase[UserModel, IDType],
+        user: UserModel,
+        superuser: UserModel,
+    ):
+        snapshot_user_db = CachedUserDatabase(mock_user_db, UserCache(snapshots=True))
+        await snapshot_user_db.get_many([user.id, superuser.id])
+        assert isinstance(await snapshot_user_db.get(user.id), UserSnapshot)
+
+        get_spy = mocker.spy(mock_user_db, "get")
+        assert await snapshot_user_db.get_full(user.id) is user
+        get_spy.assert_called_once_with(user.id)
+
+        get_many_spy = mocker.spy(mock_user_db, "get_many")
+        assert await snapshot_user_db.get_many_full([superuser.id, user.id]) == [
+            superuser,
+            user,
+        ]
+        get_many_spy.assert_called_once_with([superuser.id, user.id])
+
+    @pytest.mark.asyncio
+    async def test_get_by_oauth_account(
+        self,
+        cached_user_db_oauth: CachedUserDatabase[UserOAuthModel, IDType],
+        user_oauth: UserOAuthModel,
+    ):
+        oauth_account = user_oauth.oauth_accounts[0]
+        for _ in range(2):
+            assert (
+                await cached_user_db_oauth.get_by_oauth_account(
+                    oauth_account.oauth_name, oauth_account.account_id
+                )
+                is user_oauth
+            )
+        assert await cached_user_db_oauth.get_by_oauth_account("foo", "bar") is None
+
+        get_by_oauth_account = cached_user_db_oauth.user_db.get_by_oauth_account
+        assert get_by_oauth_account.call_count == 2  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_oauth_account_writes(
+        self,
+        cached_user_db_oauth: CachedUserDatabase[UserOAuthModel, IDType],
+        user_oauth: UserOAuthModel,
+        oauth_account1: OAuthAccountModel,
+    ):
+        await cached_user_db_oauth.cache.set(user_oauth)
+        await cached_user_db_oauth.add_oauth_account(
+            user_oauth,
+            {
+                "oauth_name": "github",
+                "access_token": "TOKEN",
+                "account_id": "github_id",
+                "account_email": "king.arthur@camelot.bt",
+            },
+        )
+        assert len(cached_user_db_oauth.cache) == 0  # type: ignore
+
+        await cached_user_db_oauth.cache.set(user_oauth)
+        await cached_user_db_oauth.update_oauth_account(
+            user_oauth, oauth_account1, {"access_token": "NEW_TOKEN"}
+        )
+        assert len(cached_user_db_oauth.cache) == 0  # type: ignore
+
+        await cached_user_db_oauth.cache.set(user_oauth)
+        await cached_user_db_oauth.upsert_oauth_account(
+            oauth_account1.oauth_name,
+            oauth_account1.account_id,
+            {"access_token": "UPSERTED_TOKEN"},
+        )
+        assert len(cached_user_db_oauth.cache) == 0  # type: ignore
+        assert await cached_user_db_oauth.upsert_oauth_account("foo", "bar", {}) is None
+
+    @pytest.mark.asyncio
+    async def test_get_many_by_email(
+        self,
+        mocker: MockerFixture,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        get_many_by_email_spy = mocker.spy(cached_user_db.user_db, "get_many_by_email")
+        emails = [user.email, "lancelot@camelot.bt"]
+        assert await cached_user_db.get_many_by_email(emails) == [user]
+        get_many_by_email_spy.assert_called_once_with(emails)
+
+    @pytest.mark.asyncio
+    async def test_paginate(
+        self,
+        mocker: MockerFixture,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        paginate_spy = mocker.spy(cached_user_db.user_db, "paginate")
+        filter = UserFilter(email_prefix="king")
+        assert await cached_user_db.paginate(filter, limit=10) == [user]
+        paginate_spy.assert_called_once_with(filter, None, 10)
+
+    @pytest.mark.asyncio
+    async def test_stream(
+        self,
+        mocker: MockerFixture,
+        cached_user_db: CachedUserDatabase[UserModel, IDType],
+    ):
+        stream_spy = mocker.spy(cached_user_db.user_db, "stream")
+        users = [user async for user in cached_user_db.stream(batch_size=2)]
+
+        assert len(users) == 5
+        stream_spy.assert_called_once_with(None, 2)
+        assert len(cached_user_db.cache) == 0  # type: ignore
+
+    def test_getattr(self, cached_user_db: CachedUserDatabase[UserModel, IDType]):
+        cached_user_db.user_db.session = "SESSION"  # type: ignore
+        assert cached_user_db.session == "SESSION"  # type: ignore
@@ -0,0 +1,605 @@
+import asyncio
+import contextlib
+import dataclasses
+import uuid
+from typing import Any, Dict
+
+import pytest
+from pytest_mock import MockerFixture
+
+from fastapi_users import exceptions
+from fastapi_users.db import (
+    BaseUserDatabase,
+    CircuitBreaker,
+    ResilienceStats,
+    ResilientUserCache,
+    ResilientUserDatabase,
+    UserFilter,
+)
+from fastapi_users.snapshot import UserSnapshot
+from tests.conftest import IDType, OAuthAccountModel, UserModel, UserOAuthModel
+
+
+@pytest.fixture
+def monotonic(mocker: MockerFixture):
+    monotonic = mocker.patch("fastapi_users.db.resilience.time.monotonic")
+    monotonic.return_value = 1000.0
+    return monotonic
+
+
+@pytest.fixture
+def resilient_cache(
+    mock_user_db: BaseUserDatabase[UserModel, IDType],
+) -> ResilientUserCache:
+    @contextlib.asynccontextmanager
+    async def get_background_user_db():
+        yield mock_user_db
+
+    return ResilientUserCache(
+        fresh_seconds=5,
+        stale_seconds=60,
+        max_stale_seconds=3600,
+        circuit_breaker=CircuitBreaker(failure_threshold=2, recovery_seconds=30),
+        get_background_user_db=get_background_user_db,
+    )
+
+
+@pytest.fixture
+def resilient_user_db(
+    mocker: MockerFixture,
+    mock_user_db: BaseUserDatabase[UserModel, IDType],
+    resilient_cache: ResilientUserCache,
+) -> ResilientUserDatabase[UserModel, IDType]:
+    mocker.spy(mock_user_db, "get")
+    return ResilientUserDatabase(mock_user_db, resilient_cache)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.db
+class TestCircuitBreaker:
+    def test_open_and_recover(self, monotonic):
+        circuit_breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=30)
+        assert circuit_breaker.state == CircuitBreaker.CLOSED
+
+        circuit_breaker.record_failure()
+        assert circuit_breaker.allow() is True
+        circuit_breaker.record_failure()
+        assert circuit_breaker.state == CircuitBreaker.OPEN
+        assert circuit_breaker.allow() is False
+
+        monotonic.return_value += 30
+        assert circuit_breaker.state == CircuitBreaker.HALF_OPEN
+        assert circuit_breaker.allow() is True
+        assert circuit_breaker.allow() is False
+
+        circuit_breaker.record_success()
+        assert circuit_breaker.state == CircuitBreaker.CLOSED
+        assert circuit_breaker.failures == 0
+
+    def test_failed_trial(self, monotonic):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=30)
+        circuit_breaker.record_failure()
+        monotonic.return_value += 30
+        assert circuit_breaker.allow() is True
+
+        circuit_breaker.record_failure()
+        assert circuit_breaker.state == CircuitBreaker.OPEN
+
+    def test_release(self, monotonic):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=30)
+        circuit_breaker.record_failure()
+        monotonic.return_value += 30
+        assert circuit_breaker.allow() is True
+
+        circuit_breaker.release()
+        assert circuit_breaker.allow() is True
+
+
+@pytest.mark.db
+class TestResilientUserDatabase:
+    @pytest.mark.asyncio
+    async def test_fresh(
+        self,
+        monotonic,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        assert await resilient_user_db.get(user.id) is user
+        monotonic.return_value += 4
+        assert await resilient_user_db.get(user.id) is user
+
+        assert resilient_user_db.user_db.get.call_count == 1  # type: ignore
+        assert resilient_user_db.cache.stats == ResilienceStats(fresh=1)
+
+    @pytest.mark.asyncio
+    async def test_get_core(
+        self,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        assert await resilient_user_db.get_core(user.id) is user
+        assert await resilient_user_db.get_core(user.id) is user
+        assert await resilient_user_db.get(user.id) is user
+
+        assert resilient_user_db.user_db.get.call_count == 2  # type: ignore
+        assert resilient_user_db.cache.stats == ResilienceStats(fresh=1)
+
+        resilient_user_db.cache.invalidate(user)
+        assert await resilient_user_db.get_core(user.id) is user
+        assert resilient_user_db.user_db.get.call_count == 3  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_get_auth_view(
+        self,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        auth_view = await resilient_user_db.get_auth_view(user.id)
+        assert auth_view == UserSnapshot.from_user(user)
+        assert await resilient_user_db.get_auth_view(user.id) is auth_view
+        assert resilient_user_db.user_db.get.call_count == 1  # type: ignore
+
+        resilient_user_db.cache.invalidate(user)
+        assert await resilient_user_db.get_auth_view(user.id) == auth_view
+        assert resilient_user_db.user_db.get.call_count == 2  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate(
+        self,
+        monotonic,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        assert await resilient_user_db.get(user.id) is user
+
+        monotonic.return_value += 10
+        assert await resilient_user_db.get(user.id) is user
+        assert await resilient_user_db.get(user.id) is user
+        await _settle()
+
+        assert resilient_user_db.user_db.get.call_count == 2  # type: ignore
+        assert resilient_user_db.cache.stats.stale == 2
+        assert resilient_user_db.cache.stats.revalidations == 1
+
+        # Revalidated: fresh again
+        assert await resilient_user_db.get(user.id) is user
+        assert resilient_user_db.cache.stats.fresh == 1
+
+    @pytest.mark.asyncio
+    async def test_background_user_db(
+        self,
+        mocker: MockerFixture,
+        monotonic,
+        mock_user_db: BaseUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        background_user_db = mocker.MagicMock(wraps=mock_user_db)
+        background_user_db.get = mocker.AsyncMock(return_value=user)
+
+        @contextlib.asynccontextmanager
+        async def get_background_user_db():
+            yield background_user_db
+
+        resilient_user_db = ResilientUserDatabase(
+            mock_user_db,
+            ResilientUserCache(get_background_user_db=get_background_user_db),
+        )
+        await resilient_user_db.get(user.id)
+        monotonic.return_value += 10
+        await resilient_user_db.get(user.id)
+        await _settle()
+
+        background_user_db.get.assert_awaited_once_with(user.id)
+
+    @pytest.mark.asyncio
+    async def test_stale_without_background_user_db(
+        self,
+        mocker: MockerFixture,
+        monotonic,
+        mock_user_db: BaseUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        get_spy = mocker.spy(mock_user_db, "get")
+        resilient_user_db = ResilientUserDatabase(mock_user_db, ResilientUserCache())
+        await resilient_user_db.get(user.id)
+
+        # Revalidated before being served, with the adapter of the request
+        monotonic.return_value += 10
+        assert await resilient_user_db.get(user.id) is user
+        assert get_spy.call_count == 2
+        assert resilient_user_db.cache.stats.stale == 0
+        assert resilient_user_db.cache.stats.revalidations == 0
+
+        get_spy.side_effect = ConnectionError()
+        monotonic.return_value += 10
+        assert await resilient_user_db.get(user.id) is user
+        assert resilient_user_db.cache.stats.fallback == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback(
+        self,
+        mocker: MockerFixture,
+        monotonic,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        assert await resilient_user_db.get(user.id) is user
+        mocker.patch.object(
+            resilient_user_db.user_db, "get", side_effect=ConnectionError()
+        )
+
+        monotonic.return_value += 600
+        assert await resilient_user_db.get(user.id) is user
+        assert resilient_user_db.cache.stats.fallback == 1
+        assert resilient_user_db.cache.stats.failures == 1
+
+        monotonic.return_value += 3600
+        with pytest.raises(exceptions.UserDatabaseUnavailable):
+            await resilient_user_db.get(user.id)
+
+    @pytest.mark.asyncio
+    async def test_unknown_user_unavailable(
+        self,
+        mocker: MockerFixture,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+    ):
+        mocker.patch.object(
+            resilient_user_db.user_db, "get", side_effect=ConnectionError()
+        )
+        with pytest.raises(exceptions.UserDatabaseUnavailable) as excinfo:
+            await resilient_user_db.get(uuid.uuid4())
+        assert isinstance(excinfo.value.__cause__, ConnectionError)
+
+    @pytest.mark.asyncio
+    async def test_timeout(
+        self,
+        mock_user_db: BaseUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        events = []
+
+        @contextlib.asynccontextmanager
+        async def get_background_user_db():
+            try:
+                yield mock_user_db
+            finally:
+                events.append("closed")
+
+        resilient_cache = ResilientUserCache[UserModel, IDType](
+            fresh_seconds=0,
+            stale_seconds=0,
+            timeout_seconds=0.01,
+            get_background_user_db=get_background_user_db,
+        )
+        resilient_user_db = ResilientUserDatabase(mock_user_db, resilient_cache)
+        assert await resilient_user_db.get(user.id) is user
+
+        async def slow_get(id):
+            await asyncio.sleep(1)
+
+        mock_user_db.get = slow_get  # type: ignore
+        assert await resilient_user_db.get(user.id) is user
+        assert resilient_cache.stats.fallback == 1
+        # The cancelled lookup ran on the background adapter
+        assert events == ["closed", "closed"]
+
+    @pytest.mark.asyncio
+    async def test_timeout_without_background_user_db(
+        self,
+        mock_user_db: BaseUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        resilient_cache = ResilientUserCache[UserModel, IDType](
+            fresh_seconds=0, stale_seconds=0, timeout_seconds=0.01
+        )
+        resilient_user_db = ResilientUserDatabase(mock_user_db, resilient_cache)
+        assert await resilient_user_db.get(user.id) is user
+
+        async def slow_get(id):
+            await asyncio.sleep(0.05)
+            return user
+
+        # Cancelling it would leave the session of the request in an unknown state
+        mock_user_db.get = slow_get  # type: ignore
+        assert await resilient_user_db.get(user.id) is user
+        assert resilient_cache.stats.fallback == 0
+
+    @pytest.mark.asyncio
+    async def test_circuit_breaker(
+        self,
+        mocker: MockerFixture,
+        monotonic,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        assert await resilient_user_db.get(user.id) is user
+        get_mock = mocker.patch.object(
+            resilient_user_db.user_db, "get", side_effect=ConnectionError()
+        )
+        monotonic.return_value += 600
+
+        for _ in range(5):
+            assert await resilient_user_db.get(user.id) is user
+        assert get_mock.call_count == 2
+        assert resilient_user_db.cache.circuit_breaker.state == CircuitBreaker.OPEN
+
+        monotonic.return_value += 30
+        get_mock.side_effect = None
+        get_mock.return_value = user
+        assert await resilient_user_db.get(user.id) is user
+        assert get_mock.call_count == 3
+        assert resilient_user_db.cache.circuit_breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_cancelled_fetch(
+        self,
+        mock_user_db: BaseUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        resilient_cache = ResilientUserCache[UserModel, IDType]()
+        resilient_user_db = ResilientUserDatabase(mock_user_db, resilient_cache)
+        event = asyncio.Event()
+
+        async def blocking_get(id):
+            await event.wait()
+
+        mock_user_db.get = blocking_get  # type: ignore
+        task = asyncio.ensure_future(resilient_user_db.get(user.id))
+        await _settle()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert resilient_cache.stats.failures == 0
+
+    @pytest.mark.asyncio
+    async def test_not_existing(
+        self,
+        monotonic,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        assert await resilient_user_db.get(uuid.uuid4()) is None
+
+        await resilient_user_db.get(user.id)
+        resilient_user_db.user_db.get.side_effect = [None]  # type: ignore
+        monotonic.return_value += 100
+        assert await resilient_user_db.get(user.id) is None
+
+    @pytest.mark.asyncio
+    async def test_get_by_email(
+        self,
+        mocker: MockerFixture,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        get_by_email_spy = mocker.spy(resilient_user_db.user_db, "get_by_email")
+        assert await resilient_user_db.get_by_email(user.email) is user
+        assert await resilient_user_db.get_by_email(user.email.upper()) is user
+        # Used to log in: a stale password must never be returned
+        assert get_by_email_spy.call_count == 2
+        assert resilient_user_db.cache.stats == ResilienceStats()
+
+    @pytest.mark.asyncio
+    async def test_get_by_oauth_account(
+        self,
+        mocker: MockerFixture,
+        mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+        user_oauth: UserOAuthModel,
+    ):
+        get_spy = mocker.spy(mock_user_db_oauth, "get_by_oauth_account")
+        resilient_user_db = ResilientUserDatabase(
+            mock_user_db_oauth, ResilientUserCache()
+        )
+        oauth_account = user_oauth.oauth_accounts[0]
+        for _ in range(2):
+            assert (
+                await resilient_user_db.get_by_oauth_account(
+                    oauth_account.oauth_name, oauth_account.account_id
+                )
+                is user_oauth
+            )
+        assert get_spy.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_max_size(self, mock_user_db, user: UserModel, superuser: UserModel):
+        resilient_cache = ResilientUserCache[UserModel, IDType](max_size=1)
+        resilient_user_db = ResilientUserDatabase(mock_user_db, resilient_cache)
+        await resilient_user_db.get(user.id)
+        await resilient_user_db.get(superuser.id)
+        await resilient_user_db.get(superuser.id)
+        assert resilient_cache.stats.fresh == 1
+
+        resilient_cache.clear()
+        await resilient_user_db.get(superuser.id)
+        assert resilient_cache.stats.fresh == 1
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate(
+        self,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        created_user = await resilient_user_db.create(
+            {"email": "lancelot@camelot.bt", "hashed_password": "guinevere"}
+        )
+        assert created_user.email == "lancelot@camelot.bt"
+
+        await resilient_user_db.get(user.id)
+        await resilient_user_db.get_by_email(user.email)
+        # The user is fetched again before each write
+        await resilient_user_db.update(user, {"is_active": False})
+        await resilient_user_db.get(user.id)
+        assert resilient_user_db.user_db.get.call_count == 3  # type: ignore
+
+        await resilient_user_db.delete(user)
+        await resilient_user_db.get(user.id)
+        assert resilient_user_db.user_db.get.call_count == 5  # type: ignore
+        assert resilient_user_db.cache.stats.fresh == 0
+
+    @pytest.mark.asyncio
+    async def test_update_own_instance(
+        self,
+        mocker: MockerFixture,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        # The known instance may be attached to the session of another request
+        shared_user = dataclasses.replace(user)
+        update_spy = mocker.spy(resilient_user_db.user_db, "update")
+        await resilient_user_db.update(shared_user, {"is_active": False})
+        update_spy.assert_called_once_with(user, {"is_active": False})
+
+    @pytest.mark.asyncio
+    async def test_bulk_writes_invalidate(
+        self,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+        superuser: UserModel,
+    ):
+        created_users = await resilient_user_db.create_many(
+            [{"email": "lancelot@camelot.bt", "hashed_password": "guinevere"}]
+        )
+        assert created_users[0].email == "lancelot@camelot.bt"
+
+        await resilient_user_db.get(user.id)
+        await resilient_user_db.get(superuser.id)
+        # The users are fetched again before each write
+        await resilient_user_db.update_many([user, superuser], {"is_active": False})
+        await resilient_user_db.get(user.id)
+        await resilient_user_db.get(superuser.id)
+        assert resilient_user_db.user_db.get.call_count == 6  # type: ignore
+
+        await resilient_user_db.delete_many([user, superuser])
+        await resilient_user_db.get(user.id)
+        assert resilient_user_db.user_db.get.call_count == 9  # type: ignore
+        assert resilient_user_db.cache.stats.fresh == 0
+
+    @pytest.mark.asyncio
+    async def test_write_cancels_revalidation(
+        self,
+        monotonic,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        await resilient_user_db.get(user.id)
+        monotonic.return_value += 10
+        await resilient_user_db.get(user.id)
+        await resilient_user_db.update(user, {"is_active": False})
+        await _settle()
+
+        assert await resilient_user_db.get(user.id) is user
+        assert resilient_user_db.cache.stats.fresh == 0
+
+    @pytest.mark.asyncio
+    async def test_oauth_account_writes(
+        self,
+        mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+        user_oauth: UserOAuthModel,
+        oauth_account1: OAuthAccountModel,
+    ):
+        resilient_cache = ResilientUserCache[UserOAuthModel, IDType]()
+        resilient_user_db = ResilientUserDatabase(mock_user_db_oauth, resilient_cache)
+        create_dict: Dict[str, Any] = {
+            "oauth_name": "github",
+            "access_token": "TOKEN",
+            "account_id": "github_id",
+            "account_email": "king.arthur@camelot.bt",
+        }
+
+        await resilient_user_db.get(user_oauth.id)
+        await resilient_user_db.add_oauth_account(user_oauth, create_dict)
+        await resilient_user_db.get(user_oauth.id)
+        await resilient_user_db.update_oauth_account(
+            user_oauth, oauth_account1, {"access_token": "NEW_TOKEN"}
+        )
+        await resilient_user_db.get(user_oauth.id)
+        await resilient_user_db.upsert_oauth_account(
+            oauth_account1.oauth_name,
+            oauth_account1.account_id,
+            {"access_token": "UPSERTED_TOKEN"},
+        )
+        await resilient_user_db.get(user_oauth.id)
+        assert resilient_cache.stats.fresh == 0
+
+    @pytest.mark.asyncio
+    async def test_load_oauth_accounts(
+        self,
+        mocker: MockerFixture,
+        mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+        resilient_cache: ResilientUserCache,
+        user_oauth: UserOAuthModel,
+    ):
+        load_spy = mocker.spy(mock_user_db_oauth, "load_oauth_accounts")
+        wrapped_user_db = ResilientUserDatabase(mock_user_db_oauth, resilient_cache)
+        assert await wrapped_user_db.load_oauth_accounts(user_oauth) is user_oauth
+        load_spy.assert_called_once_with(user_oauth)
+
+    @pytest.mark.asyncio
+    async def test_get_full(
+        self,
+        mocker: MockerFixture,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        get_full_spy = mocker.spy(resilient_user_db.user_db, "get_full")
+        assert await resilient_user_db.get_full(user.id) is user
+        get_full_spy.assert_called_once_with(user.id)
+
+        get_many_full_spy = mocker.spy(resilient_user_db.user_db, "get_many_full")
+        assert await resilient_user_db.get_many_full([user.id]) == [user]
+        get_many_full_spy.assert_called_once_with([user.id])
+
+    @pytest.mark.asyncio
+    async def test_get_many(
+        self,
+        mocker: MockerFixture,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+        superuser: UserModel,
+    ):
+        get_many_spy = mocker.spy(resilient_user_db.user_db, "get_many")
+        ids = [superuser.id, uuid.uuid4(), user.id]
+        assert await resilient_user_db.get_many(ids) == [superuser, user]
+        get_many_spy.assert_called_once_with(ids)
+
+    @pytest.mark.asyncio
+    async def test_get_many_by_email(
+        self,
+        mocker: MockerFixture,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        get_many_by_email_spy = mocker.spy(
+            resilient_user_db.user_db, "get_many_by_email"
+        )
+        emails = [user.email, "lancelot@camelot.bt"]
+        assert await resilient_user_db.get_many_by_email(emails) == [user]
+        get_many_by_email_spy.assert_called_once_with(emails)
+
+    @pytest.mark.asyncio
+    async def test_paginate(
+        self,
+        mocker: MockerFixture,
+        resilient_user_db: ResilientUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        paginate_spy = mocker.spy(resilient_user_db.user_db, "paginate")
+        filter = UserFilter(email_prefix="king")
+        assert await resilient_user_db.paginate(filter, limit=10) == [user]
+        paginate_spy.assert_called_once_with(filter, None, 10)
+
+    @pytest.mark.asyncio
+    async def test_stream(
+        self, resilient_user_db: ResilientUserDatabase[UserModel, IDType]
+    ):
+        users = [user async for user in resilient_user_db.stream(batch_size=2)]
+        assert len(users) == 5
+        assert resilient_user_db.cache.stats.fresh == 0
+
+    def test_getattr(self, resilient_user_db: ResilientUserDatabase[UserModel, IDType]):
+        resilient_user_db.user_db.session = "SESSION"  # type: ignore
+        assert resilient_user_db.session == "SESSION"  # type: ignore
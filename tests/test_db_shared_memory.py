@@ -0,0 +1,268 @@
+import multiprocessing
+import os
+import sys
+
+import pytest
+from pytest_mock import MockerFixture
+
+from fastapi_users.db import (
+    CachedUserDatabase,
+    PickleUserSerializer,
+    SharedMemoryUserCache,
+)
+from fastapi_users.db.shared_memory import HEADER_SIZE, SLOT_VERSION, _hash_key
+from fastapi_users.snapshot import UserSnapshot
+from tests.conftest import IDType, UserModel
+
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    return str(tmp_path / "users.cache")
+
+
+@pytest.fixture
+def shared_memory_cache(cache_path: str):
+    cache = SharedMemoryUserCache[UserModel, IDType](cache_path, slots=16)
+    yield cache
+    cache.close()
+
+
+def _set_in_child(path: str, user: UserModel):
+    import asyncio
+
+    cache = SharedMemoryUserCache[UserModel, IDType](path, slots=16)
+    asyncio.run(cache.set(user))
+    cache.close()
+
+
+@pytest.mark.db
+class TestSharedMemoryUserCache:
+    @pytest.mark.asyncio
+    async def test_get(
+        self, shared_memory_cache: SharedMemoryUserCache, user: UserModel
+    ):
+        assert await shared_memory_cache.get(user.id) is None
+
+        await shared_memory_cache.set(user)
+        cached_user = await shared_memory_cache.get(user.id)
+        assert cached_user == UserSnapshot.from_user(user)
+        assert cached_user is not user
+        assert shared_memory_cache.stats.hits == 1
+        assert shared_memory_cache.stats.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_get_by_email_oauth_account(
+        self, shared_memory_cache: SharedMemoryUserCache, user: UserModel
+    ):
+        await shared_memory_cache.set(user)
+        assert await shared_memory_cache.get_by_email(user.email) is None
+        assert await shared_memory_cache.get_by_oauth_account("foo", "bar") is None
+        assert shared_memory_cache.stats.misses == 2
+
+    @pytest.mark.asyncio
+    async def test_shared_between_instances(
+        self,
+        cache_path: str,
+        shared_memory_cache: SharedMemoryUserCache,
+        user: UserModel,
+    ):
+        other_cache = SharedMemoryUserCache[UserModel, IDType](cache_path, slots=16)
+        try:
+            await other_cache.set(user)
+            assert await shared_memory_cache.get(user.id) == UserSnapshot.from_user(
+                user
+            )
+
+            await shared_memory_cache.invalidate(user)
+            assert await other_cache.get(user.id) is None
+        finally:
+            other_cache.close()
+
+    @pytest.mark.skipif(
+        sys.platform == "win32", reason="fork start method is not available"
+    )
+    @pytest.mark.asyncio
+    async def test_shared_between_processes(
+        self,
+        cache_path: str,
+        shared_memory_cache: SharedMemoryUserCache,
+        user: UserModel,
+    ):
+        process = multiprocessing.get_context("fork").Process(
+            target=_set_in_child, args=(cache_path, user)
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+
+        assert await shared_memory_cache.get(user.id) == UserSnapshot.from_user(user)
+
+    @pytest.mark.asyncio
+    async def test_ttl(
+        self,
+        mocker: MockerFixture,
+        shared_memory_cache: SharedMemoryUserCache,
+        user: UserModel,
+    ):
+        time = mocker.patch("fastapi_users.db.shared_memory.time.time")
+        time.return_value = 1000.0
+        await shared_memory_cache.set(user)
+
+        time.return_value = 1059.0
+        assert await shared_memory_cache.get(user.id) == UserSnapshot.from_user(user)
+
+        time.return_value = 1060.0
+        assert await shared_memory_cache.get(user.id) is None
+
+    @pytest.mark.asyncio
+    async def test_update_existing(
+        self, shared_memory_cache: SharedMemoryUserCache, user: UserModel
+    ):
+        await shared_memory_cache.set(user)
+        user.is_active = False
+        await shared_memory_cache.set(user)
+
+        cached_user = await shared_memory_cache.get(user.id)
+        assert cached_user is not None
+        assert cached_user.is_active is False
+
+    @pytest.mark.asyncio
+    async def test_pickle_serializer(self, cache_path: str, user: UserModel):
+        cache = SharedMemoryUserCache[UserModel, IDType](
+            cache_path, slots=16, serializer=PickleUserSerializer()
+        )
+        try:
+            await cache.set(user)
+            assert await cache.get(user.id) == user
+        finally:
+            cache.close()
+
+    @pytest.mark.asyncio
+    async def test_eviction(self, cache_path: str):
+        cache = SharedMemoryUserCache[UserModel, IDType](cache_path, slots=2, probe=2)
+        users = [
+            UserModel(email=f"knight{i}@camelot.bt", hashed_password="x")
+            for i in range(3)
+        ]
+        try:
+            for user in users:
+                await cache.set(user)
+            assert cache.stats.evictions == 1
+            assert await cache.get(users[0].id) is None
+            assert await cache.get(users[1].id) == UserSnapshot.from_user(users[1])
+            assert await cache.get(users[2].id) == UserSnapshot.from_user(users[2])
+        finally:
+            cache.close()
+
+    @pytest.mark.asyncio
+    async def test_too_large(self, cache_path: str, user: UserModel):
+        cache = SharedMemoryUserCache[UserModel, IDType](
+            cache_path, slots=4, slot_size=64
+        )
+        try:
+            await cache.set(user)
+            assert await cache.get(user.id) is None
+        finally:
+            cache.close()
+
+    @pytest.mark.asyncio
+    async def test_torn_read(
+        self, shared_memory_cache: SharedMemoryUserCache, user: UserModel
+    ):
+        await shared_memory_cache.set(user)
+        for index in range(shared_memory_cache.slots):
+            offset = HEADER_SIZE + index * shared_memory_cache.slot_size
+            (version,) = SLOT_VERSION.unpack_from(shared_memory_cache._mmap, offset)
+            if version:
+                # Simulate a writer in progress
+                SLOT_VERSION.pack_into(shared_memory_cache._mmap, offset, version + 1)
+
+        assert await shared_memory_cache.get(user.id) is None
+
+        # The next writer recovers the slot
+        await shared_memory_cache.set(user)
+        assert await shared_memory_cache.get(user.id) == UserSnapshot.from_user(user)
+
+    @pytest.mark.asyncio
+    async def test_clear(
+        self, shared_memory_cache: SharedMemoryUserCache, user: UserModel
+    ):
+        await shared_memory_cache.set(user)
+        await shared_memory_cache.clear()
+        assert await shared_memory_cache.get(user.id) is None
+
+    @pytest.mark.asyncio
+    async def test_cached_user_database(
+        self,
+        mocker: MockerFixture,
+        mock_user_db,
+        shared_memory_cache: SharedMemoryUserCache,
+        user: UserModel,
+    ):
+        get_spy = mocker.spy(mock_user_db, "get")
+        cached_user_db = CachedUserDatabase(mock_user_db, shared_memory_cache)
+
+        assert await cached_user_db.get(user.id) is user
+        snapshot = await cached_user_db.get(user.id)
+        assert snapshot == UserSnapshot.from_user(user)
+        assert get_spy.call_count == 1
+
+        update_spy = mocker.spy(mock_user_db, "update")
+        updated_user = await cached_user_db.update(snapshot, {"is_active": False})
+        assert updated_user is user
+        assert user.is_active is False
+        update_spy.assert_called_once_with(user, {"is_active": False})
+        assert get_spy.call_count == 2
+
+        assert await cached_user_db.get(user.id) is user
+        assert get_spy.call_count == 3
+
+
+@pytest.mark.db
+class TestInvalidLayout:
+    def test_slot_size_too_small(self, cache_path: str):
+        with pytest.raises(ValueError):
+            SharedMemoryUserCache(cache_path, slot_size=16)
+
+    def test_size_mismatch(self, cache_path: str):
+        SharedMemoryUserCache(cache_path, slots=16).close()
+        with pytest.raises(ValueError):
+            SharedMemoryUserCache(cache_path, slots=32)
+
+    def test_layout_mismatch(self, cache_path: str):
+        SharedMemoryUserCache(cache_path, slots=16, slot_size=512).close()
+        with pytest.raises(ValueError):
+            SharedMemoryUserCache(cache_path, slots=32, slot_size=256)
+
+
+@pytest.mark.db
+class TestUnsafeFile:
+    def test_symlink(self, cache_path: str, tmp_path):
+        target = tmp_path / "target.cache"
+        os.symlink(target, cache_path)
+        with pytest.raises(OSError):
+            SharedMemoryUserCache(cache_path, slots=16)
+        assert not target.exists()
+
+    def test_permissions(self, cache_path: str):
+        SharedMemoryUserCache(cache_path, slots=16).close()
+        os.chmod(cache_path, 0o666)
+        with pytest.raises(ValueError):
+            SharedMemoryUserCache(cache_path, slots=16)
+
+    def test_owner(self, mocker: MockerFixture, cache_path: str):
+        SharedMemoryUserCache(cache_path, slots=16).close()
+        mocker.patch("os.getuid", return_value=os.getuid() + 1)
+        with pytest.raises(ValueError):
+            SharedMemoryUserCache(cache_path, slots=16)
+
+    def test_not_regular_file(self, cache_path: str):
+        os.mkfifo(cache_path, 0o600)
+        with pytest.raises(ValueError):
+            SharedMemoryUserCache(cache_path, slots=16)
+
+
+@pytest.mark.db
+def test_key_hash_independent_from_process():
+    key = b"c50d5d5c-3f5a-4c0d-9d0a-1c7c3e5b6a1e"
+    assert _hash_key(key) == 5232202333646093095
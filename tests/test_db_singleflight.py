@@ -0,0 +1,514 @@
+import asyncio
+import contextlib
+import copy
+import dataclasses
+import uuid
+
+import pytest
+from pytest_mock import MockerFixture
+
+from fastapi_users.db import (
+    BaseUserDatabase,
+    SingleFlight,
+    SingleFlightUserDatabase,
+    UserFilter,
+)
+from fastapi_users.snapshot import UserSnapshot
+from tests.conftest import IDType, OAuthAccountModel, UserModel, UserOAuthModel
+
+
+@pytest.fixture
+def group() -> SingleFlight:
+    return SingleFlight()
+
+
+@pytest.fixture
+def single_flight_user_db(
+    mocker: MockerFixture,
+    mock_user_db: BaseUserDatabase[UserModel, IDType],
+    group: SingleFlight,
+) -> SingleFlightUserDatabase[UserModel, IDType]:
+    mocker.spy(mock_user_db, "get")
+    mocker.spy(mock_user_db, "get_by_email")
+    return SingleFlightUserDatabase(mock_user_db, group)
+
+
+@pytest.mark.db
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_coalesce(self, group: SingleFlight):
+        calls = 0
+        event = asyncio.Event()
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            await event.wait()
+            return calls
+
+        tasks = [asyncio.ensure_future(group.do("key", fn)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert len(group) == 1
+        event.set()
+
+        assert await asyncio.gather(*tasks) == [1] * 5
+        assert calls == 1
+        assert group.coalesced == 4
+        assert len(group) == 0
+
+        assert await group.do("key", fn) == 2
+
+    @pytest.mark.asyncio
+    async def test_different_keys(self, group: SingleFlight):
+        async def fn(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(
+            group.do("a", lambda: fn("a")), group.do("b", lambda: fn("b"))
+        )
+        assert results == ["a", "b"]
+        assert group.coalesced == 0
+
+    @pytest.mark.asyncio
+    async def test_error(self, group: SingleFlight):
+        event = asyncio.Event()
+
+        async def fn():
+            await event.wait()
+            raise RuntimeError("ERROR")
+
+        tasks = [asyncio.ensure_future(group.do("key", fn)) for _ in range(3)]
+        await asyncio.sleep(0)
+        event.set()
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(group) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller(self, group: SingleFlight):
+        event = asyncio.Event()
+
+        async def fn():
+            await event.wait()
+            return "RESULT"
+
+        first = asyncio.ensure_future(group.do("key", fn))
+        second = asyncio.ensure_future(group.do("key", fn))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        event.set()
+
+        assert await second == "RESULT"
+        assert first.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_unshielded(self, group: SingleFlight):
+        event = asyncio.Event()
+        calls = []
+
+        async def fn():
+            calls.append("started")
+            try:
+                await event.wait()
+            except asyncio.CancelledError:
+                calls.append("cancelled")
+                raise
+            return "RESULT"
+
+        first = asyncio.ensure_future(group.do("key", fn, shield=False))
+        second = asyncio.ensure_future(group.do("key", fn, shield=False))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        event.set()
+
+        # The second caller started its own call
+        assert await second == "RESULT"
+        assert first.cancelled()
+        assert calls == ["started", "cancelled", "started"]
+        assert len(group) == 0
+
+    @pytest.mark.asyncio
+    async def test_all_callers_cancelled_error(self, group: SingleFlight):
+        event = asyncio.Event()
+
+        async def fn():
+            await event.wait()
+            raise RuntimeError("ERROR")
+
+        task = asyncio.ensure_future(group.do("key", fn))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.sleep(0)
+
+        event.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert len(group) == 0
+
+    @pytest.mark.asyncio
+    async def test_forget(self, group: SingleFlight):
+        event = asyncio.Event()
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            call = calls
+            await event.wait()
+            return call
+
+        first = asyncio.ensure_future(group.do("key", fn))
+        await asyncio.sleep(0)
+        group.forget("key")
+        second = asyncio.ensure_future(group.do("key", fn))
+        await asyncio.sleep(0)
+        event.set()
+
+        assert await first == 1
+        assert await second == 2
+        assert len(group) == 0
+
+
+@pytest.mark.db
+class TestSingleFlightUserDatabase:
+    @pytest.mark.asyncio
+    async def test_get(
+        self,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        results = await asyncio.gather(
+            *[single_flight_user_db.get(user.id) for _ in range(5)],
+            single_flight_user_db.get(uuid.uuid4()),
+        )
+        assert results == [user] * 5 + [None]
+        assert single_flight_user_db.user_db.get.call_count == 2  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_cancelled_first_caller(
+        self,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        event = asyncio.Event()
+        cancelled = []
+        get = single_flight_user_db.user_db.get
+
+        async def slow_get(id):
+            try:
+                await event.wait()
+            except asyncio.CancelledError:
+                cancelled.append(id)
+                raise
+            return await get(id)
+
+        single_flight_user_db.user_db.get = slow_get  # type: ignore
+        first = asyncio.ensure_future(single_flight_user_db.get(user.id))
+        second = asyncio.ensure_future(single_flight_user_db.get(user.id))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        # The lookup uses the session of the first caller: it's not shielded
+        first.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        event.set()
+
+        assert await second == user
+        assert cancelled == [user.id]
+
+    @pytest.mark.asyncio
+    async def test_background_user_db(
+        self,
+        mocker: MockerFixture,
+        mock_user_db: BaseUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        events = []
+        background_user_db = copy.copy(mock_user_db)
+        get_spy = mocker.spy(background_user_db, "get")
+        event = asyncio.Event()
+
+        @contextlib.asynccontextmanager
+        async def get_background_user_db():
+            try:
+                await event.wait()
+                yield background_user_db
+            finally:
+                events.append("closed")
+
+        group = SingleFlight(get_background_user_db=get_background_user_db)
+        request_user_db = mocker.spy(mock_user_db, "get")
+        single_flight_user_db = SingleFlightUserDatabase(mock_user_db, group)
+
+        first = asyncio.ensure_future(single_flight_user_db.get(user.id))
+        second = asyncio.ensure_future(single_flight_user_db.get(user.id))
+        await asyncio.sleep(0)
+
+        # Cancelling the first caller doesn't cancel the shared lookup
+        first.cancel()
+        await asyncio.sleep(0)
+        event.set()
+
+        assert await second == user
+        assert first.cancelled()
+        assert get_spy.call_count == 1
+        assert request_user_db.call_count == 0
+        assert events == ["closed"]
+
+    @pytest.mark.asyncio
+    async def test_get_core(
+        self,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        results = await asyncio.gather(
+            *[single_flight_user_db.get_core(user.id) for _ in range(5)],
+            single_flight_user_db.get(user.id),
+        )
+        assert results == [user] * 6
+        # Core and full lookups aren't coalesced together
+        assert single_flight_user_db.user_db.get.call_count == 2  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_get_auth_view(
+        self,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        results = await asyncio.gather(
+            *[single_flight_user_db.get_auth_view(user.id) for _ in range(5)]
+        )
+        assert results == [UserSnapshot.from_user(user)] * 5
+        assert single_flight_user_db.user_db.get.call_count == 1  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_get_by_email(
+        self,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        results = await asyncio.gather(
+            single_flight_user_db.get_by_email(user.email),
+            single_flight_user_db.get_by_email(user.email.upper()),
+        )
+        assert results == [user, user]
+        get_by_email = single_flight_user_db.user_db.get_by_email
+        assert get_by_email.call_count == 1  # type: ignore
+
+    @pytest.mark.asyncio
+    async def test_get_by_oauth_account(
+        self,
+        mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+        group: SingleFlight,
+        user_oauth: UserOAuthModel,
+    ):
+        single_flight_user_db = SingleFlightUserDatabase(mock_user_db_oauth, group)
+        oauth_account = user_oauth.oauth_accounts[0]
+        results = await asyncio.gather(
+            *[
+                single_flight_user_db.get_by_oauth_account(
+                    oauth_account.oauth_name, oauth_account.account_id
+                )
+                for _ in range(3)
+            ]
+        )
+        assert results == [user_oauth] * 3
+        assert group.coalesced == 2
+
+    @pytest.mark.asyncio
+    async def test_writes(
+        self,
+        mocker: MockerFixture,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        group: SingleFlight,
+        user: UserModel,
+        superuser: UserModel,
+    ):
+        forget_spy = mocker.spy(group, "forget")
+
+        await single_flight_user_db.create(
+            {"email": "lancelot@camelot.bt", "hashed_password": "guinevere"}
+        )
+        forget_spy.assert_any_call(("get_by_email", "lancelot@camelot.bt"))
+
+        await single_flight_user_db.update(user, {"email": "king.arthur@tintagel.bt"})
+        forget_spy.assert_any_call(("get_by_email", "king.arthur@camelot.bt"))
+        forget_spy.assert_any_call(("get_by_email", "king.arthur@tintagel.bt"))
+
+        await single_flight_user_db.delete(superuser)
+        forget_spy.assert_any_call(("get", superuser.id))
+
+    @pytest.mark.asyncio
+    async def test_bulk_writes(
+        self,
+        mocker: MockerFixture,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        group: SingleFlight,
+        user: UserModel,
+        superuser: UserModel,
+        verified_user: UserModel,
+    ):
+        forget_spy = mocker.spy(group, "forget")
+
+        assert await single_flight_user_db.get_many([user.id, superuser.id]) == [
+            user,
+            superuser,
+        ]
+
+        await single_flight_user_db.create_many(
+            [{"email": "lancelot@camelot.bt", "hashed_password": "guinevere"}]
+        )
+        forget_spy.assert_any_call(("get_by_email", "lancelot@camelot.bt"))
+
+        await single_flight_user_db.update_many([user, superuser], {"is_active": False})
+        forget_spy.assert_any_call(("get", user.id))
+        forget_spy.assert_any_call(("get", superuser.id))
+
+        await single_flight_user_db.delete_many([verified_user])
+        forget_spy.assert_any_call(("get", verified_user.id))
+
+    @pytest.mark.asyncio
+    async def test_writes_own_instances(
+        self,
+        mocker: MockerFixture,
+        mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+        group: SingleFlight,
+        user_oauth: UserOAuthModel,
+        oauth_account1: OAuthAccountModel,
+    ):
+        single_flight_user_db = SingleFlightUserDatabase(mock_user_db_oauth, group)
+        # Coalesced lookups may return the instance of another request
+        shared_user = dataclasses.replace(user_oauth)
+        shared_oauth_account = dataclasses.replace(oauth_account1)
+
+        update_spy = mocker.spy(mock_user_db_oauth, "update")
+        await single_flight_user_db.update(shared_user, {"is_active": False})
+        update_spy.assert_called_once_with(user_oauth, {"is_active": False})
+
+        update_many_spy = mocker.spy(mock_user_db_oauth, "update_many")
+        await single_flight_user_db.update_many([shared_user], {"is_active": True})
+        update_many_spy.assert_called_once_with([user_oauth], {"is_active": True})
+
+        update_oauth_account_spy = mocker.spy(
+            mock_user_db_oauth, "update_oauth_account"
+        )
+        await single_flight_user_db.update_oauth_account(
+            shared_user, shared_oauth_account, {"access_token": "NEW_TOKEN"}
+        )
+        update_oauth_account_spy.assert_called_once_with(
+            user_oauth, oauth_account1, {"access_token": "NEW_TOKEN"}
+        )
+
+    @pytest.mark.asyncio
+    async def test_oauth_account_writes(
+        self,
+        mocker: MockerFixture,
+        mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+        group: SingleFlight,
+        user_oauth: UserOAuthModel,
+        oauth_account1: OAuthAccountModel,
+    ):
+        forget_spy = mocker.spy(group, "forget")
+        single_flight_user_db = SingleFlightUserDatabase(mock_user_db_oauth, group)
+
+        await single_flight_user_db.add_oauth_account(
+            user_oauth,
+            {
+                "oauth_name": "github",
+                "access_token": "TOKEN",
+                "account_id": "github_id",
+                "account_email": "king.arthur@camelot.bt",
+            },
+        )
+        forget_spy.assert_any_call(("get_by_oauth_account", "github", "github_id"))
+
+        forget_spy.reset_mock()
+        await single_flight_user_db.update_oauth_account(
+            user_oauth, oauth_account1, {"access_token": "NEW_TOKEN"}
+        )
+        forget_spy.assert_any_call(("get", user_oauth.id))
+
+        forget_spy.reset_mock()
+        await single_flight_user_db.upsert_oauth_account(
+            oauth_account1.oauth_name,
+            oauth_account1.account_id,
+            {"access_token": "UPSERTED_TOKEN"},
+        )
+        forget_spy.assert_any_call(("get", user_oauth.id))
+        assert oauth_account1.access_token == "UPSERTED_TOKEN"
+
+    @pytest.mark.asyncio
+    async def test_load_oauth_accounts(
+        self,
+        mocker: MockerFixture,
+        mock_user_db_oauth: BaseUserDatabase[UserOAuthModel, IDType],
+        group: SingleFlight,
+        user_oauth: UserOAuthModel,
+    ):
+        load_spy = mocker.spy(mock_user_db_oauth, "load_oauth_accounts")
+        wrapped_user_db = SingleFlightUserDatabase(mock_user_db_oauth, group)
+        assert await wrapped_user_db.load_oauth_accounts(user_oauth) is user_oauth
+        load_spy.assert_called_once_with(user_oauth)
+
+    @pytest.mark.asyncio
+    async def test_get_full(
+        self,
+        mocker: MockerFixture,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        get_full_spy = mocker.spy(single_flight_user_db.user_db, "get_full")
+        assert await single_flight_user_db.get_full(user.id) is user
+        get_full_spy.assert_called_once_with(user.id)
+
+        get_many_full_spy = mocker.spy(single_flight_user_db.user_db, "get_many_full")
+        assert await single_flight_user_db.get_many_full([user.id]) == [user]
+        get_many_full_spy.assert_called_once_with([user.id])
+
+    @pytest.mark.asyncio
+    async def test_get_many_by_email(
+        self,
+        mocker: MockerFixture,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        get_many_by_email_spy = mocker.spy(
+            single_flight_user_db.user_db, "get_many_by_email"
+        )
+        emails = [user.email, "lancelot@camelot.bt"]
+        assert await single_flight_user_db.get_many_by_email(emails) == [user]
+        get_many_by_email_spy.assert_called_once_with(emails)
+
+    @pytest.mark.asyncio
+    async def test_paginate(
+        self,
+        mocker: MockerFixture,
+        single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType],
+        user: UserModel,
+    ):
+        paginate_spy = mocker.spy(single_flight_user_db.user_db, "paginate")
+        filter = UserFilter(email_prefix="king")
+        assert await single_flight_user_db.paginate(filter, limit=10) == [user]
+        paginate_spy.assert_called_once_with(filter, None, 10)
+
+    @pytest.mark.asyncio
+    async def test_stream(
+        self, single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType]
+    ):
+        users = [user async for user in single_flight_user_db.stream(batch_size=2)]
+        assert len(users) == 5
+
+    def test_getattr(
+        self, single_flight_user_db: SingleFlightUserDatabase[UserModel, IDType]
+    ):
+        single_flight_user_db.user_db.session = "SESSION"  # type: ignore
+        assert single_flight_user_db.session == "SESSION"  # type: ignore
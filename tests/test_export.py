@@ -0,0 +1,141 @@
+import csv
+import datetime
+import decimal
+import io
+import json
+import uuid
+from typing import Any, AsyncIterator, Dict, List
+
+import pytest
+
+from fastapi_users.export import ExportFormat, UserExportSerializer, _default
+from tests.conftest import User, UserOAuth
+
+
+async def _aiter(rows: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    for row in rows:
+        yield row
+
+
+@pytest.fixture
+def rows() -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": uuid.uuid4(),
+            "email": f"knight{i}@camelot.bt",
+            "is_active": True,
+            "is_superuser": False,
+            "is_verified": False,
+            "first_name": None if i % 2 else 'Sir "Lancelot", du Lac',
+        }
+        for i in range(5)
+    ]
+
+
+@pytest.mark.router
+def test_fields():
+    assert UserExportSerializer(User).fields == [
+        "id",
+        "email",
+        "is_active",
+        "is_superuser",
+        "is_verified",
+        "first_name",
+    ]
+    assert "oauth_accounts" not in UserExportSerializer(UserOAuth).fields
+
+
+@pytest.mark.router
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (uuid.UUID(int=1), "00000000-0000-0000-0000-000000000001"),
+        (datetime.date(2022, 1, 2), "2022-01-02"),
+        (datetime.datetime(2022, 1, 2, 3, 4, 5), "2022-01-02T03:04:05"),
+        (datetime.time(3, 4, 5), "03:04:05"),
+        (ExportFormat.CSV, "csv"),
+        (decimal.Decimal("1.5"), "1.5"),
+    ],
+)
+def test_json_default(value: Any, expected: str):
+    assert _default(value) == expected
+
+
+@pytest.mark.router
+@pytest.mark.asyncio
+class TestStream:
+    async def test_ndjson(self, rows: List[Dict[str, Any]]):
+        serializer = UserExportSerializer(User)
+        chunks = [
+            chunk
+            async for chunk in serializer.stream(
+                _aiter(rows), ExportFormat.NDJSON, chunk_size=2
+            )
+        ]
+
+        assert len(chunks) == 3
+        lines = "".join(chunks).splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {**row, "id": str(row["id"])} for row in rows
+        ]
+
+    async def test_csv(self, rows: List[Dict[str, Any]]):
+        serializer = UserExportSerializer(User)
+        chunks = [
+            chunk
+            async for chunk in serializer.stream(
+                _aiter(rows), ExportFormat.CSV, chunk_size=2
+            )
+        ]
+
+        # The header is in the first chunk
+        assert len(chunks) == 3
+        reader = csv.DictReader(io.StringIO("".join(chunks)))
+        assert reader.fieldnames == serializer.fields
+        csv_rows = list(reader)
+        assert len(csv_rows) == 5
+        assert csv_rows[0]["id"] == str(rows[0]["id"])
+        assert csv_rows[0]["first_name"] == 'Sir "Lancelot", du Lac'
+        assert csv_rows[1]["first_name"] == ""
+
+    @pytest.mark.parametrize(
+        "first_name,expected",
+        [
+            ('=HYPERLINK("https://evil.bt")', '\'=HYPERLINK("https://evil.bt")'),
+            ("+1", "'+1"),
+            ("-1", "'-1"),
+            ("@SUM(A1)", "'@SUM(A1)"),
+            ("\tLancelot", "'\tLancelot"),
+            ("Lancelot", "Lancelot"),
+        ],
+    )
+    async def test_csv_formulas(
+        self, rows: List[Dict[str, Any]], first_name: str, expected: str
+    ):
+        serializer = UserExportSerializer(User)
+        rows[0]["first_name"] = first_name
+        chunks = [
+            chunk async for chunk in serializer.stream(_aiter(rows), ExportFormat.CSV)
+        ]
+
+        csv_rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+        assert csv_rows[0]["first_name"] == expected
+
+    async def test_disconnected(self, rows: List[Dict[str, Any]]):
+        disconnected = False
+
+        async def is_disconnected() -> bool:
+            return disconnected
+
+        serializer = UserExportSerializer(User)
+        chunks = []
+        async for chunk in serializer.stream(
+            _aiter(rows),
+            ExportFormat.NDJSON,
+            chunk_size=2,
+            is_disconnected=is_disconnected,
+        ):
+            chunks.append(chunk)
+            disconnected = True
+
+        assert len(chunks) == 1
@@ -5,7 +5,16 @@ import pytest
 from fastapi import Depends, FastAPI, status
 
 from fastapi_users import FastAPIUsers
-from tests.conftest import IDType, User, UserCreate, UserModel, UserUpdate
+from fastapi_users.db import BaseUserDatabase
+from tests.conftest import (
+    IDType,
+    SessionUserDatabase,
+    User,
+    UserCreate,
+    UserManager,
+    UserModel,
+    UserUpdate,
+)
 
 
 @pytest.fixture
@@ -150,6 +159,36 @@ async def test_custom_users_route_not_catched(test_app_client: httpx.AsyncClient
     assert response.status_code == status.HTTP_200_OK
 
 
+@pytest.mark.fastapi_users
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lazy_user_manager", [False, True])
+async def test_update_me_same_session(
+    get_test_client,
+    mock_authentication,
+    mock_user_db: BaseUserDatabase[UserModel, IDType],
+    user: UserModel,
+    lazy_user_manager: bool,
+):
+    async def get_user_manager():
+        yield UserManager(SessionUserDatabase(mock_user_db))
+
+    fastapi_users = FastAPIUsers[UserModel, IDType](
+        get_user_manager, [mock_authentication], lazy_user_manager=lazy_user_manager
+    )
+    app = FastAPI()
+    app.include_router(
+        fastapi_users.get_users_router(User, UserUpdate), prefix="/users"
+    )
+
+    async for client in get_test_client(app):
+        response = await client.patch(
+            "/users/me",
+            json={"is_verified": True},
+            headers={"Authorization": f"Bearer {user.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+
 @pytest.mark.fastapi_users
 @pytest.mark.asyncio
 class TestGetCurrentUser:
@@ -0,0 +1,102 @@
+import time
+import uuid
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from fastapi_users import schemas
+from fastapi_users.ids import ULID_ALPHABET, parse_ulid, ulid, uuid7
+
+
+def _decode_ulid(value: str) -> int:
+    decoded = 0
+    for char in value.encode("ascii"):
+        decoded = decoded * 32 + ULID_ALPHABET.index(char)
+    return decoded
+
+
+@pytest.mark.manager
+class TestUUID7:
+    def test_version(self):
+        id = uuid7()
+        assert id.version == 7
+        assert id.variant == uuid.RFC_4122
+
+    def test_timestamp(self):
+        before = time.time_ns() // 1_000_000
+        id = uuid7()
+        after = time.time_ns() // 1_000_000
+        assert before <= id.int >> 80 <= after
+
+    def test_ordered(self, mocker):
+        time_ns = mocker.patch("fastapi_users.ids.time.time_ns")
+        ids = []
+        for timestamp in range(1, 100):
+            time_ns.return_value = timestamp * 1_000_000
+            ids.append(uuid7())
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+
+
+@pytest.mark.manager
+class TestULID:
+    def test_format(self):
+        id = ulid()
+        assert len(id) == 26
+        assert parse_ulid(id) == id
+
+    def test_timestamp(self):
+        before = time.time_ns() // 1_000_000
+        id = ulid()
+        after = time.time_ns() // 1_000_000
+        assert before <= _decode_ulid(id) >> 80 <= after
+
+    def test_ordered(self, mocker):
+        time_ns = mocker.patch("fastapi_users.ids.time.time_ns")
+        ids = []
+        for timestamp in range(1, 100):
+            time_ns.return_value = timestamp * 1_000_000
+            ids.append(ulid())
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+
+    def test_same_bits_as_uuid7(self, mocker):
+        mocker.patch("fastapi_users.ids.time.time_ns", return_value=1_234_000_000)
+        mocker.patch("fastapi_users.ids.os.urandom", return_value=b"\xff" * 10)
+        assert _decode_ulid(ulid()) == (1234 << 80) | (2**80 - 1)
+
+    @pytest.mark.parametrize(
+        "value", ["", "abc", "8" + "0" * 25, "0" * 25 + "U", "0" * 27]
+    )
+    def test_parse_invalid(self, value: str):
+        with pytest.raises(ValueError):
+            parse_ulid(value)
+
+
+class IdsModel(BaseModel):
+    uuid7_id: schemas.UUID7
+    ulid_id: schemas.ULID
+
+
+@pytest.mark.manager
+class TestSchemaTypes:
+    def test_valid(self):
+        uuid7_id = uuid7()
+        ulid_id = ulid()
+        model = IdsModel(uuid7_id=str(uuid7_id), ulid_id=ulid_id.lower())
+        assert model.uuid7_id == uuid7_id
+        assert model.ulid_id == ulid_id
+
+    def test_invalid_uuid7(self):
+        with pytest.raises(ValidationError):
+            IdsModel(uuid7_id=uuid.uuid4(), ulid_id=ulid())
+
+    @pytest.mark.parametrize("value", ["abc", 123])
+    def test_invalid_ulid(self, value):
+        with pytest.raises(ValidationError):
+            IdsModel(uuid7_id=uuid7(), ulid_id=value)
+
+    def test_json_schema(self):
+        properties = IdsModel.schema()["properties"]
+        assert properties["uuid7_id"]["format"] == "uuid7"
+        assert properties["ulid_id"]["format"] == "ulid"
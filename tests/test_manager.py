@@ -1,11 +1,20 @@
+import asyncio
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
+from unittest.mock import call
 
 import pytest
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import UUID4
+from pydantic import UUID4, ValidationError
 from pytest_mock import MockerFixture
 
+from fastapi_users.bloom import EmailBloomFilter
+from fastapi_users.db import CachedUserDatabase, UserCache, UserFilter
 from fastapi_users.exceptions import (
+    DuplicateUserEmail,
+    InvalidHashedPasswordException,
     InvalidID,
     InvalidPasswordException,
     InvalidResetPasswordToken,
@@ -15,10 +24,15 @@ from fastapi_users.exceptions import (
     UserInactive,
     UserNotExists,
 )
+from fastapi_users.ids import ulid, uuid7
 from fastapi_users.jwt import decode_jwt, generate_jwt
-from fastapi_users.manager import IntegerIDMixin
+from fastapi_users.manager import IntegerIDMixin, ULIDIDMixin, UUID7IDMixin
+from fastapi_users.password import PasswordHelperProtocol
+from fastapi_users.snapshot import UserSnapshot
 from tests.conftest import (
     UserCreate,
+    UserImport,
+    UserManager,
     UserManagerMock,
     UserModel,
     UserOAuthModel,
@@ -57,9 +71,9 @@ def forgot_password_token(user_manager: UserManagerMock[UserModel]):
 
 
 @pytest.fixture
-def create_oauth2_password_request_form() -> Callable[
-    [str, str], OAuth2PasswordRequestForm
-]:
+def create_oauth2_password_request_form() -> (
+    Callable[[str, str], OAuth2PasswordRequestForm]
+):
     def _create_oauth2_password_request_form(username, password):
         return OAuth2PasswordRequestForm(username=username, password=password, scope="")
 
@@ -80,6 +94,132 @@ class TestGet:
         assert retrieved_user.id == user.id
 
 
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestGetCore:
+    async def test_not_existing_user(self, user_manager: UserManagerMock[UserModel]):
+        with pytest.raises(UserNotExists):
+            await user_manager.get_core(UUID4("d35d213e-f3d8-4f08-954a-7e0d1bea286f"))
+
+    async def test_existing_user(
+        self, user_manager: UserManagerMock[UserModel], user: UserModel
+    ):
+        retrieved_user = await user_manager.get_core(user.id)
+        assert retrieved_user.id == user.id
+
+    async def test_custom_get(
+        self,
+        mocker: MockerFixture,
+        mock_user_db,
+        user: UserModel,
+        inactive_user: UserModel,
+    ):
+        class SoftDeleteUserManager(UserManager):
+            async def get(self, id):
+                user = await super().get(id)
+                if not user.is_active:
+                    raise UserNotExists()
+                return user
+
+        user_manager = SoftDeleteUserManager(mock_user_db)
+        get_core_spy = mocker.spy(mock_user_db, "get_core")
+
+        assert await user_manager.get_core(user.id) is user
+        with pytest.raises(UserNotExists):
+            await user_manager.get_core(inactive_user.id)
+        assert get_core_spy.called is False
+
+    async def test_auth_view(
+        self,
+        mocker: MockerFixture,
+        user_manager: UserManagerMock[UserModel],
+        user: UserModel,
+    ):
+        get_auth_view_spy = mocker.spy(user_manager.user_db, "get_auth_view")
+        user_manager.auth_view = True
+
+        auth_view = await user_manager.get_core(user.id)
+        assert isinstance(auth_view, UserSnapshot)
+        assert auth_view.id == user.id
+        get_auth_view_spy.assert_called_once_with(user.id)
+
+        with pytest.raises(UserNotExists):
+            await user_manager.get_core(UUID4("d35d213e-f3d8-4f08-954a-7e0d1bea286f"))
+
+        assert await user_manager.get_full_user(auth_view) is user
+        assert await user_manager.get_full_user(user) is user
+
+    async def test_auth_view_writes(
+        self, user_manager: UserManagerMock[UserModel], user: UserModel
+    ):
+        user_manager.auth_view = True
+        auth_view = await user_manager.get_core(user.id)
+
+        updated_user = await user_manager.update(
+            UserUpdate(is_verified=True), auth_view
+        )
+        assert updated_user is user
+        assert user.is_verified is True
+
+        await user_manager.delete(auth_view)
+        user_manager.on_before_delete.assert_called_once_with(user, None)
+
+    async def test_get_full_user_snapshot_cache(
+        self,
+        mock_user_db,
+        user_manager: UserManagerMock[UserModel],
+        user: UserModel,
+    ):
+        user.first_name = "Arthur"
+        user_manager.user_db = CachedUserDatabase(
+            mock_user_db, UserCache(snapshots=True)
+        )
+        await user_manager.get(user.id)
+        snapshot = await user_manager.get(user.id)
+        assert isinstance(snapshot, UserSnapshot)
+
+        full_user = await user_manager.get_full_user(snapshot)
+        assert full_user is user
+        assert full_user.first_name == "Arthur"
+
+        with pytest.raises(UserNotExists):
+            await user_manager.get_full_user(
+                UserSnapshot.from_user(
+                    UserModel(email="lancelot@camelot.bt", hashed_password="")
+                )
+            )
+
+    async def test_get_full_users(
+        self,
+        user_manager: UserManagerMock[UserModel],
+        user: UserModel,
+        superuser: UserModel,
+    ):
+        deleted_user = UserModel(email="lancelot@camelot.bt", hashed_password="")
+        assert await user_manager.get_full_users([user, superuser]) == [
+            user,
+            superuser,
+        ]
+        assert await user_manager.get_full_users(
+            [
+                UserSnapshot.from_user(superuser),
+                user,
+                UserSnapshot.from_user(deleted_user),
+            ]
+        ) == [superuser, user]
+
+    async def test_load_oauth_accounts(
+        self,
+        mocker: MockerFixture,
+        user_manager_oauth: UserManagerMock[UserOAuthModel],
+        user_oauth: UserOAuthModel,
+    ):
+        load_spy = mocker.spy(user_manager_oauth.user_db, "load_oauth_accounts")
+        user = await user_manager_oauth.load_oauth_accounts(user_oauth)
+        assert user is user_oauth
+        load_spy.assert_called_once_with(user_oauth)
+
+
 @pytest.mark.asyncio
 @pytest.mark.manager
 class TestGetByEmail:
@@ -127,6 +267,33 @@ class TestCreateUser:
             await user_manager.create(user)
         assert user_manager.on_after_register.called is False
 
+    async def test_existing_user_cancels_hash(
+        self, mocker: MockerFixture, user_manager: UserManagerMock[UserModel]
+    ):
+        events = []
+
+        async def hash_password(password: str) -> str:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                events.append("cancelled")
+                raise
+            return password  # pragma: no cover
+
+        async def check_email_available(email: str) -> None:
+            await asyncio.sleep(0)  # The database round trip
+            raise UserAlreadyExists()
+
+        mocker.patch.object(user_manager, "_hash_password", side_effect=hash_password)
+        mocker.patch.object(
+            user_manager, "_check_email_available", side_effect=check_email_available
+        )
+        user = UserCreate(email="king.arthur@camelot.bt", password="guinevere")
+        with pytest.raises(UserAlreadyExists):
+            await user_manager.create(user)
+        await asyncio.sleep(0)
+        assert events == ["cancelled"]
+
     @pytest.mark.parametrize("email", ["lancelot@camelot.bt", "Lancelot@camelot.bt"])
     async def test_regular_user(
         self, email: str, user_manager: UserManagerMock[UserModel]
@@ -163,6 +330,32 @@ class TestCreateUser:
 
         assert user_manager.on_after_register.called is True
 
+    async def test_hash_during_lookup(
+        self, mocker: MockerFixture, user_manager: UserManagerMock[UserModel]
+    ):
+        hashing = threading.Event()
+        hash = user_manager.password_helper.hash
+
+        def hash_password(password: str) -> str:
+            hashing.set()
+            return hash(password)
+
+        async def get_by_email(email: str):
+            for _ in range(1000):
+                if hashing.is_set():
+                    return None
+                await asyncio.sleep(0.001)
+            raise AssertionError("The password was not hashed during the lookup.")
+
+        mocker.patch.object(user_manager.password_helper, "hash", hash_password)
+        mocker.patch.object(user_manager.user_db, "get_by_email", get_by_email)
+
+        user = UserCreate(email="lancelot@camelot.bt", password="guinevere")
+        created_user = await user_manager.create(user)
+        assert user_manager.password_helper.verify_and_update(
+            "guinevere", created_user.hashed_password
+        )[0]
+
 
 @pytest.mark.asyncio
 @pytest.mark.manager
@@ -191,6 +384,35 @@ class TestOAuthCallback:
 
         assert user_manager_oauth.on_after_register.called is False
 
+    async def test_existing_user_with_oauth_single_upsert(
+        self,
+        mocker: MockerFixture,
+        user_manager_oauth: UserManagerMock[UserOAuthModel],
+        user_oauth: UserOAuthModel,
+    ):
+        user_db = user_manager_oauth.user_db
+        upserted_user = UserOAuthModel(
+            email=user_oauth.email, hashed_password=user_oauth.hashed_password
+        )
+        upsert_mock = mocker.patch.object(
+            user_db, "upsert_oauth_account", return_value=upserted_user
+        )
+        get_by_oauth_account_spy = mocker.spy(user_db, "get_by_oauth_account")
+        add_oauth_account_spy = mocker.spy(user_db, "add_oauth_account")
+
+        user = await user_manager_oauth.oauth_callback(
+            "service1", "UPDATED_TOKEN", "user_oauth1", user_oauth.email
+        )
+
+        assert user is upserted_user
+        upsert_mock.assert_called_once()
+        assert upsert_mock.call_args[0][0] == "service1"
+        assert upsert_mock.call_args[0][1] == "user_oauth1"
+        assert upsert_mock.call_args[0][2]["access_token"] == "UPDATED_TOKEN"
+        assert get_by_oauth_account_spy.called is False
+        assert user_manager_oauth.get_by_email.called is False
+        assert add_oauth_account_spy.called is False
+
     async def test_existing_user_without_oauth_associate(
         self,
         user_manager_oauth: UserManagerMock[UserOAuthModel],
@@ -237,6 +459,20 @@ class TestOAuthCallback:
 
         assert user_manager_oauth.on_after_register.called is True
 
+    async def test_new_user_duplicate_email(
+        self, mocker: MockerFixture, user_manager_oauth: UserManagerMock[UserOAuthModel]
+    ):
+        # A user registered with the same e-mail meanwhile
+        mocker.patch.object(
+            user_manager_oauth.user_db, "create", side_effect=DuplicateUserEmail
+        )
+        with pytest.raises(UserAlreadyExists):
+            await user_manager_oauth.oauth_callback(
+                "service1", "TOKEN", "new_user_oauth1", "galahad@camelot.bt"
+            )
+
+        assert user_manager_oauth.on_after_register.called is False
+
 
 @pytest.mark.asyncio
 @pytest.mark.manager
@@ -558,6 +794,21 @@ class TestUpdateUser:
 
         assert user_manager.on_after_update.called is False
 
+    async def test_email_and_password_update_already_existing(
+        self,
+        mocker: MockerFixture,
+        user: UserModel,
+        superuser: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        update_spy = mocker.spy(user_manager.user_db, "update")
+        user_update = UserUpdate(email=superuser.email, password="holygrail")
+        with pytest.raises(UserAlreadyExists):
+            await user_manager.update(user_update, user, safe=True)
+
+        assert update_spy.called is False
+        assert user_manager.on_after_update.called is False
+
     async def test_email_update_with_same_email(
         self, user: UserModel, user_manager: UserManagerMock[UserModel]
     ):
@@ -569,6 +820,184 @@ class TestUpdateUser:
         assert user_manager.on_after_update.called is True
 
 
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestNormalizeEmail:
+    async def test_lookups(
+        self,
+        mocker: MockerFixture,
+        create_oauth2_password_request_form: Callable[
+            [str, str], OAuth2PasswordRequestForm
+        ],
+        user_manager: UserManagerMock[UserModel],
+        user: UserModel,
+    ):
+        get_by_email_spy = mocker.spy(user_manager.user_db, "get_by_email")
+
+        await user_manager.get_by_email("King.Arthur@Camelot.bt")
+        get_by_email_spy.assert_called_with("king.arthur@camelot.bt")
+
+        form = create_oauth2_password_request_form(
+            "KING.ARTHUR@camelot.bt", "guinevere"
+        )
+        assert await user_manager.authenticate(form) is user
+        get_by_email_spy.assert_called_with("king.arthur@camelot.bt")
+
+        with pytest.raises(UserAlreadyExists):
+            await user_manager.create(
+                UserCreate(email="King.Arthur@camelot.bt", password="guinevere")
+            )
+        get_by_email_spy.assert_called_with("king.arthur@camelot.bt")
+
+    async def test_custom_normalization(
+        self, mocker: MockerFixture, user_manager: UserManagerMock[UserModel]
+    ):
+        mocker.patch.object(
+            user_manager,
+            "normalize_email",
+            side_effect=lambda email: email.lower().replace("+table", ""),
+        )
+        with pytest.raises(UserAlreadyExists):
+            await user_manager.create(
+                UserCreate(email="king.arthur+table@camelot.bt", password="guinevere")
+            )
+
+    async def test_normalized_email_field(
+        self,
+        mocker: MockerFixture,
+        user_manager: UserManagerMock[UserModel],
+        user: UserModel,
+    ):
+        user_manager.normalized_email_field = "email_normalized"
+        create_mock = mocker.patch.object(
+            user_manager.user_db, "create", return_value=user
+        )
+        update_spy = mocker.spy(user_manager.user_db, "update")
+
+        await user_manager.create(
+            UserCreate(email="Lancelot@camelot.bt", password="guinevere")
+        )
+        create_dict = create_mock.call_args[0][0]
+        assert create_dict["email"] == "Lancelot@camelot.bt"
+        assert create_dict["email_normalized"] == "lancelot@camelot.bt"
+
+        await user_manager.update(UserUpdate(email="Galahad@camelot.bt"), user)
+        update_dict = update_spy.call_args[0][1]
+        assert update_dict["email"] == "Galahad@camelot.bt"
+        assert update_dict["email_normalized"] == "galahad@camelot.bt"
+
+    async def test_update_email_case(
+        self, user_manager: UserManagerMock[UserModel], verified_user: UserModel
+    ):
+        email = verified_user.email.capitalize()
+        updated_user = await user_manager.update(UserUpdate(email=email), verified_user)
+        assert updated_user.email == email
+        assert updated_user.is_verified is True
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestEmailFilter:
+    @pytest.fixture
+    async def email_filter(self, user_manager: UserManagerMock[UserModel]):
+        user_manager.email_filter = EmailBloomFilter(capacity=1000)
+        await user_manager.build_email_filter(batch_size=2)
+        user_manager.email_filter.record_lookup(0.001)
+        return user_manager.email_filter
+
+    async def test_build(
+        self, email_filter: EmailBloomFilter, user: UserModel, superuser: UserModel
+    ):
+        assert email_filter.ready is True
+        assert user.email in email_filter
+        assert superuser.email in email_filter
+
+    async def test_build_without_filter(self, user_manager: UserManagerMock[UserModel]):
+        with pytest.raises(ValueError):
+            await user_manager.build_email_filter()
+
+    async def test_unknown_email(
+        self,
+        mocker: MockerFixture,
+        create_oauth2_password_request_form: Callable[
+            [str, str], OAuth2PasswordRequestForm
+        ],
+        email_filter: EmailBloomFilter,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        get_by_email_spy = mocker.spy(user_manager.user_db, "get_by_email")
+        sleep_spy = mocker.spy(asyncio, "sleep")
+
+        with pytest.raises(UserNotExists):
+            await user_manager.get_by_email_filtered("Lancelot@camelot.bt")
+        form = create_oauth2_password_request_form("lancelot@camelot.bt", "guinevere")
+        assert await user_manager.authenticate(form) is None
+
+        assert get_by_email_spy.called is False
+        # The response is padded like a lookup
+        sleep_spy.assert_called_with(email_filter.lookup_seconds)
+
+    async def test_known_email(
+        self,
+        mocker: MockerFixture,
+        email_filter: EmailBloomFilter,
+        user_manager: UserManagerMock[UserModel],
+        user: UserModel,
+    ):
+        get_by_email_spy = mocker.spy(user_manager.user_db, "get_by_email")
+        record_lookup_spy = mocker.spy(email_filter, "record_lookup")
+
+        assert await user_manager.get_by_email_filtered(user.email.upper()) is user
+        get_by_email_spy.assert_called_once_with(user.email)
+        assert record_lookup_spy.called is True
+
+    async def test_existence_checks_ignore_filter(
+        self,
+        mocker: MockerFixture,
+        email_filter: EmailBloomFilter,
+        user_manager: UserManagerMock[UserModel],
+        user: UserModel,
+    ):
+        # A user created by another process, unknown to this filter
+        lancelot = UserModel(
+            email="lancelot@camelot.bt", hashed_password=user.hashed_password
+        )
+        mocker.patch.object(user_manager.user_db, "get_by_email", return_value=lancelot)
+
+        assert await user_manager.get_by_email("lancelot@camelot.bt") is lancelot
+        with pytest.raises(UserAlreadyExists):
+            await user_manager.update(UserUpdate(email="lancelot@camelot.bt"), user)
+
+    async def test_update_without_email(
+        self,
+        email_filter: EmailBloomFilter,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        user_manager.normalized_email_field = "email_normalized"
+        user_dict = {"first_name": "Lancelot"}
+        user_manager._set_normalized_email(user_dict)
+        assert user_dict == {"first_name": "Lancelot"}
+
+    async def test_created_and_updated_emails(
+        self,
+        email_filter: EmailBloomFilter,
+        user_manager: UserManagerMock[UserModel],
+        user: UserModel,
+    ):
+        await user_manager.create(
+            UserCreate(email="Lancelot@camelot.bt", password="guinevere")
+        )
+        assert "lancelot@camelot.bt" in email_filter
+
+        await user_manager.create_many(
+            [UserCreate(email="bors@camelot.bt", password="guinevere")]
+        )
+        assert "bors@camelot.bt" in email_filter
+
+        await user_manager.update(UserUpdate(email="Galahad@camelot.bt"), user)
+        assert "galahad@camelot.bt" in email_filter
+
+
 @pytest.mark.asyncio
 @pytest.mark.manager
 class TestDelete:
@@ -582,6 +1011,467 @@ class TestDelete:
         assert user_manager.on_after_delete.called is True
 
 
+@pytest.fixture
+def unique_email_user_manager(
+    mocker: MockerFixture, mock_user_db, user_manager: UserManagerMock[UserModel]
+):
+    """User manager relying on the adapter to detect duplicate e-mails."""
+    emails = {"king.arthur@camelot.bt", "merlin@camelot.bt", "percival@camelot.bt"}
+    original_create = mock_user_db.create
+    original_update = mock_user_db.update
+
+    async def create(create_dict):
+        if create_dict["email"].lower() in emails:
+            raise DuplicateUserEmail()
+        emails.add(create_dict["email"].lower())
+        return await original_create(create_dict)
+
+    async def update(user, update_dict):
+        if "email" in update_dict and update_dict["email"].lower() in emails:
+            raise DuplicateUserEmail()
+        return await original_update(user, update_dict)
+
+    mocker.patch.object(mock_user_db, "create", side_effect=create)
+    mocker.patch.object(mock_user_db, "update", side_effect=update)
+    mocker.spy(mock_user_db, "get_by_email")
+    user_manager.unique_email_constraint = True
+    return user_manager
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestUniqueEmailConstraint:
+    async def test_create(self, unique_email_user_manager):
+        user = await unique_email_user_manager.create(
+            UserCreate(email="lancelot@camelot.bt", password="guinevere")
+        )
+        assert user.email == "lancelot@camelot.bt"
+        assert unique_email_user_manager.user_db.get_by_email.called is False
+
+    async def test_create_existing(self, unique_email_user_manager):
+        with pytest.raises(UserAlreadyExists):
+            await unique_email_user_manager.create(
+                UserCreate(email="King.Arthur@camelot.bt", password="guinevere")
+            )
+        assert unique_email_user_manager.user_db.get_by_email.called is False
+        assert unique_email_user_manager.on_after_register.called is False
+
+    async def test_create_many_existing(self, unique_email_user_manager):
+        with pytest.raises(UserAlreadyExists):
+            await unique_email_user_manager.create_many(
+                [
+                    UserCreate(email="lancelot@camelot.bt", password="guinevere"),
+                    UserCreate(email="merlin@camelot.bt", password="guinevere"),
+                ]
+            )
+        assert unique_email_user_manager.user_db.get_by_email.called is False
+
+    async def test_update_email(self, user: UserModel, unique_email_user_manager):
+        updated_user = await unique_email_user_manager.update(
+            UserUpdate(email="lancelot@camelot.bt"), user
+        )
+        assert updated_user.email == "lancelot@camelot.bt"
+        assert updated_user.is_verified is False
+        assert unique_email_user_manager.user_db.get_by_email.called is False
+
+    async def test_update_email_existing(
+        self, user: UserModel, unique_email_user_manager
+    ):
+        with pytest.raises(UserAlreadyExists):
+            await unique_email_user_manager.update(
+                UserUpdate(email="merlin@camelot.bt"), user
+            )
+        assert unique_email_user_manager.on_after_update.called is False
+
+    async def test_import_concurrent_duplicate(
+        self, mocker: MockerFixture, unique_email_user_manager
+    ):
+        # Let the batch check pass, as if the user was created concurrently
+        mocker.patch.object(
+            unique_email_user_manager.user_db, "get_many_by_email", return_value=[]
+        )
+        mocker.patch.object(
+            unique_email_user_manager.user_db,
+            "create_many",
+            side_effect=DuplicateUserEmail,
+        )
+        user_imports = [
+            UserImport(email="lancelot@camelot.bt", password="guinevere"),
+            UserImport(email="merlin@camelot.bt", password="guinevere"),
+        ]
+        results = [
+            result
+            async for result in unique_email_user_manager.import_users(
+                _aiter(user_imports)
+            )
+        ]
+        assert results[0].user is not None
+        assert isinstance(results[1].error, UserAlreadyExists)
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestGetMany:
+    async def test_get_many(
+        self,
+        user: UserModel,
+        superuser: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        users = await user_manager.get_many([superuser.id, user.id])
+        assert users == [superuser, user]
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestPaginate:
+    async def test_paginate(self, user_manager: UserManagerMock[UserModel]):
+        first_page = await user_manager.paginate(limit=3)
+        second_page = await user_manager.paginate(after=first_page[-1].id, limit=3)
+
+        assert len(first_page) == 3
+        assert len(second_page) == 2
+        assert first_page[-1].id < second_page[0].id
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestStream:
+    async def test_stream(self, user_manager: UserManagerMock[UserModel]):
+        users = [user async for user in user_manager.stream(batch_size=2)]
+        assert len(users) == 5
+        assert all(isinstance(user, UserModel) for user in users)
+
+    async def test_stream_fields(
+        self, superuser: UserModel, user_manager: UserManagerMock[UserModel]
+    ):
+        rows = [
+            row
+            async for row in user_manager.stream(
+                UserFilter(is_superuser=True, email_prefix="merlin"),
+                fields=["id", "email"],
+            )
+        ]
+        assert rows == [{"id": superuser.id, "email": superuser.email}]
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestCreateMany:
+    async def test_existing_user(
+        self,
+        mocker: MockerFixture,
+        user: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        get_many_by_email_spy = mocker.spy(user_manager.user_db, "get_many_by_email")
+        user_creates = [
+            UserCreate(email="lancelot@camelot.bt", password="guinevere"),
+            UserCreate(email=user.email.upper(), password="guinevere"),
+        ]
+        with pytest.raises(UserAlreadyExists):
+            await user_manager.create_many(user_creates)
+        assert user_manager.on_after_register.called is False
+        # The e-mails are checked with a single query
+        get_many_by_email_spy.assert_called_once()
+
+    async def test_duplicate_emails(self, user_manager: UserManagerMock[UserModel]):
+        user_creates = [
+            UserCreate(email="lancelot@camelot.bt", password="guinevere"),
+            UserCreate(email="Lancelot@camelot.bt", password="guinevere"),
+        ]
+        with pytest.raises(UserAlreadyExists):
+            await user_manager.create_many(user_creates)
+
+    async def test_invalid_password(self, user_manager: UserManagerMock[UserModel]):
+        user_creates = [
+            UserCreate(email="lancelot@camelot.bt", password="guinevere"),
+            UserCreate(email="galahad@camelot.bt", password="h"),
+        ]
+        with pytest.raises(InvalidPasswordException):
+            await user_manager.create_many(user_creates)
+
+    @pytest.mark.parametrize("safe,result", [(True, False), (False, True)])
+    async def test_create_many(
+        self, safe: bool, result: bool, user_manager: UserManagerMock[UserModel]
+    ):
+        user_creates = [
+            UserCreate(email="lancelot@camelot.bt", password="guinevere"),
+            UserCreate(
+                email="galahad@camelot.bt", password="elaine", is_superuser=True
+            ),
+        ]
+        users = await user_manager.create_many(user_creates, safe)
+
+        assert [user.email for user in users] == [
+            "lancelot@camelot.bt",
+            "galahad@camelot.bt",
+        ]
+        assert users[1].is_superuser is result
+        for user, user_create in zip(users, user_creates):
+            verified, _ = user_manager.password_helper.verify_and_update(
+                user_create.password, user.hashed_password
+            )
+            assert verified is True
+
+        assert user_manager.on_after_register.call_count == 2
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestImportUsers:
+    async def test_import_users(
+        self, mocker: MockerFixture, user_manager: UserManagerMock[UserModel]
+    ):
+        create_many_spy = mocker.spy(user_manager.user_db, "create_many")
+        on_after_import_spy = mocker.spy(user_manager, "on_after_import")
+        hashed_password = user_manager.password_helper.hash("elaine")
+        user_imports = [
+            UserImport(email="lancelot@camelot.bt", password="guinevere"),
+            UserImport(
+                email="galahad@camelot.bt",
+                hashed_password=hashed_password,
+                is_verified=True,
+                first_name="Galahad",
+            ),
+            UserImport(email="gawain@camelot.bt", password="ragnelle"),
+        ]
+        results = [
+            result
+            async for result in user_manager.import_users(
+                _aiter(user_imports), batch_size=2
+            )
+        ]
+
+        assert [result.index for result in results] == [0, 1, 2]
+        assert all(result.error is None for result in results)
+        users = [result.user for result in results]
+        assert [user.email for user in users] == [  # type: ignore
+            "lancelot@camelot.bt",
+            "galahad@camelot.bt",
+            "gawain@camelot.bt",
+        ]
+        verified, _ = user_manager.password_helper.verify_and_update(
+            "guinevere", users[0].hashed_password  # type: ignore
+        )
+        assert verified is True
+        assert users[1].hashed_password == hashed_password  # type: ignore
+        assert users[1].is_verified is True  # type: ignore
+        assert users[1].first_name == "Galahad"  # type: ignore
+
+        assert create_many_spy.call_count == 2
+        assert on_after_import_spy.call_count == 2
+        assert user_manager.on_after_register.called is False
+
+    async def test_import_errors(
+        self,
+        mocker: MockerFixture,
+        user: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        get_many_by_email_spy = mocker.spy(user_manager.user_db, "get_many_by_email")
+        user_imports = [
+            UserImport(email=user.email.upper(), password="guinevere"),
+            UserImport(email="lancelot@camelot.bt", password="h"),
+            UserImport(email="galahad@camelot.bt", password="elaine"),
+            UserImport(email="Galahad@camelot.bt", password="elaine"),
+        ]
+        results = [
+            result async for result in user_manager.import_users(_aiter(user_imports))
+        ]
+
+        assert isinstance(results[0].error, UserAlreadyExists)
+        assert isinstance(results[1].error, InvalidPasswordException)
+        assert results[2].error is None
+        assert results[2].user is not None
+        assert isinstance(results[3].error, UserAlreadyExists)
+        get_many_by_email_spy.assert_called_once()
+
+    async def test_invalid_hashed_password(
+        self, mocker: MockerFixture, user_manager: UserManagerMock[UserModel]
+    ):
+        create_many_spy = mocker.spy(user_manager.user_db, "create_many")
+        hashed_password = user_manager.password_helper.hash("elaine")
+        user_imports = [
+            UserImport(email="lancelot@camelot.bt", hashed_password="HASHED"),
+            UserImport(
+                email="gawain@camelot.bt", hashed_password=hashed_password[:-10]
+            ),
+            UserImport(email="galahad@camelot.bt", hashed_password=hashed_password),
+        ]
+        results = [
+            result async for result in user_manager.import_users(_aiter(user_imports))
+        ]
+
+        assert isinstance(results[0].error, InvalidHashedPasswordException)
+        assert isinstance(results[1].error, InvalidHashedPasswordException)
+        assert results[2].user is not None
+        assert len(create_many_spy.call_args[0][0]) == 1
+
+    async def test_hashed_password_custom_password_helper(
+        self, mocker: MockerFixture, user_manager: UserManagerMock[UserModel]
+    ):
+        user_manager.password_helper = mocker.Mock(spec=PasswordHelperProtocol)
+        user_imports = [
+            UserImport(email="lancelot@camelot.bt", hashed_password="HASHED")
+        ]
+        results = [
+            result async for result in user_manager.import_users(_aiter(user_imports))
+        ]
+
+        assert results[0].user.hashed_password == "HASHED"  # type: ignore
+
+    async def test_safe(self, user_manager: UserManagerMock[UserModel]):
+        user_imports = [
+            UserImport(
+                email="lancelot@camelot.bt", password="guinevere", is_superuser=True
+            )
+        ]
+        results = [
+            result
+            async for result in user_manager.import_users(
+                _aiter(user_imports), safe=True
+            )
+        ]
+        assert results[0].user.is_superuser is False  # type: ignore
+
+    async def test_password_hash_executor(
+        self, mocker: MockerFixture, user_manager: UserManagerMock[UserModel]
+    ):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            submit_spy = mocker.spy(executor, "submit")
+            user_manager.password_hash_executor = executor
+            user_imports = [
+                UserImport(email="lancelot@camelot.bt", password="guinevere"),
+                UserImport(email="galahad@camelot.bt", password="elaine"),
+            ]
+            results = [
+                result
+                async for result in user_manager.import_users(_aiter(user_imports))
+            ]
+
+        assert all(result.user is not None for result in results)
+        assert submit_spy.call_count == 2
+
+
+@pytest.mark.manager
+def test_user_import_password():
+    with pytest.raises(ValidationError):
+        UserImport(email="lancelot@camelot.bt")
+    with pytest.raises(ValidationError):
+        UserImport(
+            email="lancelot@camelot.bt", password="guinevere", hashed_password="hash"
+        )
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestUpdateMany:
+    async def test_update_many(
+        self,
+        user: UserModel,
+        superuser: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        user_update = UserUpdate(first_name="Arthur", is_superuser=True)
+        users = await user_manager.update_many(
+            user_update, [user, superuser], safe=True
+        )
+
+        assert [user.first_name for user in users] == ["Arthur", "Arthur"]
+        assert users[0].is_superuser is False
+        assert user_manager._update.called is False
+        assert user_manager.on_after_update.call_count == 2
+
+    async def test_password_update(
+        self,
+        user: UserModel,
+        superuser: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        old_hashed_passwords = [user.hashed_password, superuser.hashed_password]
+        user_update = UserUpdate(password="holygrail")
+        users = await user_manager.update_many(user_update, [user, superuser])
+
+        assert [user.hashed_password for user in users] != old_hashed_passwords
+        assert user_manager._update.call_count == 2
+        assert user_manager.on_after_update.call_count == 2
+
+    async def test_update_snapshots(
+        self,
+        user: UserModel,
+        superuser: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        deleted_user = UserModel(email="lancelot@camelot.bt", hashed_password="")
+        user_update = UserUpdate(first_name="Arthur")
+        users = await user_manager.update_many(
+            user_update,
+            [
+                UserSnapshot.from_user(user),
+                superuser,
+                UserSnapshot.from_user(deleted_user),
+            ],
+        )
+
+        assert users == [user, superuser]
+        assert [user.first_name for user in users] == ["Arthur", "Arthur"]
+        assert user_manager.on_after_update.call_count == 2
+
+    async def test_email_update_several_users(
+        self,
+        user: UserModel,
+        superuser: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        user_update = UserUpdate(email="lancelot@camelot.bt")
+        with pytest.raises(UserAlreadyExists):
+            await user_manager.update_many(user_update, [user, superuser])
+
+        assert user_manager.on_after_update.called is False
+
+
+@pytest.mark.asyncio
+@pytest.mark.manager
+class TestDeleteMany:
+    async def test_delete_many(
+        self,
+        user: UserModel,
+        superuser: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        await user_manager.delete_many([user, superuser])
+
+        assert user_manager.on_before_delete.call_count == 2
+        assert user_manager.on_after_delete.call_count == 2
+
+    async def test_delete_snapshots(
+        self,
+        user: UserModel,
+        superuser: UserModel,
+        user_manager: UserManagerMock[UserModel],
+    ):
+        deleted_user = UserModel(email="lancelot@camelot.bt", hashed_password="")
+        await user_manager.delete_many(
+            [
+                UserSnapshot.from_user(user),
+                superuser,
+                UserSnapshot.from_user(deleted_user),
+            ]
+        )
+
+        user_manager.on_before_delete.assert_has_calls(
+            [call(user, None), call(superuser, None)]
+        )
+        assert user_manager.on_before_delete.call_count == 2
+        assert user_manager.on_after_delete.call_count == 2
+
+
 @pytest.mark.asyncio
 @pytest.mark.manager
 class TestAuthenticate:
@@ -658,3 +1548,43 @@ def test_integer_id_mixin():
 
     with pytest.raises(InvalidID):
         integer_id_mixin.parse_id("abc")
+
+
+def test_uuid7_id_mixin():
+    uuid7_id_mixin = UUID7IDMixin()
+    id = uuid7()
+
+    assert uuid7_id_mixin.parse_id(id) is id
+    assert uuid7_id_mixin.parse_id(str(id)) == id
+
+    with pytest.raises(InvalidID):
+        uuid7_id_mixin.parse_id(uuid.uuid4())
+
+    with pytest.raises(InvalidID):
+        uuid7_id_mixin.parse_id(str(uuid.uuid4()))
+
+    with pytest.raises(InvalidID):
+        uuid7_id_mixin.parse_id("abc")
+
+    with pytest.raises(InvalidID):
+        uuid7_id_mixin.parse_id(123)
+
+
+def test_ulid_id_mixin():
+    ulid_id_mixin = ULIDIDMixin()
+    id = ulid()
+
+    assert ulid_id_mixin.parse_id(id) == id
+    assert ulid_id_mixin.parse_id(id.lower()) == id
+
+    with pytest.raises(InvalidID):
+        ulid_id_mixin.parse_id("abc")
+
+    with pytest.raises(InvalidID):
+        ulid_id_mixin.parse_id("8" + id[1:])
+
+    with pytest.raises(InvalidID):
+        ulid_id_mixin.parse_id(id[:-1] + "U")
+
+    with pytest.raises(InvalidID):
+        ulid_id_mixin.parse_id(123)
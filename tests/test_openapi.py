@@ -22,7 +22,16 @@ def test_app(
     app.include_router(
         fastapi_users.get_oauth_router(oauth_client, mock_authentication, secret)
     )
-    app.include_router(fastapi_users.get_users_router(User, UserUpdate))
+    app.include_router(
+        fastapi_users.get_users_router(
+            User,
+            UserUpdate,
+            enable_list=True,
+            enable_export=True,
+            enable_import=True,
+            enable_batch=True,
+        )
+    )
     app.include_router(fastapi_users.get_verify_router(User))
 
     return app
@@ -58,6 +67,31 @@ class TestReset:
 
 
 class TestUsers:
+    def test_export_status_codes(self, openapi_dict):
+        route = openapi_dict["paths"]["/export"]["get"]
+        assert list(route["responses"].keys()) == ["200", "401", "403", "422"]
+
+    def test_import_status_codes(self, openapi_dict):
+        route = openapi_dict["paths"]["/import"]["post"]
+        assert list(route["responses"].keys()) == ["200", "401", "403"]
+        assert "application/x-ndjson" in route["requestBody"]["content"]
+
+    def test_batch_get_status_codes(self, openapi_dict):
+        route = openapi_dict["paths"]["/batch/get"]["post"]
+        assert list(route["responses"].keys()) == ["200", "401", "403", "422"]
+
+    def test_batch_patch_status_codes(self, openapi_dict):
+        route = openapi_dict["paths"]["/batch/patch"]["post"]
+        assert list(route["responses"].keys()) == ["200", "401", "403", "400", "422"]
+
+    def test_batch_delete_status_codes(self, openapi_dict):
+        route = openapi_dict["paths"]["/batch/delete"]["post"]
+        assert list(route["responses"].keys()) == ["200", "401", "403", "422"]
+
+    def test_list_status_codes(self, openapi_dict):
+        route = openapi_dict["paths"]["/"]["get"]
+        assert list(route["responses"].keys()) == ["200", "401", "403", "400", "422"]
+
     def test_patch_id_status_codes(self, openapi_dict):
         route = openapi_dict["paths"]["/{id}"]["patch"]
         assert list(route["responses"].keys()) == [
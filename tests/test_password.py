@@ -0,0 +1,33 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi_users.password import PasswordHelper
+
+
+def test_pickle():
+    password_helper = PasswordHelper()
+    hashed_password = password_helper.hash("guinevere")
+
+    unpickled_password_helper = pickle.loads(pickle.dumps(password_helper))
+    verified, _ = unpickled_password_helper.verify_and_update(
+        "guinevere", hashed_password
+    )
+    assert verified is True
+
+
+def test_identify():
+    password_helper = PasswordHelper()
+    hashed_password = password_helper.hash("guinevere")
+
+    assert password_helper.identify(hashed_password) == "bcrypt"
+    assert password_helper.identify("HASHED") is None
+    assert password_helper.identify(hashed_password[:-10]) is None
+
+
+def test_process_pool():
+    password_helper = PasswordHelper()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        hashed_password = executor.submit(password_helper.hash, "guinevere").result()
+
+    verified, _ = password_helper.verify_and_update("guinevere", hashed_password)
+    assert verified is True
@@ -3,7 +3,9 @@ from typing import Any, AsyncGenerator, Dict, cast
 import httpx
 import pytest
 from fastapi import FastAPI, status
+from pytest_mock import MockerFixture
 
+from fastapi_users.bloom import EmailBloomFilter
 from fastapi_users.exceptions import (
     InvalidPasswordException,
     InvalidResetPasswordToken,
@@ -14,6 +16,11 @@ from fastapi_users.router import ErrorCode, get_reset_password_router
 from tests.conftest import AsyncMethodMocker, UserManagerMock
 
 
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
 @pytest.fixture
 @pytest.mark.asyncio
 async def test_app_client(
@@ -47,6 +54,24 @@ class TestForgotPassword:
         assert response.status_code == status.HTTP_202_ACCEPTED
         assert user_manager.forgot_password.called is False
 
+    async def test_email_filter(
+        self,
+        mocker: MockerFixture,
+        test_app_client: httpx.AsyncClient,
+        user_manager: UserManagerMock,
+    ):
+        email_filter = EmailBloomFilter(capacity=1000)
+        await email_filter.build(_aiter([]))
+        email_filter.record_lookup(0.0)
+        mocker.patch.object(user_manager, "email_filter", email_filter)
+        get_by_email_spy = mocker.spy(user_manager.user_db, "get_by_email")
+
+        json = {"email": "lancelot@camelot.bt"}
+        response = await test_app_client.post("/forgot-password", json=json)
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert get_by_email_spy.called is False
+        assert user_manager.forgot_password.called is False
+
     async def test_inactive_user(
         self, test_app_client: httpx.AsyncClient, user_manager: UserManagerMock
     ):
@@ -1,12 +1,29 @@
+import json
 from typing import Any, AsyncGenerator, Dict, Tuple, cast
 
 import httpx
 import pytest
 from fastapi import FastAPI, status
+from pytest_mock import MockerFixture
 
+from fastapi_users import schemas
 from fastapi_users.authentication import Authenticator
+from fastapi_users.password import PasswordHelper
 from fastapi_users.router import ErrorCode, get_users_router
-from tests.conftest import User, UserModel, UserUpdate, get_mock_authentication
+from fastapi_users.snapshot import UserSnapshot
+from tests.conftest import (
+    IDType,
+    User,
+    UserModel,
+    UserOAuth,
+    UserOAuthModel,
+    UserUpdate,
+    get_mock_authentication,
+)
+
+
+class BaseUserSchema(schemas.BaseUser[IDType]):
+    pass
 
 
 @pytest.fixture
@@ -23,6 +40,10 @@ def app_factory(get_user_manager, mock_authentication):
             UserUpdate,
             authenticator,
             requires_verification=requires_verification,
+            enable_list=True,
+            enable_export=True,
+            enable_import=True,
+            enable_batch=True,
         )
 
         app = FastAPI()
@@ -101,6 +122,105 @@ class TestMe:
         assert app_factory(True).url_path_for("users:current_user") == "/me"
 
 
+@pytest.fixture
+@pytest.mark.asyncio
+async def test_app_client_oauth(
+    get_test_client, get_user_manager_oauth, mock_authentication
+) -> AsyncGenerator[httpx.AsyncClient, None]:
+    authenticator = Authenticator([mock_authentication], get_user_manager_oauth)
+    app = FastAPI()
+    app.include_router(
+        get_users_router(get_user_manager_oauth, UserOAuth, UserUpdate, authenticator)
+    )
+
+    async for client in get_test_client(app):
+        yield client
+
+
+@pytest.mark.router
+@pytest.mark.asyncio
+class TestMeOAuthAccounts:
+    async def test_get_me(
+        self,
+        mocker: MockerFixture,
+        test_app_client_oauth: httpx.AsyncClient,
+        user_manager_oauth,
+        user_oauth: UserOAuthModel,
+    ):
+        get_full_user_spy = mocker.spy(user_manager_oauth, "get_full_user")
+        load_spy = mocker.spy(user_manager_oauth, "load_oauth_accounts")
+        response = await test_app_client_oauth.get(
+            "/me", headers={"Authorization": f"Bearer {user_oauth.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = cast(Dict[str, Any], response.json())
+        assert len(data["oauth_accounts"]) == 2
+        get_full_user_spy.assert_called_once_with(user_oauth)
+        load_spy.assert_called_once_with(user_oauth)
+
+    async def test_update_me(
+        self,
+        mocker: MockerFixture,
+        test_app_client_oauth: httpx.AsyncClient,
+        user_manager_oauth,
+        user_oauth: UserOAuthModel,
+    ):
+        load_spy = mocker.spy(user_manager_oauth, "load_oauth_accounts")
+        response = await test_app_client_oauth.patch(
+            "/me",
+            json={"is_verified": True},
+            headers={"Authorization": f"Bearer {user_oauth.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = cast(Dict[str, Any], response.json())
+        assert len(data["oauth_accounts"]) == 2
+        assert load_spy.call_count == 1
+
+    async def test_schema_without_oauth_accounts(
+        self,
+        mocker: MockerFixture,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        user_manager,
+        verified_user: UserModel,
+    ):
+        client, _ = test_app_client
+        get_full_user_spy = mocker.spy(user_manager, "get_full_user")
+        load_spy = mocker.spy(user_manager, "load_oauth_accounts")
+        response = await client.get(
+            "/me", headers={"Authorization": f"Bearer {verified_user.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        # The schema has a custom field
+        get_full_user_spy.assert_called_once_with(verified_user)
+        assert load_spy.called is False
+
+    async def test_schema_with_snapshot_fields(
+        self,
+        mocker: MockerFixture,
+        get_test_client,
+        get_user_manager,
+        user_manager,
+        mock_authentication,
+        user: UserModel,
+    ):
+        authenticator = Authenticator([mock_authentication], get_user_manager)
+        app = FastAPI()
+        app.include_router(
+            get_users_router(
+                get_user_manager, BaseUserSchema, UserUpdate, authenticator
+            )
+        )
+        get_full_user_spy = mocker.spy(user_manager, "get_full_user")
+
+        async for client in get_test_client(app):
+            response = await client.get(
+                "/me", headers={"Authorization": f"Bearer {user.id}"}
+            )
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()["email"] == user.email
+        assert get_full_user_spy.called is False
+
+
 @pytest.mark.router
 @pytest.mark.asyncio
 class TestUpdateMe:
@@ -387,6 +507,493 @@ class TestUpdateMe:
         assert updated_user.hashed_password != current_hashed_password
 
 
+@pytest.mark.router
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "method,path,status_code",
+    [
+        ("GET", "/", status.HTTP_404_NOT_FOUND),
+        ("GET", "/export", status.HTTP_404_NOT_FOUND),
+        ("POST", "/import", status.HTTP_405_METHOD_NOT_ALLOWED),
+        ("POST", "/batch/get", status.HTTP_404_NOT_FOUND),
+        ("POST", "/batch/patch", status.HTTP_404_NOT_FOUND),
+        ("POST", "/batch/delete", status.HTTP_404_NOT_FOUND),
+    ],
+)
+async def test_optional_routes_disabled(
+    test_app_client_oauth: httpx.AsyncClient,
+    verified_superuser_oauth: UserOAuthModel,
+    method: str,
+    path: str,
+    status_code: int,
+):
+    response = await test_app_client_oauth.request(
+        method,
+        path,
+        headers={"Authorization": f"Bearer {verified_superuser_oauth.id}"},
+    )
+    assert response.status_code == status_code
+
+
+@pytest.mark.router
+@pytest.mark.asyncio
+class TestListUsers:
+    async def test_missing_token(self, test_app_client: Tuple[httpx.AsyncClient, bool]):
+        client, _ = test_app_client
+        response = await client.get("/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_regular_user(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_user: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.get(
+            "/", headers={"Authorization": f"Bearer {verified_user.id}"}
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_superuser(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.get(
+            "/", headers={"Authorization": f"Bearer {verified_superuser.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        data = cast(Dict[str, Any], response.json())
+        assert len(data["items"]) == 5
+        assert data["next_cursor"] is None
+        ids = [item["id"] for item in data["items"]]
+        assert ids == sorted(ids)
+        assert "hashed_password" not in data["items"][0]
+
+    async def test_pagination(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        headers = {"Authorization": f"Bearer {verified_superuser.id}"}
+
+        ids = []
+        cursor = None
+        for _ in range(3):
+            params: Dict[str, Any] = {"limit": 2}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = await client.get("/", params=params, headers=headers)
+            assert response.status_code == status.HTTP_200_OK
+            data = cast(Dict[str, Any], response.json())
+            ids += [item["id"] for item in data["items"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert cursor is None
+        assert len(ids) == 5
+        assert ids == sorted(set(ids))
+
+    async def test_filters(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        superuser: UserModel,
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.get(
+            "/",
+            params={"is_superuser": True, "is_verified": False, "email_prefix": "MER"},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        data = cast(Dict[str, Any], response.json())
+        assert [item["id"] for item in data["items"]] == [str(superuser.id)]
+
+    async def test_invalid_cursor(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.get(
+            "/",
+            params={"cursor": "foo"},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        data = cast(Dict[str, Any], response.json())
+        assert data["detail"] == ErrorCode.LIST_USERS_INVALID_CURSOR
+
+    @pytest.mark.parametrize("limit", [0, 101])
+    async def test_invalid_limit(
+        self,
+        limit: int,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.get(
+            "/",
+            params={"limit": limit},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.router
+@pytest.mark.asyncio
+class TestExportUsers:
+    async def test_missing_token(self, test_app_client: Tuple[httpx.AsyncClient, bool]):
+        client, _ = test_app_client
+        response = await client.get("/export")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_regular_user(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_user: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.get(
+            "/export", headers={"Authorization": f"Bearer {verified_user.id}"}
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_ndjson(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.get(
+            "/export", headers={"Authorization": f"Bearer {verified_superuser.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 5
+        assert "hashed_password" not in rows[0]
+
+    async def test_csv_filter(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        superuser: UserModel,
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.get(
+            "/export",
+            params={"format": "csv", "is_superuser": True, "is_verified": False},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="users.csv"' in response.headers["content-disposition"]
+
+        lines = response.text.splitlines()
+        assert lines[0] == "id,email,is_active,is_superuser,is_verified,first_name"
+        assert len(lines) == 2
+        assert lines[1].startswith(f"{superuser.id},{superuser.email},")
+
+    async def test_invalid_format(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.get(
+            "/export",
+            params={"format": "xml"},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.router
+@pytest.mark.asyncio
+class TestImportUsers:
+    async def test_missing_token(self, test_app_client: Tuple[httpx.AsyncClient, bool]):
+        client, _ = test_app_client
+        response = await client.post("/import", content=b"")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_regular_user(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_user: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.post(
+            "/import",
+            content=b"",
+            headers={"Authorization": f"Bearer {verified_user.id}"},
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_import(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        hashed_password = PasswordHelper().hash("elaine")
+        lines = [
+            {"email": "lancelot@camelot.bt", "password": "guinevere"},
+            {"email": "galahad@camelot.bt", "hashed_password": hashed_password},
+            {"email": user.email, "password": "guinevere"},
+            {"email": "gawain@camelot.bt"},
+            {"email": "percival@camelot.bt", "password": "h"},
+            {"email": "bedivere@camelot.bt", "hashed_password": "HASHED"},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines) + "\n\nnot json"
+
+        async def chunks():
+            # Split the body in chunks cutting through the lines
+            encoded = body.encode()
+            for start in range(0, len(encoded), 7):
+                end = start + 7
+                yield encoded[start:end]
+
+        response = await client.post(
+            "/import",
+            content=chunks(),
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        data = cast(Dict[str, Any], response.json())
+        assert data["created"] == 2
+        errors = data["errors"]
+        assert [(error["line"], error["code"]) for error in errors] == [
+            (3, ErrorCode.IMPORT_USER_ALREADY_EXISTS),
+            (4, ErrorCode.IMPORT_USER_INVALID),
+            (5, ErrorCode.IMPORT_USER_INVALID_PASSWORD),
+            (6, ErrorCode.IMPORT_USER_INVALID_HASHED_PASSWORD),
+            (8, ErrorCode.IMPORT_USER_INVALID),
+        ]
+        assert errors[0]["email"] == user.email
+        assert errors[2]["reason"] == "Password should be at least 3 characters"
+
+
+@pytest.mark.router
+@pytest.mark.asyncio
+class TestBatch:
+    @pytest.mark.parametrize("action", ["get", "patch", "delete"])
+    async def test_missing_token(
+        self, action: str, test_app_client: Tuple[httpx.AsyncClient, bool]
+    ):
+        client, _ = test_app_client
+        response = await client.post(f"/batch/{action}", json={})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.parametrize("action", ["get", "patch", "delete"])
+    async def test_regular_user(
+        self,
+        action: str,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_user: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.post(
+            f"/batch/{action}",
+            json={"ids": [str(verified_user.id)], "update": {}},
+            headers={"Authorization": f"Bearer {verified_user.id}"},
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    @pytest.mark.parametrize("ids", [[], ["foo"] * 101])
+    async def test_invalid_ids_count(
+        self,
+        ids,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.post(
+            "/batch/get",
+            json={"ids": ids},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    async def test_get(
+        self,
+        mocker,
+        mock_user_db,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+        superuser: UserModel,
+        verified_superuser: UserModel,
+    ):
+        mocker.spy(mock_user_db, "get_many")
+        client, _ = test_app_client
+        unknown_id = "d35d213e-f3d8-4f08-954a-7e0d1bea286f"
+        response = await client.post(
+            "/batch/get",
+            json={"ids": [str(user.id), unknown_id, "foo", str(superuser.id)]},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        data = cast(Dict[str, Any], response.json())
+        assert [item["id"] for item in data["items"]] == [
+            str(user.id),
+            str(superuser.id),
+        ]
+        assert data["missing"] == ["foo", unknown_id]
+        mock_user_db.get_many.assert_called_once()
+
+    async def test_get_snapshots(
+        self,
+        mocker: MockerFixture,
+        user_manager,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+        superuser: UserModel,
+        verified_superuser: UserModel,
+    ):
+        # The database adapter may cache snapshots, without the custom fields
+        user.first_name = "Arthur"
+        get_many = user_manager.get_many
+
+        async def get_many_snapshots(ids):
+            return [UserSnapshot.from_user(user) for user in await get_many(ids)]
+
+        mocker.patch.object(user_manager, "get_many", side_effect=get_many_snapshots)
+        client, _ = test_app_client
+        response = await client.post(
+            "/batch/get",
+            json={"ids": [str(user.id), str(superuser.id)]},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        data = cast(Dict[str, Any], response.json())
+        assert [item["first_name"] for item in data["items"]] == ["Arthur", None]
+
+    async def test_patch(
+        self,
+        mocker,
+        mock_user_db,
+        user_manager,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+        superuser: UserModel,
+        verified_superuser: UserModel,
+    ):
+        mocker.spy(mock_user_db, "update_many")
+        mocker.spy(user_manager, "on_after_update_many")
+        client, _ = test_app_client
+        response = await client.post(
+            "/batch/patch",
+            json={
+                "ids": [str(user.id), str(superuser.id)],
+                "update": {"is_active": False, "is_verified": True},
+            },
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        data = cast(Dict[str, Any], response.json())
+        assert [(item["is_active"], item["is_verified"]) for item in data["items"]] == [
+            (False, True),
+            (False, True),
+        ]
+        assert data["missing"] == []
+        mock_user_db.update_many.assert_called_once()
+        user_manager.on_after_update_many.assert_called_once()
+
+    async def test_patch_several_emails(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+        superuser: UserModel,
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.post(
+            "/batch/patch",
+            json={
+                "ids": [str(user.id), str(superuser.id)],
+                "update": {"email": "lancelot@camelot.bt"},
+            },
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        data = cast(Dict[str, Any], response.json())
+        assert data["detail"] == ErrorCode.UPDATE_USER_EMAIL_ALREADY_EXISTS
+
+    async def test_patch_invalid_password(
+        self,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+        verified_superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        response = await client.post(
+            "/batch/patch",
+            json={"ids": [str(user.id)], "update": {"password": "m"}},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        data = cast(Dict[str, Any], response.json())
+        assert data["detail"] == {
+            "code": ErrorCode.UPDATE_USER_INVALID_PASSWORD,
+            "reason": "Password should be at least 3 characters",
+        }
+
+    async def test_delete(
+        self,
+        mocker,
+        mock_user_db,
+        user_manager,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+        verified_superuser: UserModel,
+    ):
+        mocker.spy(mock_user_db, "delete_many")
+        mocker.spy(user_manager, "on_before_delete_many")
+        client, _ = test_app_client
+        unknown_id = "d35d213e-f3d8-4f08-954a-7e0d1bea286f"
+        response = await client.post(
+            "/batch/delete",
+            json={"ids": [str(user.id), unknown_id]},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        data = cast(Dict[str, Any], response.json())
+        assert [item["id"] for item in data["items"]] == [str(user.id)]
+        assert data["missing"] == [unknown_id]
+        mock_user_db.delete_many.assert_called_once_with([user])
+        user_manager.on_before_delete_many.assert_called_once()
+
+    async def test_delete_none(
+        self,
+        mocker,
+        mock_user_db,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        verified_superuser: UserModel,
+    ):
+        mocker.spy(mock_user_db, "delete_many")
+        client, _ = test_app_client
+        response = await client.post(
+            "/batch/delete",
+            json={"ids": ["foo"]},
+            headers={"Authorization": f"Bearer {verified_superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert mock_user_db.delete_many.called is False
+
+
 @pytest.mark.router
 @pytest.mark.asyncio
 class TestGetUser:
@@ -482,6 +1089,31 @@ class TestGetUser:
         assert data["id"] == str(user.id)
         assert "hashed_password" not in data
 
+    async def test_snapshot(
+        self,
+        mocker: MockerFixture,
+        user_manager,
+        test_app_client: Tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+        verified_superuser: UserModel,
+    ):
+        # The database adapter may cache snapshots, without the custom fields
+        user.first_name = "Arthur"
+        get = user_manager.get
+
+        async def get_snapshot(id):
+            return UserSnapshot.from_user(await get(id))
+
+        mocker.patch.object(user_manager, "get", side_effect=get_snapshot)
+        client, _ = test_app_client
+        response = await client.get(
+            f"/{user.id}", headers={"Authorization": f"Bearer {verified_superuser.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        data = cast(Dict[str, Any], response.json())
+        assert data["first_name"] == "Arthur"
+
     async def test_get_user_namespace(self, app_factory, user: UserModel):
         assert app_factory(True).url_path_for("users:user", id=user.id) == f"/{user.id}"
 
@@ -3,7 +3,9 @@ from typing import Any, AsyncGenerator, Dict, cast
 import httpx
 import pytest
 from fastapi import FastAPI, status
+from pytest_mock import MockerFixture
 
+from fastapi_users.bloom import EmailBloomFilter
 from fastapi_users.exceptions import (
     InvalidVerifyToken,
     UserAlreadyVerified,
@@ -14,6 +16,11 @@ from fastapi_users.router import ErrorCode, get_verify_router
 from tests.conftest import AsyncMethodMocker, User, UserManagerMock, UserModel
 
 
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
 @pytest.fixture
 @pytest.mark.asyncio
 async def test_app_client(
@@ -62,6 +69,24 @@ class TestVerifyTokenRequest:
         assert response.status_code == status.HTTP_202_ACCEPTED
         assert user_manager.request_verify.called is False
 
+    async def test_email_filter(
+        self,
+        mocker: MockerFixture,
+        test_app_client: httpx.AsyncClient,
+        user_manager: UserManagerMock,
+    ):
+        email_filter = EmailBloomFilter(capacity=1000)
+        await email_filter.build(_aiter([]))
+        email_filter.record_lookup(0.0)
+        mocker.patch.object(user_manager, "email_filter", email_filter)
+        get_by_email_spy = mocker.spy(user_manager.user_db, "get_by_email")
+
+        json = {"email": "user@example.com"}
+        response = await test_app_client.post("/request-verify-token", json=json)
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert get_by_email_spy.called is False
+        assert user_manager.request_verify.called is False
+
     async def test_user_inactive(
         self,
         async_method_mocker: AsyncMethodMocker,
@@ -0,0 +1,133 @@
+import pickle
+import uuid
+
+import pytest
+
+from fastapi_users import exceptions
+from fastapi_users.db import CachedUserDatabase, UserCache
+from fastapi_users.snapshot import UserSnapshot, UserSnapshotSerializer
+from tests.conftest import UserModel
+
+
+@pytest.fixture
+def snapshot(user: UserModel) -> UserSnapshot:
+    return UserSnapshot.from_user(user)
+
+
+@pytest.mark.db
+class TestUserSnapshot:
+    def test_from_user(self, user: UserModel, snapshot: UserSnapshot):
+        assert snapshot.id == user.id
+        assert snapshot.email == user.email
+        assert snapshot.hashed_password == user.hashed_password
+        assert snapshot.is_active is user.is_active
+        assert snapshot.is_superuser is user.is_superuser
+        assert snapshot.is_verified is user.is_verified
+        assert UserSnapshot.from_user(snapshot) is snapshot
+
+    def test_immutable(self, snapshot: UserSnapshot):
+        with pytest.raises(AttributeError):
+            snapshot.is_active = False  # type: ignore
+        with pytest.raises(AttributeError):
+            del snapshot.email  # type: ignore
+        with pytest.raises(AttributeError):
+            snapshot.first_name = "Arthur"  # type: ignore
+
+    def test_eq_hash(self, user: UserModel, snapshot: UserSnapshot):
+        other = UserSnapshot.from_user(user)
+        assert snapshot == other
+        assert hash(snapshot) == hash(other)
+        assert snapshot != user
+        assert snapshot != UserSnapshot(user.id, user.email, "other")
+
+    def test_repr(self, snapshot: UserSnapshot):
+        assert repr(snapshot).startswith("UserSnapshot(id=")
+        assert snapshot.hashed_password not in repr(snapshot)
+
+    def test_to_model(self, user: UserModel, snapshot: UserSnapshot):
+        model = snapshot.to_model(UserModel)
+        assert isinstance(model, UserModel)
+        assert model == user
+
+    def test_pickle(self, snapshot: UserSnapshot):
+        assert pickle.loads(pickle.dumps(snapshot)) == snapshot
+
+    @pytest.mark.parametrize(
+        "id", [uuid.uuid4(), 42, -(2**63), "60c2d3b8e5a1f2a3b4c5d6e7"]
+    )
+    @pytest.mark.parametrize("flags", [(True, False, False), (False, True, True)])
+    def test_dumps_loads(self, id, flags):
+        snapshot = UserSnapshot(id, "king.arthur@camelot.bt", "$2b$12$hash", *flags)
+        data = snapshot.dumps()
+        loaded_snapshot = UserSnapshot.loads(data)
+        assert loaded_snapshot == snapshot
+        assert type(loaded_snapshot.id) is type(id)
+
+    def test_dumps_compact(self, snapshot: UserSnapshot):
+        assert len(snapshot.dumps()) < len(pickle.dumps(snapshot))
+
+    def test_dumps_unsupported_id(self):
+        with pytest.raises(TypeError):
+            UserSnapshot(1.5, "king.arthur@camelot.bt", "hash").dumps()
+        with pytest.raises(TypeError):
+            UserSnapshot(True, "king.arthur@camelot.bt", "hash").dumps()
+        with pytest.raises(TypeError):
+            UserSnapshot(2**63, "king.arthur@camelot.bt", "hash").dumps()
+        with pytest.raises(TypeError):
+            UserSnapshot(-(2**63) - 1, "king.arthur@camelot.bt", "hash").dumps()
+
+    def test_dumps_integer_id_bounds(self):
+        for id in (2**63 - 1, -(2**63)):
+            snapshot = UserSnapshot(id, "king.arthur@camelot.bt", "hash")
+            assert UserSnapshot.loads(snapshot.dumps()).id == id
+
+    def test_dumps_too_long(self):
+        with pytest.raises(ValueError):
+            UserSnapshot("a" * 65536, "king.arthur@camelot.bt", "hash").dumps()
+        with pytest.raises(ValueError):
+            UserSnapshot(1, "king.arthur@camelot.bt", "h" * 65536).dumps()
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"",
+            b"\x02\x00\x00",
+            b"\x01\x00\x09",
+            b"\x01\x00\x02\x05\x00ab",
+            b"\x01\x00\x02\x02\x00\xff\xfe\x00\x00\x00\x00",
+            b"\x01\x00\x01\x00",
+        ],
+    )
+    def test_loads_invalid(self, data: bytes):
+        with pytest.raises(ValueError):
+            UserSnapshot.loads(data)
+
+
+@pytest.mark.db
+def test_serializer(user: UserModel):
+    serializer = UserSnapshotSerializer()
+    assert serializer.loads(serializer.dumps(user)) == UserSnapshot.from_user(user)
+
+
+@pytest.mark.db
+@pytest.mark.asyncio
+async def test_user_cache_snapshots(mock_user_db, user: UserModel):
+    cached_user_db = CachedUserDatabase(mock_user_db, UserCache(snapshots=True))
+
+    assert await cached_user_db.get(user.id) is user
+    snapshot = await cached_user_db.get_by_email(user.email)
+    assert isinstance(snapshot, UserSnapshot)
+    assert snapshot == UserSnapshot.from_user(user)
+
+    await cached_user_db.delete(snapshot)
+    assert await cached_user_db.get(user.id) is user
+
+
+@pytest.mark.db
+@pytest.mark.asyncio
+async def test_cached_user_database_snapshot_deleted(mock_user_db):
+    cached_user_db = CachedUserDatabase(mock_user_db, UserCache(snapshots=True))
+    snapshot = UserSnapshot(uuid.uuid4(), "lancelot@camelot.bt", "hash")
+
+    with pytest.raises(exceptions.UserNotExists):
+        await cached_user_db.update(snapshot, {"is_active": False})